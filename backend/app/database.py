@@ -1,6 +1,13 @@
 import os
+import time
+import threading
+from typing import Optional, TYPE_CHECKING
 from dotenv import load_dotenv
-from supabase import create_client, Client
+
+from .services.metrics import supabase_queries_total, supabase_query_duration_seconds
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 # Load environment variables
 load_dotenv()
@@ -9,11 +16,94 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Query builder methods that decide what kind of query is being run
+QUERY_OPERATIONS = ("select", "insert", "update", "upsert", "delete")
+
+
+class InstrumentedQuery(object):
+    """
+    Wraps a postgrest query builder so execute() is counted and timed
+    per table and operation. Every other call is passed through.
+    """
+
+    def __init__(self, builder, table: str, operation: str = "unknown"):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+
+    def execute(self, *args, **kwargs):
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            return self._builder.execute(*args, **kwargs)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            supabase_query_duration_seconds.observe(
+                time.perf_counter() - start, table=self._table, operation=self._operation
+            )
+            supabase_queries_total.inc(table=self._table, operation=self._operation, outcome=outcome)
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if hasattr(result, "execute"):
+                operation = name if name in QUERY_OPERATIONS else self._operation
+                return InstrumentedQuery(result, self._table, operation)
+            return result
+        return call
+
+
+class InstrumentedClient(object):
+    """
+    Wraps a Supabase client so every table query reports metrics.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, table_name: str) -> InstrumentedQuery:
+        return InstrumentedQuery(self._client.table(table_name), table_name)
+
+    def from_(self, table_name: str) -> InstrumentedQuery:
+        return self.table(table_name)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+# Shared Supabase client, created on first use so importing the app stays cheap
+_supabase: Optional["Client"] = None
+_supabase_lock = threading.Lock()
+
+
+def get_supabase_client() -> "Client":
+    """
+    Returns the shared Supabase client instance, creating it on first use.
+    """
+    global _supabase
+    if _supabase is None:
+        with _supabase_lock:
+            if _supabase is None:
+                _supabase = InstrumentedClient(_create_client())
+    return _supabase
+
+
+def _create_client():
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
 
-def get_supabase_client() -> Client:
+def set_supabase_client(client) -> None:
     """
-    Returns the Supabase client instance.
+    Replace the shared client, e.g. with a FakeSupabaseClient in tests and
+    load tests. Pass None to fall back to creating one on next use.
     """
-    return supabase
+    global _supabase
+    with _supabase_lock:
+        _supabase = InstrumentedClient(client) if client is not None else None
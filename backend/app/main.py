@@ -1,15 +1,21 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, JSONResponse
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 import datetime
+import time
 
 # Import the routers from the app directory structure
-from app.routers import reviews_router, spots_router
+from app.routers import reviews_router, spots_router, users_router
 from app.database import get_supabase_client
-from app.services.forecast_service import update_all_spot_forecasts
+from app.services.refresh_coordinator import refresh_coordinator
+from app.services.refresh_shards import REFRESH_SHARDING, sharded_refresh
+from app.services.forecast_service import run_forecast_verification
+from app.services.metrics import http_request_duration_seconds, render_latest
+from app.services.health import health_monitor
 
 # Load environment variables
 load_dotenv()
@@ -17,17 +23,40 @@ load_dotenv()
 # Set up the scheduler
 scheduler = BackgroundScheduler()
 scheduler.add_job(
-    update_all_spot_forecasts,
+    refresh_coordinator.scheduled_refresh,  # Joins any manual refresh already in flight
     IntervalTrigger(hours=3),  # Run every 3 hours
     id="update_forecasts",
     name="Update surf spot forecasts",
     replace_existing=True
 )
+scheduler.add_job(
+    refresh_coordinator.retry_failed,
+    IntervalTrigger(seconds=60),  # Only spots whose retry backoff has elapsed are refreshed
+    id="retry_failed_spots",
+    name="Retry failed surf spot forecasts",
+    replace_existing=True
+)
+if REFRESH_SHARDING:
+    scheduler.add_job(
+        sharded_refresh.work_open_runs,
+        IntervalTrigger(seconds=30),  # Claims shards of runs started by any worker, replays published ones' stages
+        id="work_refresh_shards",
+        name="Work on sharded forecast refreshes",
+        replace_existing=True
+    )
+scheduler.add_job(
+    run_forecast_verification,
+    IntervalTrigger(hours=6),  # Only new reviews are processed each run
+    id="verify_forecasts",
+    name="Verify forecasts against reviews",
+    replace_existing=True
+)
 
 # Define lifespan context manager for app startup/shutdown events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Start the scheduler
+    # Startup: Start the scheduler, including the background readiness ping
+    health_monitor.start(scheduler)
     scheduler.start()
     yield
     # Shutdown: Stop the scheduler
@@ -54,11 +83,33 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """
+    Record per-route latency, labelled by the route template (e.g. /spots/{spot_id})
+    so path parameters don't blow up the number of series.
+    """
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        http_request_duration_seconds.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status
+        )
+
 
 # Include routers
 # This connects all the endpoints defined in the routers to your main app
 app.include_router(reviews_router, tags=["reviews"])
 app.include_router(spots_router, tags=["spots"])
+app.include_router(users_router, tags=["users"])
 
 
 @app.get("/")
@@ -66,6 +117,25 @@ def read_root():
     return {"message": "Welcome to the Surf App API"}
 
 
+@app.get("/livez")
+async def liveness_check():
+    """
+    Liveness probe: the process is up and serving requests. Does no I/O.
+    """
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readiness_check():
+    """
+    Readiness probe based on the background-refreshed status: last successful
+    DB ping, age of the last forecast refresh and scheduler state.
+    Never queries the database itself.
+    """
+    status = health_monitor.readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 @app.get("/health")
 async def health_check():
     """
@@ -87,3 +157,12 @@ async def health_check():
             status_code=500,
             detail=f"Health check failed: {str(e)}"
         )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus-style metrics: request latency, Supabase queries,
+    forecast refresh phases and cache hit ratios.
+    """
+    return PlainTextResponse(render_latest(), media_type="text/plain; version=0.0.4")
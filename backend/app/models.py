@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 
 
@@ -97,6 +97,29 @@ class Forecast(ForecastBase):
         from_attributes = True
 
 
+class SwellComponent(BaseModel):
+    """Model for one swell component of a forecast hour"""
+    height: Optional[float] = None
+    period: Optional[float] = None
+    direction: Optional[float] = None
+
+
+class ForecastHour(BaseModel):
+    """Model for a single forecast hour"""
+    time: datetime
+    wave_height: Optional[float] = None  # Minimum breaking height (ft)
+    max_wave_height: Optional[float] = None  # Maximum breaking height (ft)
+    tide: Optional[float] = None
+    wind_speed: Optional[float] = None
+    wind_direction: Optional[float] = None
+    swell_components: Dict[str, SwellComponent] = {}
+
+
+class ArchivedForecastHour(ForecastHour):
+    """Model for a forecast hour from the archive, with the model run that produced it"""
+    model_run: datetime
+
+
 class ForecastDay(BaseModel):
     """Model for a single day's forecast"""
     day: str
@@ -109,7 +132,55 @@ class ForecastDay(BaseModel):
 
 class SpotForecast(BaseModel):
     """Model for spot forecast data"""
-    spot_id: int
+    spot_id: Union[int, str]  # surf_spots ids are UUIDs
     spot_name: str
     forecast: List[ForecastDay]
     last_updated: datetime
+    age_seconds: Optional[float] = None  # Since last_updated, when served
+    stale: bool = False  # Older than the stale threshold; a refresh has been queued
+    version: Optional[int] = None  # Publish version of the forecast served
+
+
+class ForecastDelta(BaseModel):
+    """Model for the hours of a spot's latest run that changed since an earlier run"""
+    spot_id: str
+    run_id: Optional[str] = None  # Pass back as since_run to get the next delta
+    since_run: Optional[str] = None
+    full: bool  # since_run wasn't known, so changed holds every hour
+    updated_at: datetime
+    changed: List[ForecastHour]
+    removed: List[datetime]  # Times since_run had that the latest run dropped
+
+
+class SpotScore(BaseModel):
+    """Model for a spot's best forecast hour in the best-time-to-surf ranking"""
+    spot_id: Union[int, str]
+    spot_name: str
+    time: datetime
+    score: float  # 0-100
+    wave_height: Optional[float] = None  # Minimum breaking height (ft)
+    max_wave_height: Optional[float] = None  # Maximum breaking height (ft)
+    wind_speed: Optional[float] = None
+    wind_direction: Optional[float] = None
+    period: Optional[float] = None
+
+
+class ReviewStats(BaseModel):
+    """Model for aggregate review statistics of a spot"""
+    count: int = 0
+    average_rating: Optional[float] = None
+    average_wave_height: Optional[float] = None
+    average_crowd_level: Optional[float] = None
+    latest_review_at: Optional[datetime] = None
+
+
+class DashboardSpot(Spot):
+    """Model for a saved spot on the user dashboard"""
+    current_forecast: Optional[Dict[str, Any]] = None
+    review_stats: ReviewStats = ReviewStats()
+
+
+class UserDashboard(BaseModel):
+    """Model for everything the saved spots page needs in one response"""
+    user_id: str
+    spots: List[DashboardSpot]
@@ -1,2 +1,3 @@
-from .reviews import router as reviews_router
-from .spots import router as spots_router
+from .reviews import router as reviews_router
+from .spots import router as spots_router
+from .users import router as users_router
@@ -1,19 +1,35 @@
 """
 Router for spots and forecasts API endpoints
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
 
 from ..database import get_supabase_client
-from ..models import Spot, SpotCreate, SpotUpdate, SpotForecast
-from ..services.forecast_service import (
-    fetch_forecast_for_spot,
-    update_all_spot_forecasts
-)
+from ..models import Spot, SpotCreate, SpotUpdate, SpotForecast, ForecastDelta, SpotScore, ArchivedForecastHour
+from ..services.refresh_coordinator import refresh_coordinator, RefreshThrottled, spot_ids_for_region
+from ..services.refresh_events import refresh_events, format_sse
+from ..services.forecast_cache import forecast_cache
+
+# Seconds between keep-alive comments on idle event streams
+STREAM_KEEPALIVE_SECONDS = 15
 
 router = APIRouter()
 
 
+def _execute(query):
+    """
+    Execute a query, surfacing postgrest errors (which are raised, not
+    returned on the response) as a 500
+    """
+    try:
+        return query.execute()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/spots", response_model=List[Spot])
 async def get_spots(location: Optional[str] = None):
     """
@@ -25,24 +41,124 @@ async def get_spots(location: Optional[str] = None):
     if location:
         query = query.eq("location", location)
     
-    response = query.execute()
-    
-    if response.error:
-        raise HTTPException(status_code=500, detail=str(response.error))
+    response = _execute(query)
     
     return response.data
 
 
+@router.get("/spots/best", response_model=List[SpotScore])
+async def get_best_spots(
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    limit: int = Query(10, ge=1)
+):
+    """
+    Rank spots by their best forecast hour in a time window
+    
+    Scores are computed after each refresh, so this is a lookup in the
+    per-hour top-K index rather than a scan of every spot's forecast.
+    
+    Args:
+        from: Window start, defaults to now
+        to: Window end, defaults to 24 hours after the start
+        limit: Number of spots to return
+    """
+    from ..services.best_time import best_time_index
+
+    start = from_ or datetime.now(timezone.utc)
+    stop = to or start + timedelta(hours=24)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if stop.tzinfo is None:
+        stop = stop.replace(tzinfo=timezone.utc)
+    if stop <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    if limit > best_time_index.top_k:
+        raise HTTPException(status_code=400, detail=f"limit can be at most {best_time_index.top_k}")
+
+    best = best_time_index.best(int(start.timestamp()), int(stop.timestamp()), limit)
+    for entry in best:
+        entry["time"] = datetime.fromtimestamp(entry["time"], tz=timezone.utc)
+    return best
+
+
+@router.get("/spots/forecast-events")
+async def stream_forecast_events(request: Request, spot_id: Optional[str] = None):
+    """
+    Stream forecast refresh progress and new forecast rows as Server-Sent Events
+    
+    Replaces polling /spots/{spot_id}/forecast: clients hold one connection and
+    receive refresh_started, spot_progress, forecast and refresh_completed events.
+    
+    Args:
+        spot_id: Only send spot events for this spot, starting with its latest stored forecast
+    """
+    subscription = refresh_events.subscribe(spot_id)
+
+    async def event_stream():
+        try:
+            if spot_id is not None:
+                latest = (await asyncio.to_thread(forecast_cache.get_many, [spot_id])).get(spot_id)
+                if latest:
+                    yield format_sse("forecast", {"spot_id": spot_id, "forecast": latest})
+
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(subscription.queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, data)
+        finally:
+            refresh_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/spots/refresh-failures")
+async def get_refresh_failures(status: Optional[Literal["pending", "dead"]] = None):
+    """
+    List spots whose last forecast refresh failed
+    
+    Pending spots are retried on their own with exponential backoff; dead-lettered
+    spots failed too many times in a row and wait for POST /spots/refresh-failures/{spot_id}/retry.
+    
+    Args:
+        status: Only list "pending" or "dead" spots
+    """
+    from ..services.refresh_retries import retry_queue
+
+    try:
+        return await asyncio.to_thread(retry_queue.entries, status)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/spots/refresh-failures/{spot_id}/retry", status_code=202)
+async def retry_refresh_failure(spot_id: str):
+    """
+    Requeue a failed (e.g. dead-lettered) spot with a fresh set of attempts and refresh it now
+    """
+    from ..services.refresh_retries import retry_queue
+
+    entry = await asyncio.to_thread(retry_queue.requeue, spot_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Spot {spot_id} has no failed refresh")
+    run, _ = refresh_coordinator.trigger([spot_id], source="retry", force=True)
+    return {"failure": entry, **run.to_dict()}
+
+
 @router.get("/spots/{spot_id}", response_model=Spot)
 async def get_spot(spot_id: int):
     """
     Get a specific spot by ID
     """
     supabase = get_supabase_client()
-    response = supabase.table("spots").select("*").eq("id", spot_id).execute()
-    
-    if response.error:
-        raise HTTPException(status_code=500, detail=str(response.error))
+    response = _execute(supabase.table("spots").select("*").eq("id", spot_id))
     
     if not response.data:
         raise HTTPException(status_code=404, detail=f"Spot with ID {spot_id} not found")
@@ -56,10 +172,7 @@ async def create_spot(spot: SpotCreate):
     Create a new spot
     """
     supabase = get_supabase_client()
-    response = supabase.table("spots").insert(spot.model_dump()).execute()
-    
-    if response.error:
-        raise HTTPException(status_code=500, detail=str(response.error))
+    response = _execute(supabase.table("spots").insert(spot.model_dump()))
     
     return response.data[0]
 
@@ -71,7 +184,7 @@ async def update_spot(spot_id: int, spot_update: SpotUpdate):
     """
     supabase = get_supabase_client()
     # Check if spot exists
-    check_response = supabase.table("spots").select("*").eq("id", spot_id).execute()
+    check_response = _execute(supabase.table("spots").select("*").eq("id", spot_id))
     
     if not check_response.data:
         raise HTTPException(status_code=404, detail=f"Spot with ID {spot_id} not found")
@@ -87,10 +200,7 @@ async def update_spot(spot_id: int, spot_update: SpotUpdate):
     update_data["updated_at"] = datetime.now().isoformat()
     
     # Update the spot
-    response = supabase.table("spots").update(update_data).eq("id", spot_id).execute()
-    
-    if response.error:
-        raise HTTPException(status_code=500, detail=str(response.error))
+    response = _execute(supabase.table("spots").update(update_data).eq("id", spot_id))
     
     return response.data[0]
 
@@ -102,43 +212,230 @@ async def delete_spot(spot_id: int):
     """
     supabase = get_supabase_client()
     # Check if spot exists
-    check_response = supabase.table("spots").select("*").eq("id", spot_id).execute()
+    check_response = _execute(supabase.table("spots").select("*").eq("id", spot_id))
     
     if not check_response.data:
         raise HTTPException(status_code=404, detail=f"Spot with ID {spot_id} not found")
     
     # Delete the spot
-    response = supabase.table("spots").delete().eq("id", spot_id).execute()
-    
-    if response.error:
-        raise HTTPException(status_code=500, detail=str(response.error))
+    response = _execute(supabase.table("spots").delete().eq("id", spot_id))
     
     return {"message": f"Spot with ID {spot_id} deleted"}
 
 
 @router.get("/spots/{spot_id}/forecast", response_model=SpotForecast)
-async def get_spot_forecast(spot_id: int, refresh: bool = False):
+async def get_spot_forecast(spot_id: str, response: Response, refresh: bool = False):
     """
-    Get forecast for a specific spot
+    Get the daily forecast for a specific spot
+    
+    Reads the per-day summaries precomputed after each refresh, so no forecast
+    data is fetched or aggregated per request. The last good forecast is always
+    served straight away, with its age (also sent as the Age header); one older
+    than the stale threshold is flagged stale and a refresh is queued in the
+    background.
     
     Args:
         spot_id: ID of the spot
-        refresh: Whether to force a refresh of the forecast
+        refresh: Whether to also queue a refresh of the forecast (rate limited)
     """
-    forecast = await fetch_forecast_for_spot(spot_id)
+    from ..services.forecast_days import to_forecast_day
+    from ..services.forecast_cache import forecast_day_cache, FORECAST_STALE_SECONDS
+
+    try:
+        days = (await asyncio.to_thread(forecast_day_cache.get_many, [spot_id])).get(spot_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
     
-    if not forecast:
-        raise HTTPException(status_code=404, detail=f"Spot with ID {spot_id} not found")
+    if not days:
+        raise HTTPException(status_code=404, detail=f"No forecast found for spot with ID {spot_id}")
+    
+    last_updated = max(datetime.fromisoformat(str(day["updated_at"]).replace("Z", "+00:00")) for day in days)
+    if last_updated.tzinfo is None:
+        last_updated = last_updated.replace(tzinfo=timezone.utc)
+    age_seconds = max((datetime.now(timezone.utc) - last_updated).total_seconds(), 0.0)
+    stale = age_seconds > FORECAST_STALE_SECONDS
+
+    if refresh or stale:
+        try:
+            refresh_coordinator.trigger([spot_id], source="revalidate" if stale and not refresh else "manual")
+        except RefreshThrottled:
+            pass  # Refreshed recently; the stored days are as current as they get
     
-    return forecast
+    response.headers["Age"] = str(int(age_seconds))
+    return SpotForecast(
+        spot_id=days[0]["spot_id"],
+        spot_name=days[0].get("spot_name") or "",
+        forecast=[to_forecast_day(day) for day in days],
+        last_updated=last_updated,
+        age_seconds=round(age_seconds, 1),
+        stale=stale,
+        version=days[0].get("version")
+    )
+
+
+@router.get("/spots/{spot_id}/forecast/delta", response_model=ForecastDelta)
+async def get_spot_forecast_delta(spot_id: str, since_run: Optional[str] = None):
+    """
+    Get the hourly forecasts that changed since an earlier refresh run
+    
+    Returns only the hours of the spot's latest run whose values differ from
+    run since_run, plus the times it dropped. Pass the returned run_id as
+    since_run next time. Without since_run, or with one that is no longer
+    kept, every hour is returned with full set to true.
+    
+    Args:
+        spot_id: ID of the spot
+        since_run: Run id from a previous response
+    """
+    from ..services.forecast_deltas import forecast_delta_store
+    from ..services.forecast_records import SpotForecastSeries
 
+    changes = await asyncio.to_thread(forecast_delta_store.changes, spot_id, since_run)
+    if changes is None:
+        raise HTTPException(status_code=404, detail=f"No forecast found for spot with ID {spot_id}")
+    series = SpotForecastSeries(spot_id, changes["records"], "english")
+    return ForecastDelta(
+        spot_id=spot_id,
+        run_id=changes["run_id"],
+        since_run=since_run or None,
+        full=changes["full"],
+        updated_at=datetime.fromtimestamp(changes["created_at"], tz=timezone.utc),
+        changed=[hour.to_model() for hour in series.hours()],
+        removed=[datetime.fromtimestamp(int(time), tz=timezone.utc) for time in changes["removed"]]
+    )
 
-@router.post("/spots/update-forecasts")
-async def update_forecasts(background_tasks: BackgroundTasks):
+
+@router.get("/spots/{spot_id}/forecast/history", response_model=List[ArchivedForecastHour])
+async def get_spot_forecast_history(
+    spot_id: str,
+    from_: datetime = Query(..., alias="from"),
+    to: Optional[datetime] = None,
+    latest_only: bool = False,
+    units: Literal["english", "metric", "knots"] = "english"
+):
     """
-    Update forecasts for all spots
+    Get archived hourly forecasts for a spot
+    
+    Every refresh is archived, so an hour usually has forecasts from several
+    model runs (different lead times), returned oldest run first.
     
-    This is a long-running operation, so it runs in the background
+    Args:
+        spot_id: ID of the spot
+        from: Start of the range of forecast times
+        to: End of the range, defaults to now
+        latest_only: Only return the most recent model run's forecast for each hour
+        units: Unit system for heights, wind speeds and temperatures (forecasts are stored in english)
     """
-    background_tasks.add_task(update_all_spot_forecasts)
-    return {"message": "Forecast update started in the background"}
+    from ..services.forecast_archive import forecast_archive
+    from ..services.forecast_records import SpotForecastSeries
+
+    start = from_ if from_.tzinfo else from_.replace(tzinfo=timezone.utc)
+    stop = to or datetime.now(timezone.utc)
+    stop = stop if stop.tzinfo else stop.replace(tzinfo=timezone.utc)
+    if stop <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+
+    rows = await asyncio.to_thread(
+        forecast_archive.query, spot_id, int(start.timestamp()), int(stop.timestamp()), latest_only
+    )
+    series = SpotForecastSeries(spot_id, rows, "english").to_units(units)
+    return [
+        ArchivedForecastHour(
+            **hour.to_model().model_dump(),
+            model_run=datetime.fromtimestamp(int(model_run), tz=timezone.utc)
+        )
+        for hour, model_run in zip(series.hours(), rows["model_run"])
+    ]
+
+
+@router.get("/spots/{spot_id}/charts/{chart_type}")
+async def get_spot_chart(spot_id: str, chart_type: str, format: str = "png"):
+    """
+    Get a rendered forecast chart for a spot
+    
+    Charts are drawn from the latest archived forecast on a worker pool and
+    cached per model run, so each chart is rendered once per forecast cycle.
+    
+    Args:
+        spot_id: ID of the spot
+        chart_type: wave, wind or tide
+        format: png or svg
+    """
+    from ..services.charts import chart_renderer, ChartUnavailable, CHART_TYPES, CHART_FORMATS
+
+    if chart_type not in CHART_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown chart type {chart_type}, expected one of {', '.join(CHART_TYPES)}")
+    if format not in CHART_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format {format}, expected one of {', '.join(CHART_FORMATS)}")
+
+    try:
+        content, run = await chart_renderer.get(spot_id, chart_type, format)
+    except ChartUnavailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return Response(
+        content=content,
+        media_type=CHART_FORMATS[format],
+        headers={"Cache-Control": "public, max-age=600", "ETag": f'"{run}-{chart_type}-{format}"'}
+    )
+
+
+@router.post("/spots/update-forecasts", status_code=202)
+async def update_forecasts(spot_id: Optional[str] = None, region: Optional[str] = None):
+    """
+    Update forecasts for all spots, one spot, or every spot in a region
+    
+    This is a long-running operation, so it runs in the background. Triggers that
+    arrive while a refresh covering the same spots is in flight join that run
+    instead of starting another, and spots refreshed within the minimum interval
+    are not refreshed again (429 with Retry-After if nothing is due).
+    
+    Args:
+        spot_id: Only refresh this spot
+        region: Only refresh spots whose location matches this region
+    """
+    spot_ids = None
+    if spot_id is not None:
+        spot_ids = [spot_id]
+    elif region is not None:
+        spot_ids = await asyncio.to_thread(spot_ids_for_region, region)
+        if not spot_ids:
+            raise HTTPException(status_code=404, detail=f"No spots found in region {region}")
+
+    try:
+        run, created = refresh_coordinator.trigger(spot_ids)
+    except RefreshThrottled as e:
+        return JSONResponse(
+            {
+                "detail": str(e),
+                "last_run": e.last_run.to_dict() if e.last_run else None
+            },
+            status_code=429,
+            headers={"Retry-After": str(int(e.retry_after) + 1)}
+        )
+
+    return {
+        "message": "Forecast update started in the background" if created else "Joined a forecast update already in progress",
+        **run.to_dict()
+    }
+
+
+@router.get("/spots/update-forecasts/{run_id}")
+async def get_forecast_update(run_id: str):
+    """
+    Get the status of a forecast update started by POST /spots/update-forecasts
+    
+    With sharded refreshes, the progress of the cycle's shared run is included;
+    its id (shard_run_id) can be looked up here from any worker.
+    """
+    from ..services.refresh_shards import REFRESH_SHARDING, sharded_refresh
+
+    run = refresh_coordinator.get_run(run_id)
+    shard_run_id = run.shard_run_id if run is not None and run.shard_run_id else run_id
+    sharded = await asyncio.to_thread(sharded_refresh.get_run, shard_run_id) if REFRESH_SHARDING else None
+    if run is None and sharded is None:
+        raise HTTPException(status_code=404, detail=f"Forecast update {run_id} not found")
+    status = run.to_dict() if run is not None else {"run_id": run_id}
+    if sharded is not None:
+        status["sharded"] = sharded
+    return status
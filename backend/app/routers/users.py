@@ -0,0 +1,79 @@
+"""
+Router for per-user API endpoints
+"""
+from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, List
+import asyncio
+
+from ..database import get_supabase_client
+from ..models import UserDashboard
+from ..services.forecast_cache import forecast_cache
+
+router = APIRouter()
+
+
+def _review_stats(reviews: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate a spot's reviews into counts and averages"""
+    def average(field):
+        values = [review[field] for review in reviews if review.get(field) is not None]
+        return round(sum(values) / len(values), 2) if values else None
+
+    return {
+        "count": len(reviews),
+        "average_rating": average("rating"),
+        "average_wave_height": average("wave_height"),
+        "average_crowd_level": average("crowd_level"),
+        "latest_review_at": max((review["created_at"] for review in reviews if review.get("created_at")), default=None)
+    }
+
+
+@router.get("/users/{user_id}/dashboard", response_model=UserDashboard)
+async def get_user_dashboard(user_id: str):
+    """
+    Get a user's saved spots with their latest forecast and review stats
+    
+    Replaces one details, forecast and reviews request per saved spot: the
+    saved spot ids are read once, then spots, forecasts (through the forecast
+    cache) and reviews are each fetched for all of them with a single in_()
+    query, concurrently.
+    """
+    supabase = get_supabase_client()
+
+    try:
+        saved = await asyncio.to_thread(
+            lambda: supabase.table("user_spots").select("spot_id", "created_at").eq("user_id", user_id)
+            .order("created_at").execute()
+        )
+        spot_ids = list(dict.fromkeys(row["spot_id"] for row in saved.data))
+        if not spot_ids:
+            return {"user_id": user_id, "spots": []}
+
+        spots, forecasts, reviews = await asyncio.gather(
+            asyncio.to_thread(lambda: supabase.table("spots").select("*").in_("id", spot_ids).execute()),
+            asyncio.to_thread(forecast_cache.get_many, spot_ids),
+            asyncio.to_thread(
+                lambda: supabase.table("reviews").select("spot_id", "rating", "wave_height", "crowd_level", "created_at")
+                .in_("spot_id", spot_ids).execute()
+            )
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading dashboard: {str(e)}")
+
+    reviews_by_spot: Dict[str, List[Dict[str, Any]]] = {}
+    for review in reviews.data:
+        reviews_by_spot.setdefault(str(review["spot_id"]), []).append(review)
+    spots_by_id = {str(spot["id"]): spot for spot in spots.data}
+
+    # Keep the order the spots were saved in; skip saved spots that no longer exist
+    return {
+        "user_id": user_id,
+        "spots": [
+            {
+                **spots_by_id[str(spot_id)],
+                "current_forecast": forecasts.get(str(spot_id)),
+                "review_stats": _review_stats(reviews_by_spot.get(str(spot_id), []))
+            }
+            for spot_id in spot_ids
+            if str(spot_id) in spots_by_id
+        ]
+    }
@@ -0,0 +1,218 @@
+# app/services/best_time.py
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .forecast_service import spot_tuning
+
+
+# Spots kept per forecast hour; /spots/best can return at most this many
+BEST_TIME_TOP_K = int(os.environ.get("BEST_TIME_TOP_K", "50"))
+# Persisted so the ranking survives a restart until the next refresh
+BEST_TIME_INDEX_PATH = os.environ.get(
+    "BEST_TIME_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".cache", "best_time_index.npz")
+)
+# Scores for hours older than this are dropped when the index is rebuilt
+BEST_TIME_RETENTION_SECONDS = 24 * 3600
+
+# Breaking height (ft) where the height score starts, and where it maxes out
+MIN_SURFABLE_HEIGHT = 1.0
+FULL_HEIGHT = 6.0
+# Swell period (s) where the period score starts, and where it maxes out
+MIN_PERIOD = 6.0
+FULL_PERIOD = 16.0
+# Onshore wind (mph) that blows the surf out completely
+BLOWN_OUT_ONSHORE_WIND = 20.0
+# Offshore wind (mph) above which it starts to hold waves up too much to paddle in
+STRONG_OFFSHORE_WIND = 25.0
+
+SCORE_DTYPE = np.dtype([
+    ("spot_id", "<U64"),
+    ("spot_name", "<U128"),
+    ("time", "<i8"),                  # unix seconds, UTC
+    ("score", "<f4"),                 # 0-100
+    ("wave_height", "<f4"),           # minimum breaking height (ft)
+    ("max_wave_height", "<f4"),       # maximum breaking height (ft)
+    ("wind_speed", "<f4"),
+    ("wind_direction", "<f4"),
+    ("period", "<f4"),
+])
+
+
+def score_hours(records: np.ndarray, beach_angles: np.ndarray) -> np.ndarray:
+    """Rate forecast hours from 0 to 100
+
+    The score multiplies three factors so a flat day can't rank well on wind alone:
+    breaking height, swell period, and wind quality. Wind quality uses the onshore
+    component of the wind relative to the direction the beach faces; offshore wind
+    (blowing from the land, i.e. from angle + 180°) is clean up to a point.
+
+    Args:
+        records (np.ndarray): FORECAST_DTYPE rows
+        beach_angles (np.ndarray): Direction each row's beach faces, in degrees
+
+    Returns:
+        np.ndarray: float32 scores, 0 where there is no wave height
+    """
+    height = (records["minimum_breaking_height"].astype(np.float64) + records["maximum_breaking_height"]) / 2
+    height_score = np.clip((height - MIN_SURFABLE_HEIGHT) / (FULL_HEIGHT - MIN_SURFABLE_HEIGHT), 0, 1)
+
+    period = np.where(np.isnan(records["swell_period"][:, 0]), records["wave_period"], records["swell_period"][:, 0])
+    period_score = np.clip((period - MIN_PERIOD) / (FULL_PERIOD - MIN_PERIOD), 0, 1)
+
+    # +1 when the wind blows straight offshore, -1 straight onshore
+    speed = records["wind_speed"].astype(np.float64)
+    alignment = np.cos(np.radians(records["wind_direction"] - (beach_angles + 180.0)))
+    onshore = np.clip(-alignment, 0, None) * speed
+    wind_score = np.clip(1 - onshore / BLOWN_OUT_ONSHORE_WIND, 0, 1)
+    wind_score *= 1 - 0.5 * np.clip((np.clip(alignment, 0, None) * speed - STRONG_OFFSHORE_WIND) / STRONG_OFFSHORE_WIND, 0, 1)
+
+    # Missing period or wind shouldn't zero out an otherwise good hour
+    period_score = np.where(np.isnan(period_score), 0.5, period_score)
+    wind_score = np.where(np.isnan(wind_score), 0.5, wind_score)
+
+    score = 100 * height_score * (0.4 + 0.6 * period_score) * (0.3 + 0.7 * wind_score)
+    return np.nan_to_num(score, nan=0.0).astype(np.float32)
+
+
+def score_snapshot(spots: List[Dict[str, Any]], snapshot) -> np.ndarray:
+    """Score every hour of every spot in a refresh snapshot in one pass
+
+    Args:
+        spots (list): Surf spot dicts; the name picks the beach angle via spot_tuning
+        snapshot (ForecastSnapshot): The refresh's hourly forecasts
+
+    Returns:
+        np.ndarray: SCORE_DTYPE, one row per spot hour
+    """
+    spots_by_id = {str(spot["id"]): spot for spot in spots}
+    records = snapshot.records
+    scores = np.zeros(len(records), dtype=SCORE_DTYPE)
+    angles = np.empty(len(records), dtype=np.float64)
+    for spot_id, entry in zip(snapshot.spot_ids, snapshot.index):
+        rows = slice(int(entry["start"]), int(entry["stop"]))
+        name = spots_by_id.get(spot_id, {}).get("name") or ""
+        scores["spot_id"][rows] = spot_id
+        scores["spot_name"][rows] = name
+        angles[rows] = spot_tuning(name)["angle"]
+
+    period = records["swell_period"][:, 0]
+    scores["time"] = records["time"]
+    scores["score"] = score_hours(records, angles)
+    scores["wave_height"] = records["minimum_breaking_height"]
+    scores["max_wave_height"] = records["maximum_breaking_height"]
+    scores["wind_speed"] = records["wind_speed"]
+    scores["wind_direction"] = records["wind_direction"]
+    scores["period"] = np.where(np.isnan(period), records["wave_period"], period)
+    return scores
+
+
+def top_k_per_hour(scores: np.ndarray, k: int) -> np.ndarray:
+    """Keep the k best spots for each forecast hour, sorted by time then score"""
+    if not len(scores):
+        return scores
+    ranked = scores[np.lexsort((-scores["score"], scores["time"]))]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(ranked["time"])) + 1))
+    group_start = np.repeat(starts, np.diff(np.concatenate((starts, [len(ranked)]))))
+    return ranked[np.arange(len(ranked)) - group_start < k]
+
+
+class BestTimeIndex(object):
+    """Top-K spots per forecast hour, rebuilt after each refresh
+
+    All spot-hour scores are kept so a refresh of a few spots can be merged
+    in, but queries only read the per-hour top-K table. Answering "the best
+    spots between from and to" takes a binary search for the window and a
+    sort of at most K rows per hour, regardless of how many spots exist.
+    A spot's best hour in the window is always in that hour's top-K when
+    limit <= K, so the answer is exact.
+    """
+
+    def __init__(self, path: Optional[str] = BEST_TIME_INDEX_PATH, top_k: int = BEST_TIME_TOP_K):
+        self.path = path
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._scores: Optional[np.ndarray] = None
+        self._top: Optional[np.ndarray] = None
+
+    def _load(self):
+        """Read the persisted index on first use. Caller must hold the lock."""
+        if self._scores is not None:
+            return
+        self._scores = self._top = np.zeros(0, dtype=SCORE_DTYPE)
+        if self.path and os.path.exists(self.path):
+            try:
+                with np.load(self.path) as saved:
+                    self._scores, self._top = saved["scores"], saved["top"]
+            except Exception as e:
+                print(f"Error loading best time index from {self.path}: {e}")
+
+    def _save(self):
+        """Persist the index atomically. Caller must hold the lock."""
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp.npz"
+            np.savez(tmp_path, scores=self._scores, top=self._top)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving best time index to {self.path}: {e}")
+
+    def update(self, spots: List[Dict[str, Any]], snapshot):
+        """Replace the scores of the spots in a refresh snapshot and rebuild the top-K table"""
+        scores = score_snapshot(spots, snapshot)
+        cutoff = int(time.time()) - BEST_TIME_RETENTION_SECONDS
+        with self._lock:
+            self._load()
+            kept = self._scores[~np.isin(self._scores["spot_id"], snapshot.spot_ids)]
+            merged = np.concatenate((kept, scores))
+            self._scores = merged[merged["time"] >= cutoff]
+            self._top = top_k_per_hour(self._scores, self.top_k)
+            self._save()
+
+    def best(self, start: int, stop: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Best spots to surf between two times, each with its best hour
+
+        Args:
+            start (int): Window start, unix seconds
+            stop (int): Window end (exclusive), unix seconds
+            limit (int): Spots to return, at most top_k
+
+        Returns:
+            list: Dicts with spot_id, spot_name, time and the hour's score and conditions, best first
+        """
+        limit = min(limit, self.top_k)
+        with self._lock:
+            self._load()
+            top = self._top
+        lo, hi = np.searchsorted(top["time"], [start, stop], side="left")
+        window = top[lo:hi]
+        if not len(window):
+            return []
+
+        # Each spot's best hour in the window, then the best spots
+        ranked = window[np.argsort(-window["score"], kind="stable")]
+        _, first = np.unique(ranked["spot_id"], return_index=True)
+        best = ranked[np.sort(first)][:limit]
+        return [
+            {
+                "spot_id": row["spot_id"].item(),
+                "spot_name": row["spot_name"].item(),
+                "time": int(row["time"]),
+                "score": round(float(row["score"]), 1),
+                "wave_height": None if np.isnan(row["wave_height"]) else round(float(row["wave_height"]), 2),
+                "max_wave_height": None if np.isnan(row["max_wave_height"]) else round(float(row["max_wave_height"]), 2),
+                "wind_speed": None if np.isnan(row["wind_speed"]) else round(float(row["wind_speed"]), 1),
+                "wind_direction": None if np.isnan(row["wind_direction"]) else round(float(row["wind_direction"])),
+                "period": None if np.isnan(row["period"]) else round(float(row["period"]), 1),
+            }
+            for row in best
+        ]
+
+
+best_time_index = BestTimeIndex()
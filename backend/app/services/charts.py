@@ -0,0 +1,176 @@
+# app/services/charts.py
+import io
+import os
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Tuple
+
+import numpy as np
+
+from ..database import get_supabase_client
+from .forecast_archive import forecast_archive
+from .forecast_days import DEFAULT_SPOT_TIMEZONE, compass_point
+from .units import to_local
+
+
+CHART_TYPES = ("wave", "wind", "tide")
+CHART_FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+# Threads rendering charts; matplotlib releases the GIL for much of rasterizing
+CHART_WORKERS = int(os.environ.get("CHART_WORKERS", "2"))
+# Rendered charts kept in memory
+CHART_CACHE_SIZE = int(os.environ.get("CHART_CACHE_SIZE", "256"))
+
+
+class ChartUnavailable(Exception):
+    """Raised when there is no data to draw the requested chart from"""
+    pass
+
+
+def _axes(title: str, ylabel: str):
+    """Create a figure and axes without pyplot, so no GUI backend or global state is involved"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.set_title(title)
+    ax.set_xlabel("Date and Time")
+    ax.set_ylabel(ylabel)
+    ax.grid(True, alpha=0.3)
+    return fig, ax
+
+
+def _format_time_axis(ax):
+    from matplotlib.dates import DateFormatter, HourLocator
+
+    # Times are already shifted to the spot's local time, so the axis needs no timezone
+    ax.xaxis.set_major_locator(HourLocator(interval=6))
+    ax.xaxis.set_major_formatter(DateFormatter("%m/%d\n%H:%M"))
+
+
+def render_wave_chart(records: np.ndarray, title: str, tz_name: str):
+    """Breaking wave height range over time, like the per-spot wave height plots"""
+    fig, ax = _axes(f"{title}: Breaking Wave Height", "Breaking Wave Height (ft)")
+    times = to_local(records["time"], tz_name)
+    mins = records["minimum_breaking_height"]
+    maxs = records["maximum_breaking_height"]
+    ax.fill_between(times, mins, maxs, color="tab:blue", alpha=0.2)
+    ax.plot(times, maxs, c="green", label="Maximum Breaking Height")
+    ax.plot(times, mins, c="blue", label="Minimum Breaking Height")
+    ax.plot(times, records["wave_height"], c="gray", linestyle="--", alpha=0.5, label="Raw Wave Height")
+    ax.set_ylim(bottom=0)
+    ax.legend(loc="best")
+    _format_time_axis(ax)
+    return fig
+
+
+def render_wind_chart(records: np.ndarray, title: str, tz_name: str):
+    """Wind speed with arrows showing where the wind blows to"""
+    fig, ax = _axes(f"{title}: Wind Speed", "Wind Speed (mph)")
+    times = to_local(records["time"], tz_name)
+    speed = records["wind_speed"]
+    ax.plot(times, speed, "b-", linewidth=2, label="Wind Speed")
+
+    # Wind direction is where it blows from; arrows point downwind
+    radians = np.radians(records["wind_direction"].astype(np.float64))
+    ax.quiver(times, speed, -np.sin(radians), -np.cos(radians), angles="uv", color="tab:gray", width=0.003)
+    for time, value, direction in zip(times, speed, records["wind_direction"]):
+        if not np.isnan(value) and not np.isnan(direction):
+            ax.annotate(compass_point(float(direction)), (time, value), textcoords="offset points", xytext=(0, 10),
+                        ha="center", fontsize=8)
+    ax.set_ylim(bottom=0)
+    ax.legend(loc="upper left")
+    _format_time_axis(ax)
+    return fig
+
+
+def render_tide_chart(records: np.ndarray, title: str, tz_name: str):
+    """Tide height over time"""
+    if "tide" not in records.dtype.names or np.isnan(records["tide"]).all():
+        raise ChartUnavailable("No tide data is stored for this forecast")
+    fig, ax = _axes(f"{title}: Tide", "Water Level (ft)")
+    ax.plot(to_local(records["time"], tz_name), records["tide"], c="tab:blue", label="Tide")
+    ax.legend(loc="best")
+    _format_time_axis(ax)
+    return fig
+
+
+RENDERERS = {"wave": render_wave_chart, "wind": render_wind_chart, "tide": render_tide_chart}
+
+
+class ChartRenderer(object):
+    """Renders forecast charts on a worker pool and caches them per model run
+
+    Charts are drawn from the latest archived run for the spot, so a chart is
+    keyed by (spot, chart type, run, format) and drawn once per forecast cycle.
+    Concurrent requests for a chart that is still rendering wait on the same
+    render instead of starting another.
+    """
+
+    def __init__(self, archive=None, workers: int = CHART_WORKERS, cache_size: int = CHART_CACHE_SIZE):
+        self.archive = archive or forecast_archive
+        self.cache_size = cache_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chart-render")
+        # Reentrant: a render that finishes before add_done_callback runs its callback immediately
+        self._lock = threading.RLock()
+        self._cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._pending = {}
+
+    @staticmethod
+    def _spot_details(spot_id) -> Tuple[str, str]:
+        """Spot name and timezone for chart titles and axes"""
+        try:
+            response = get_supabase_client().table("surf_spots").select("*").eq("id", spot_id).limit(1).execute()
+            spot = response.data[0] if response.data else {}
+        except Exception as e:
+            print(f"Error looking up spot {spot_id} for chart: {e}")
+            spot = {}
+        return spot.get("name") or f"Spot {spot_id}", spot.get("timezone") or DEFAULT_SPOT_TIMEZONE
+
+    def _render(self, spot_id, chart_type: str, fmt: str, snapshot) -> bytes:
+        name, tz_name = self._spot_details(spot_id)
+        records = snapshot.get(spot_id)
+        fig = RENDERERS[chart_type](records, name, tz_name)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt, bbox_inches="tight")
+        return buffer.getvalue()
+
+    def _store(self, key, future: Future):
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.exception() is None:
+                self._cache[key] = future.result()
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    async def get(self, spot_id, chart_type: str, fmt: str = "png") -> Tuple[bytes, str]:
+        """Rendered chart bytes and the archive run they were drawn from
+
+        Raises:
+            ChartUnavailable: If the spot has no archived forecast or the chart has no data
+        """
+        latest = await asyncio.to_thread(self.archive.latest, str(spot_id))
+        if latest is None:
+            raise ChartUnavailable(f"No forecast has been archived for spot {spot_id}")
+        run, snapshot = latest
+        key = (str(spot_id), chart_type, run, fmt)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached, run
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor.submit(self._render, str(spot_id), chart_type, fmt, snapshot)
+                self._pending[key] = future
+                future.add_done_callback(lambda done: self._store(key, done))
+
+        return await asyncio.wrap_future(future), run
+
+
+chart_renderer = ChartRenderer()
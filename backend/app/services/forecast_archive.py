@@ -0,0 +1,272 @@
+# app/services/forecast_archive.py
+import os
+import uuid
+import bisect
+import shutil
+import datetime
+import threading
+from collections import OrderedDict
+from datetime import timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .forecast_snapshot import ForecastSnapshot, FORECAST_DTYPE, INDEX_FILE
+
+
+# Root of the archive; one directory per model-run date, one snapshot per refresh below it
+FORECAST_ARCHIVE_DIR = os.environ.get(
+    "FORECAST_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "archive", "forecasts")
+)
+# Wave model cycles run every 6 hours (00, 06, 12, 18Z)
+MODEL_CYCLE_HOURS = 6
+# Longest forecast lead time kept, so queries know how far back to look for runs covering a time
+MAX_LEAD_DAYS = 16
+# Loaded run snapshots kept open (memory-mapped) between queries
+OPEN_RUNS = 64
+
+ARCHIVE_DTYPE = np.dtype(FORECAST_DTYPE.descr + [("model_run", "<i8")])
+
+
+def model_run_for(snapshot: ForecastSnapshot) -> datetime.datetime:
+    """The model cycle a refresh came from
+
+    Refreshes fetch from hour 0 of the latest run, so the earliest forecast
+    hour, floored to the cycle, is the run's initialization time.
+    """
+    first = int(snapshot.records["time"].min())
+    cycle = MODEL_CYCLE_HOURS * 3600
+    return datetime.datetime.fromtimestamp(first - first % cycle, tz=timezone.utc)
+
+
+class ForecastArchive(object):
+    """Append-only history of every refresh's hourly forecasts
+
+    Layout:
+        <root>/<YYYY-MM-DD>/<YYYYMMDDTHHZ>-<refresh id>/   (a ForecastSnapshot directory)
+
+    Each refresh is written once to a temporary directory and renamed into
+    place, so readers never see a partial run and nothing is ever rewritten.
+    Within a run, rows are grouped by spot (the snapshot index) and sorted by
+    time, which makes a (spot_id, time range) lookup an index hit plus a
+    binary search. Queries only open runs whose date can hold forecasts for
+    the requested range.
+
+    The archive directory is listed once, into an in-memory catalog of runs
+    and an index of each spot's latest run; append() keeps both current, so
+    reads don't touch the filesystem to find runs. Runs written by other
+    processes are only seen after a restart, or once appended here too:
+    appending a run (by run id) that is already on disk only catalogs it.
+    """
+
+    def __init__(self, root: str = FORECAST_ARCHIVE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._open: "OrderedDict[str, ForecastSnapshot]" = OrderedDict()
+        # (run name's model run prefix, archive order, partition date, run directory), oldest first
+        self._catalog: Optional[List[Tuple[str, int, datetime.date, str]]] = None
+        # spot_id -> catalog entry of the latest run that includes the spot
+        self._latest: Optional[Dict[str, Tuple[str, int, datetime.date, str]]] = None
+
+    def append(self, snapshot: ForecastSnapshot, model_run: Optional[datetime.datetime] = None) -> Optional[str]:
+        """Archive one refresh
+
+        Args:
+            snapshot (ForecastSnapshot): The refresh's hourly forecasts
+            model_run (datetime, optional): Model initialization time, derived from the data if not given
+
+        Returns:
+            str: The run's archive directory, or None if the snapshot was empty. A run already
+                archived under the same run id is kept as it is.
+        """
+        if not len(snapshot.records):
+            return None
+        model_run = model_run or model_run_for(snapshot)
+
+        # Sort each spot's rows by time so range lookups can binary search
+        series = {}
+        for spot_id in snapshot.spot_ids:
+            records = snapshot.get(spot_id)
+            series[spot_id] = records[np.argsort(records["time"], kind="stable")]
+        meta = {
+            **snapshot.meta,
+            "model_run": model_run.isoformat(),
+            "archived_at": datetime.datetime.now(timezone.utc).isoformat()
+        }
+
+        partition = os.path.join(self.root, model_run.strftime("%Y-%m-%d"))
+        name = f"{model_run.strftime('%Y%m%dT%HZ')}-{snapshot.meta.get('run_id') or uuid.uuid4().hex}"
+        directory = os.path.join(partition, name)
+        tmp_directory = os.path.join(partition, f".{name}.tmp")
+        with self._lock:
+            # Catalog what was there before this run, so it isn't picked up twice
+            catalog, _ = self._indexes()
+            if any(entry[3] == directory for entry in catalog):
+                return directory
+        if not os.path.isdir(directory):
+            os.makedirs(partition, exist_ok=True)
+            try:
+                ForecastSnapshot.from_series(series, meta).save(tmp_directory)
+                os.rename(tmp_directory, directory)
+            except Exception:
+                shutil.rmtree(tmp_directory, ignore_errors=True)
+                if not os.path.isdir(directory):
+                    raise
+
+        with self._lock:
+            catalog, latest = self._indexes()
+            entry = (name[:12], len(catalog), model_run.date(), directory)
+            bisect.insort(catalog, entry)
+            for spot_id in series:
+                if spot_id not in latest or latest[spot_id] < entry:
+                    latest[spot_id] = entry
+        return directory
+
+    def _indexes(self):
+        """The run catalog and latest-run index, built from disk on first use. Caller must hold the lock."""
+        if self._catalog is None:
+            self._catalog, self._latest = self._scan()
+        return self._catalog, self._latest
+
+    def _scan(self):
+        runs = []
+        if os.path.isdir(self.root):
+            for partition in os.listdir(self.root):
+                try:
+                    date = datetime.date.fromisoformat(partition)
+                except ValueError:
+                    continue
+                partition_path = os.path.join(self.root, partition)
+                runs.extend((date, os.path.join(partition_path, run))
+                            for run in os.listdir(partition_path) if not run.startswith("."))
+        # Run names start with the model run time; refreshes of the same run are ordered by when they were archived
+        runs.sort(key=lambda run: (os.path.basename(run[1])[:12], os.path.getmtime(run[1])))
+        catalog = [(os.path.basename(directory)[:12], order, date, directory) for order, (date, directory) in enumerate(runs)]
+
+        # Only recent runs can be a spot's latest, so only their (small) index files are read
+        latest = {}
+        recent = datetime.datetime.now(timezone.utc).date() - datetime.timedelta(days=MAX_LEAD_DAYS)
+        for entry in reversed(catalog):
+            if entry[2] < recent:
+                break
+            try:
+                index = np.load(os.path.join(entry[3], INDEX_FILE))
+            except (OSError, ValueError):
+                continue
+            for spot_id in index["spot_id"]:
+                latest.setdefault(str(spot_id), entry)
+        return catalog, latest
+
+    def _runs(self, start: int, stop: int) -> List[str]:
+        """Run directories whose model run could cover [start, stop), oldest first"""
+        first = datetime.datetime.fromtimestamp(start, tz=timezone.utc).date() - datetime.timedelta(days=MAX_LEAD_DAYS)
+        last = datetime.datetime.fromtimestamp(stop, tz=timezone.utc).date()
+        with self._lock:
+            catalog, _ = self._indexes()
+            return [directory for _, _, date, directory in catalog if first <= date <= last]
+
+    def _load(self, directory: str) -> ForecastSnapshot:
+        with self._lock:
+            snapshot = self._open.get(directory)
+            if snapshot is not None:
+                self._open.move_to_end(directory)
+                return snapshot
+        snapshot = ForecastSnapshot.load(directory)
+        with self._lock:
+            self._open[directory] = snapshot
+            while len(self._open) > OPEN_RUNS:
+                self._open.popitem(last=False)
+        return snapshot
+
+    def latest(self, spot_id) -> Optional[Tuple[str, ForecastSnapshot]]:
+        """The most recently archived run that includes a spot, from the last MAX_LEAD_DAYS
+
+        Returns:
+            tuple: (run name, run snapshot), or None if no recent run has the spot
+        """
+        with self._lock:
+            _, latest = self._indexes()
+            entry = latest.get(str(spot_id))
+        recent = datetime.datetime.now(timezone.utc).date() - datetime.timedelta(days=MAX_LEAD_DAYS)
+        if entry is None or entry[2] < recent:
+            return None
+        directory = entry[3]
+        try:
+            return os.path.basename(directory), self._load(directory)
+        except (OSError, ValueError) as e:
+            print(f"Unreadable forecast archive run {directory}: {e}")
+            return None
+
+    def query(self, spot_id, start: int, stop: int, latest_only: bool = False) -> np.ndarray:
+        """Past forecasts for one spot with valid times in [start, stop)
+
+        Args:
+            spot_id: Spot to look up
+            start (int): Range start, unix seconds
+            stop (int): Range end (exclusive), unix seconds
+            latest_only (bool): Keep only the most recent model run's forecast for each hour
+
+        Returns:
+            np.ndarray: ARCHIVE_DTYPE rows sorted by time, then model run
+        """
+        return self.query_many([spot_id], start, stop, latest_only)[1]
+
+    def query_many(self, spot_ids, start: int, stop: int, latest_only: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Past forecasts for many spots with valid times in [start, stop), opening each run once
+
+        Args:
+            spot_ids (list): Spots to look up
+            start (int): Range start, unix seconds
+            stop (int): Range end (exclusive), unix seconds
+            latest_only (bool): Keep only the most recent model run's forecast for each spot and hour
+
+        Returns:
+            tuple: (position in spot_ids of each row, ARCHIVE_DTYPE rows), sorted by spot, time, then model run
+        """
+        spot_ids = np.array([str(spot_id) for spot_id in spot_ids])
+        by_id = np.argsort(spot_ids)
+        positions, parts, model_runs = [], [], []
+        for directory in self._runs(start, stop):
+            try:
+                snapshot = self._load(directory)
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable forecast archive run {directory}: {e}")
+                continue
+            entries = snapshot.index[np.isin(snapshot.index["spot_id"], spot_ids)]
+            if not len(entries):
+                continue
+            # Row numbers of every wanted spot's block in the run, without a loop over spots
+            lengths = entries["stop"] - entries["start"]
+            rows_at = np.repeat(entries["start"] - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+            owners = np.repeat(by_id[np.searchsorted(spot_ids, entries["spot_id"], sorter=by_id)], lengths)
+            times = snapshot.records["time"][rows_at]
+            in_range = (times >= start) & (times < stop)
+            if not in_range.any():
+                continue
+            parts.append(snapshot.records[rows_at[in_range]])
+            positions.append(owners[in_range])
+            model_run = int(datetime.datetime.fromisoformat(snapshot.meta["model_run"]).timestamp())
+            model_runs.append(np.full(len(parts[-1]), model_run, dtype=np.int64))
+
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=ARCHIVE_DTYPE)
+        positions, records, model_runs = np.concatenate(positions), np.concatenate(parts), np.concatenate(model_runs)
+        # Runs are read oldest model run first, so a stable sort on one (spot, time) key leaves
+        # each spot and hour's rows in model run order; much cheaper than a three-key lexsort
+        low = int(records["time"].min())
+        keys = positions * (int(records["time"].max()) - low + 1) + (records["time"] - low)
+        order = np.argsort(keys, kind="stable")
+        if latest_only:
+            # The last row of each (spot, time) group has the newest model run
+            order = order[np.append(np.diff(keys[order]) != 0, True)]
+
+        # Only the selected rows are copied into the wider archive rows
+        rows = np.zeros(len(order), dtype=ARCHIVE_DTYPE)
+        for name in FORECAST_DTYPE.names:
+            rows[name] = records[name][order]
+        rows["model_run"] = model_runs[order]
+        return positions[order], rows
+
+
+forecast_archive = ForecastArchive()
@@ -0,0 +1,220 @@
+# app/services/forecast_cache.py
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..database import get_supabase_client
+from .metrics import record_cache_lookup
+
+
+# How long a cached forecast is served before it is re-read from the database (in the background)
+FORECAST_CACHE_TTL_SECONDS = int(os.environ.get("FORECAST_CACHE_TTL_SECONDS", "300"))
+# Forecasts last updated longer ago than this are flagged stale and trigger a background refresh of the spot.
+# Refreshes run every 3 hours, so a forecast past this has missed at least one.
+FORECAST_STALE_SECONDS = int(os.environ.get("FORECAST_STALE_SECONDS", "14400"))
+# Spots whose snapshots are kept per cache, least recently read dropped first
+FORECAST_CACHE_SIZE = int(os.environ.get("FORECAST_CACHE_SIZE", "10000"))
+# How long "this spot has no forecast" is remembered; it is reloaded synchronously after that, never served stale
+FORECAST_CACHE_MISS_TTL_SECONDS = int(os.environ.get("FORECAST_CACHE_MISS_TTL_SECONDS", "30"))
+
+def next_version() -> int:
+    """A new publish version from the database's forecast_version_seq
+
+    Versions come from one sequence rather than each process's clock, so rows
+    published by different workers order correctly and deleting older versions
+    with lt("version", ...) can't remove a newer publish from another worker.
+    """
+    return int(get_supabase_client().rpc("next_forecast_version").execute().data)
+
+
+class FrozenDict(dict):
+    """A dict that can't be modified, so cached snapshots can be handed out without copying"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Cached forecast snapshots are read-only")
+
+    __setitem__ = __delitem__ = update = pop = popitem = setdefault = clear = _readonly
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze(value: Any) -> Any:
+    """An immutable copy of a snapshot: dicts become FrozenDicts, lists tuples, arrays read-only"""
+    if isinstance(value, dict):
+        return value if isinstance(value, FrozenDict) else FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if hasattr(value, "setflags"):
+        value = value.copy()
+        value.setflags(write=False)
+    return value
+
+
+class SnapshotCache(object):
+    """Last good forecast snapshot per spot, served stale-while-revalidate
+
+    A cached snapshot past its TTL is still returned immediately, and a
+    background thread re-reads it (at most one reload per spot at a time);
+    only spots that have never been loaded wait on the database. If a reload
+    fails, the last good snapshot keeps being served. Each snapshot carries the
+    version it was published with, and an entry is only ever swapped for a
+    newer version, so a slow reload can't put back a snapshot that a refresh
+    has already replaced. Snapshots are frozen once when they are stored and
+    returned as is, so reads don't copy them.
+
+    The cache holds at most max_entries spots, evicting the least recently
+    read. Spots without a snapshot (e.g. unknown ids) are only remembered for
+    miss_ttl_seconds and are then reloaded like spots never seen.
+
+    Args:
+        name (str): Cache name for the hit/miss metrics
+        load (callable): Called with a list of spot id strings, returns spot_id -> (version, snapshot)
+        ttl_seconds (float): How long a snapshot is served before it is reloaded
+        max_entries (int): Spots kept in the cache
+        miss_ttl_seconds (float): How long a spot without a snapshot is cached
+    """
+
+    def __init__(self, name: str, load: Callable[[List[str]], Dict[str, Tuple[int, Any]]],
+                 ttl_seconds: float = FORECAST_CACHE_TTL_SECONDS, max_entries: int = FORECAST_CACHE_SIZE,
+                 miss_ttl_seconds: float = FORECAST_CACHE_MISS_TTL_SECONDS):
+        self.name = name
+        self.load = load
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.miss_ttl_seconds = miss_ttl_seconds
+        # spot_id -> (expires at, version, snapshot), least recently read first
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._reloading = set()
+        self._lock = threading.Lock()
+
+    def publish(self, spot_id, snapshot: Any, version: int = 0) -> bool:
+        """Swap in a spot's snapshot unless a newer version is already cached
+
+        Returns:
+            bool: Whether the snapshot was swapped in
+        """
+        spot_id = str(spot_id)
+        snapshot = freeze(snapshot)
+        with self._lock:
+            current = self._entries.get(spot_id)
+            if current is not None and current[1] > version:
+                return False
+            ttl = self.ttl_seconds if snapshot is not None else self.miss_ttl_seconds
+            self._entries[spot_id] = (time.monotonic() + ttl, version, snapshot)
+            self._entries.move_to_end(spot_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, spot_id=None):
+        """Drop one spot's cached snapshot, or every snapshot"""
+        with self._lock:
+            if spot_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(spot_id), None)
+
+    def version(self, spot_id) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(str(spot_id))
+        return entry[1] if entry is not None else None
+
+    def get_many(self, spot_ids: Iterable) -> Dict[str, Any]:
+        """Latest snapshot for each spot, keyed by spot id string (None if the spot has none)
+
+        The snapshots are shared and read-only; copy one before changing it.
+        """
+        spot_ids = [str(spot_id) for spot_id in spot_ids]
+        now = time.monotonic()
+        snapshots, misses, expired = {}, [], []
+        with self._lock:
+            for spot_id in spot_ids:
+                entry = self._entries.get(spot_id)
+                if entry is None or (entry[2] is None and entry[0] <= now):
+                    misses.append(spot_id)
+                    continue
+                self._entries.move_to_end(spot_id)
+                snapshots[spot_id] = entry[2]
+                if entry[0] <= now and spot_id not in self._reloading:
+                    self._reloading.add(spot_id)
+                    expired.append(spot_id)
+        missed = set(misses)
+        for spot_id in spot_ids:
+            record_cache_lookup(self.name, hit=spot_id not in missed)
+
+        if expired:
+            threading.Thread(target=self._revalidate, args=(expired,), name=f"{self.name}-revalidate", daemon=True).start()
+        if misses:
+            snapshots.update(self._fill(list(dict.fromkeys(misses))))
+        return snapshots
+
+    def _fill(self, spot_ids: List[str]) -> Dict[str, Any]:
+        loaded = self.load(spot_ids)
+        for spot_id in spot_ids:
+            version, snapshot = loaded.get(spot_id, (0, None))
+            self.publish(spot_id, snapshot, version)
+        # Return what is cached now, which is newer if a refresh published while the load ran
+        # (or what was loaded, for spots already evicted again)
+        with self._lock:
+            return {
+                spot_id: self._entries[spot_id][2] if spot_id in self._entries else freeze(loaded.get(spot_id, (0, None))[1])
+                for spot_id in spot_ids
+            }
+
+    def _revalidate(self, spot_ids: List[str]):
+        try:
+            self._fill(spot_ids)
+        except Exception as e:
+            print(f"Error revalidating {self.name} cache, serving the last good snapshot: {e}")
+        finally:
+            with self._lock:
+                self._reloading.difference_update(spot_ids)
+
+
+def _row_version(row: Dict[str, Any]) -> int:
+    return row.get("version") or 0
+
+
+def load_latest_forecasts(spot_ids: List[str]) -> Dict[str, Tuple[int, Dict[str, Any]]]:
+    """The newest spot_forecasts row per spot, with one in_() query"""
+    supabase = get_supabase_client()
+    response = supabase.table("spot_forecasts").select("*").in_("spot_id", spot_ids) \
+        .order("version", desc=True).order("timestamp", desc=True).execute()
+    latest = {}
+    for row in response.data:
+        # Newest first, so keep the first row seen per spot
+        latest.setdefault(str(row["spot_id"]), (_row_version(row), row))
+    return latest
+
+
+def load_forecast_days(spot_ids: List[str]) -> Dict[str, Tuple[int, List[Dict[str, Any]]]]:
+    """Each spot's spot_forecast_days rows from its newest published version, by date"""
+    supabase = get_supabase_client()
+    response = supabase.table("spot_forecast_days").select("*").in_("spot_id", spot_ids) \
+        .order("version", desc=True).order("date").execute()
+    days = {}
+    for row in response.data:
+        version, rows = days.setdefault(str(row["spot_id"]), (_row_version(row), []))
+        # Rows from an older version linger only until the refresh that replaced them deletes them
+        if _row_version(row) == version:
+            rows.append(row)
+    return days
+
+
+class ForecastReadCache(SnapshotCache):
+    """Caches the latest spot_forecasts row per spot for read endpoints
+
+    Misses for many spots are filled with a single in_() query. The refresh
+    writes through with publish() as it stores each new forecast, so readers in
+    the same process see new forecasts without waiting for the TTL.
+    """
+
+    def __init__(self, ttl_seconds=FORECAST_CACHE_TTL_SECONDS):
+        super().__init__("spot_forecast", load_latest_forecasts, ttl_seconds)
+
+
+forecast_cache = ForecastReadCache()
+forecast_day_cache = SnapshotCache("spot_forecast_days", load_forecast_days)
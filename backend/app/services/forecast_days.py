@@ -0,0 +1,217 @@
+# app/services/forecast_days.py
+import os
+import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pytz
+
+from ..database import get_supabase_client
+from .units import to_local_by_zone
+from .forecast_cache import forecast_day_cache, next_version
+
+
+# Spots without a timezone column are assumed to be on the US west coast, like the seeded spots
+DEFAULT_SPOT_TIMEZONE = os.environ.get("DEFAULT_SPOT_TIMEZONE", "US/Pacific")
+
+SECONDS_PER_DAY = 86400
+
+COMPASS_POINTS = ("N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+                  "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW")
+
+
+def _group_stats(values: np.ndarray, order: np.ndarray, starts: np.ndarray):
+    """NaN-ignoring min, max and mean of each group of sorted rows"""
+    values = values[order].astype(np.float64)
+    valid = ~np.isnan(values)
+    counts = np.add.reduceat(valid, starts)
+    empty = counts == 0
+    minimums = np.minimum.reduceat(np.where(valid, values, np.inf), starts)
+    maximums = np.maximum.reduceat(np.where(valid, values, -np.inf), starts)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+    means = sums / np.where(empty, 1, counts)
+    minimums[empty] = maximums[empty] = means[empty] = np.nan
+    return minimums, maximums, means
+
+
+def _circular_mean(degrees: np.ndarray, order: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Mean direction of each group, so 350° and 10° average to 0° rather than 180°"""
+    radians = np.radians(degrees[order].astype(np.float64))
+    valid = ~np.isnan(radians)
+    sines = np.add.reduceat(np.where(valid, np.sin(radians), 0.0), starts)
+    cosines = np.add.reduceat(np.where(valid, np.cos(radians), 0.0), starts)
+    means = np.degrees(np.arctan2(sines, cosines)) % 360
+    means[np.add.reduceat(valid, starts) == 0] = np.nan
+    return means
+
+
+def aggregate_daily(snapshot, timezones: Dict[str, str]) -> Dict[str, np.ndarray]:
+    """Roll every spot's hourly forecast up into local calendar days in one pass
+
+    Args:
+        snapshot (ForecastSnapshot): Hourly forecasts for the spots to aggregate
+        timezones (dict): spot_id (str) -> IANA timezone name. Missing spots use DEFAULT_SPOT_TIMEZONE.
+
+    Returns:
+        dict: Columns with one entry per (spot, local day): "spot" (position in snapshot.index),
+            "day" (days since the epoch, local time), "hours" and min/max/mean statistics
+    """
+    records = snapshot.records
+    if not len(records):
+        return {}
+    spot_positions = np.empty(len(records), dtype=np.int64)
+    for position, entry in enumerate(snapshot.index):
+        spot_positions[int(entry["start"]):int(entry["stop"])] = position
+
+    # Shift each hour into its spot's local time, grouping spots by timezone
+    zone_names = np.array([timezones.get(spot_id) or DEFAULT_SPOT_TIMEZONE for spot_id in snapshot.spot_ids])
+    hour_zones = zone_names[spot_positions]
+    local_days = to_local_by_zone(records["time"], hour_zones) // SECONDS_PER_DAY
+
+    order = np.lexsort((local_days, spot_positions))
+    sorted_spots = spot_positions[order]
+    sorted_days = local_days[order]
+    boundaries = (np.diff(sorted_spots) != 0) | (np.diff(sorted_days) != 0)
+    starts = np.concatenate(([0], np.flatnonzero(boundaries) + 1))
+
+    wave_min, _, wave_mean = _group_stats(records["minimum_breaking_height"], order, starts)
+    _, wave_max, _ = _group_stats(records["maximum_breaking_height"], order, starts)
+    wind_min, wind_max, wind_mean = _group_stats(records["wind_speed"], order, starts)
+    temp_min, temp_max, temp_mean = _group_stats(records["air_temperature"], order, starts)
+
+    return {
+        "spot": sorted_spots[starts],
+        "day": sorted_days[starts],
+        "hours": np.diff(np.concatenate((starts, [len(order)]))),
+        "wave_height_min": wave_min,
+        "wave_height_max": wave_max,
+        "wave_height_mean": wave_mean,
+        "wind_speed_min": wind_min,
+        "wind_speed_max": wind_max,
+        "wind_speed_mean": wind_mean,
+        "wind_direction_mean": _circular_mean(records["wind_direction"], order, starts),
+        "air_temperature_min": temp_min,
+        "air_temperature_max": temp_max,
+        "air_temperature_mean": temp_mean,
+    }
+
+
+def _value(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else round(value, 2)
+
+
+def daily_rows(spots: List[Dict[str, Any]], snapshot, updated_at: Optional[datetime.datetime] = None) -> List[Dict[str, Any]]:
+    """Build spot_forecast_days rows for every spot in a snapshot
+
+    Args:
+        spots (list): Surf spot dicts; name and optional timezone are read from these
+        snapshot (ForecastSnapshot): The refresh's hourly forecasts
+        updated_at (datetime, optional): Stored as updated_at, defaults to now
+
+    Returns:
+        list: One row per spot and local day
+    """
+    spots_by_id = {str(spot["id"]): spot for spot in spots}
+    timezones = {spot_id: spot.get("timezone") for spot_id, spot in spots_by_id.items()}
+    columns = aggregate_daily(snapshot, timezones)
+    if not columns:
+        return []
+
+    updated_at = (updated_at or datetime.datetime.now(pytz.utc)).isoformat()
+    spot_ids = snapshot.spot_ids
+    statistics = [name for name in columns if name not in ("spot", "day", "hours")]
+    rows = []
+    for i, (position, day) in enumerate(zip(columns["spot"], columns["day"])):
+        spot_id = spot_ids[position]
+        spot = spots_by_id.get(spot_id, {})
+        date = datetime.date(1970, 1, 1) + datetime.timedelta(days=int(day))
+        row = {
+            "spot_id": spot.get("id", spot_id),
+            "spot_name": spot.get("name"),
+            "date": date.isoformat(),
+            "day": date.strftime("%A"),
+            "timezone": spot.get("timezone") or DEFAULT_SPOT_TIMEZONE,
+            "hours": int(columns["hours"][i]),
+            "updated_at": updated_at
+        }
+        for name in statistics:
+            row[name] = _value(columns[name][i])
+        rows.append(row)
+    return rows
+
+
+def store_daily_forecasts(spots: List[Dict[str, Any]], snapshot):
+    """Replace the stored daily forecasts for every spot in the snapshot
+
+    Args:
+        spots (list): Surf spot dicts that were refreshed
+        snapshot (ForecastSnapshot): The refresh's hourly forecasts
+
+    Returns:
+        int: Number of daily rows written
+    """
+    return publish_daily_rows(daily_rows(spots, snapshot))
+
+
+def publish_daily_rows(rows: List[Dict[str, Any]], version: Optional[int] = None) -> int:
+    """Replace the stored daily forecasts of the spots in `rows`
+
+    The new days are inserted under a new version and only then are older
+    versions deleted; readers take each spot's newest version, so the swap is
+    atomic for them and a spot never reads as having no forecast.
+
+    Args:
+        rows (list): spot_forecast_days rows, as built by daily_rows
+        version (int, optional): Version to publish under, new if not given
+
+    Returns:
+        int: Number of daily rows written
+    """
+    if not rows:
+        return 0
+
+    version = version or next_version()
+    rows = [{**row, "version": version} for row in rows]
+    supabase = get_supabase_client()
+    spot_ids = list({row["spot_id"] for row in rows})
+    supabase.table("spot_forecast_days").insert(rows).execute()
+    supabase.table("spot_forecast_days").delete().in_("spot_id", spot_ids).lt("version", version).execute()
+
+    by_spot: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_spot.setdefault(str(row["spot_id"]), []).append(row)
+    for spot_id, days in by_spot.items():
+        forecast_day_cache.publish(spot_id, sorted(days, key=lambda day: day["date"]), version)
+    return len(rows)
+
+
+def compass_point(degrees: Optional[float]) -> str:
+    """Convert a direction in degrees to a 16-point compass label"""
+    if degrees is None:
+        return ""
+    return COMPASS_POINTS[int((degrees % 360) / 22.5 + 0.5) % 16]
+
+
+def to_forecast_day(row: Dict[str, Any]):
+    """Format a stored spot_forecast_days row as the API's ForecastDay"""
+    from ..models import ForecastDay
+
+    low, high = row.get("wave_height_min"), row.get("wave_height_max")
+    if low is None and high is None:
+        wave_height = "N/A"
+    else:
+        low = low if low is not None else high
+        high = high if high is not None else low
+        wave_height = f"{low:.0f}-{high:.0f} ft" if round(low) != round(high) else f"{low:.0f} ft"
+
+    wind_speed = row.get("wind_speed_mean")
+    wind = "N/A" if wind_speed is None else f"{wind_speed:.0f} mph {compass_point(row.get('wind_direction_mean'))}".strip()
+
+    return ForecastDay(
+        day=row["day"],
+        date=row["date"],
+        waveHeight=wave_height,
+        wind=wind,
+        temperature=row.get("air_temperature_max")
+    )
@@ -0,0 +1,349 @@
+# app/services/forecast_deltas.py
+import os
+import json
+import threading
+import datetime
+from collections import OrderedDict
+from datetime import timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .forecast_snapshot import FORECAST_DTYPE, empty_records
+
+
+# One delta log per spot, holding its recent runs
+FORECAST_DELTA_DIR = os.environ.get(
+    "FORECAST_DELTA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "archive", "deltas")
+)
+# Most runs kept per spot; a log that would hold more is rewritten with only the newest half, starting
+# from a full run, so between max/2 and max runs are kept and rewrites happen every max/2 appends
+DELTA_MAX_RUNS = int(os.environ.get("FORECAST_DELTA_MAX_RUNS", "16"))
+# Spots whose decoded runs are kept in memory between appends and reads
+OPEN_SPOTS = 256
+
+# Quantization step of each field, in the stored English units (ft, mph, s, degrees, F)
+QUANTUM = {
+    "wind_speed": 0.1,
+    "wind_direction": 1.0,
+    "minimum_breaking_height": 0.1,
+    "maximum_breaking_height": 0.1,
+    "wave_height": 0.1,
+    "wave_period": 0.1,
+    "wave_direction": 1.0,
+    "swell_height": 0.1,
+    "swell_period": 0.1,
+    "swell_direction": 1.0,
+    "air_temperature": 0.1,
+    "tide": 0.01,
+}
+
+# (field, swell component or None) for each encoded column, in FORECAST_DTYPE order
+COLUMNS = [
+    (name, component)
+    for name in FORECAST_DTYPE.names if name != "time"
+    for component in (range(FORECAST_DTYPE[name].shape[0]) if FORECAST_DTYPE[name].shape else [None])
+]
+
+_VARINT_BYTES = 10
+
+
+def zigzag(values: np.ndarray) -> np.ndarray:
+    """Map signed ints to unsigned so small magnitudes of either sign get short varints"""
+    values = np.asarray(values, dtype=np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def unzigzag(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=np.uint64)
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """LEB128-encode unsigned ints, 7 bits per byte with the high bit marking continuation"""
+    values = np.asarray(values, dtype=np.uint64)
+    if not len(values):
+        return b""
+    groups = np.empty((len(values), _VARINT_BYTES), dtype=np.uint8)
+    lengths = np.ones(len(values), dtype=np.int64)
+    remaining = values.copy()
+    for k in range(_VARINT_BYTES):
+        if k:
+            lengths[remaining > 0] = k + 1
+        groups[:, k] = (remaining & np.uint64(0x7F)).astype(np.uint8)
+        remaining = remaining >> np.uint64(7)
+    positions = np.arange(_VARINT_BYTES)
+    groups[positions < (lengths - 1)[:, None]] |= 0x80
+    return groups[positions < lengths[:, None]].tobytes()
+
+
+def decode_varints(data: bytes) -> np.ndarray:
+    """Decode a buffer of LEB128 varints"""
+    encoded = np.frombuffer(data, dtype=np.uint8)
+    if not len(encoded):
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(encoded < 0x80)
+    if not len(ends) or ends[-1] != len(encoded) - 1:
+        raise ValueError("Truncated varint")
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    owner = np.repeat(np.arange(len(starts)), ends - starts + 1)
+    shifts = ((np.arange(len(encoded)) - starts[owner]) * 7).astype(np.uint64)
+    # The 7-bit groups of a value don't overlap, so summing them is OR-ing them
+    return np.add.reduceat((encoded & 0x7F).astype(np.uint64) << shifts, starts)
+
+
+def pack_zero_runs(values: np.ndarray) -> np.ndarray:
+    """Collapse runs of zeros: a run of n zeros becomes n << 1 | 1, any other value v becomes v << 1"""
+    values = np.asarray(values, dtype=np.uint64)
+    if not len(values):
+        return values
+    zero = values == 0
+    starts = zero & ~np.concatenate(([False], zero[:-1]))
+    run_lengths = np.bincount((np.cumsum(starts) - 1)[zero], minlength=int(starts.sum()))
+    tokens = values << np.uint64(1)
+    tokens[starts] = (run_lengths.astype(np.uint64) << np.uint64(1)) | np.uint64(1)
+    return tokens[~zero | starts]
+
+
+def unpack_zero_runs(tokens: np.ndarray) -> np.ndarray:
+    tokens = np.asarray(tokens, dtype=np.uint64)
+    run = (tokens & np.uint64(1)).astype(bool)
+    values = np.where(run, np.uint64(0), tokens >> np.uint64(1))
+    counts = np.where(run, tokens >> np.uint64(1), np.uint64(1)).astype(np.int64)
+    return np.repeat(values, counts)
+
+
+def _read_varint(buffer: bytes, position: int) -> Tuple[int, int]:
+    value, shift = 0, 0
+    while True:
+        if position >= len(buffer):
+            raise ValueError("Truncated varint")
+        byte = buffer[position]
+        value |= (byte & 0x7F) << shift
+        position += 1
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def quantize(records: np.ndarray) -> np.ndarray:
+    """(hours, columns) codes: 0 for a missing value, otherwise zigzag(value / quantum) + 1"""
+    codes = np.zeros((len(records), len(COLUMNS)), dtype=np.uint64)
+    for index, (name, component) in enumerate(COLUMNS):
+        values = records[name] if component is None else records[name][:, component]
+        values = values.astype(np.float64)
+        present = ~np.isnan(values)
+        steps = np.rint(np.where(present, values, 0.0) / QUANTUM[name]).astype(np.int64)
+        codes[:, index] = np.where(present, zigzag(steps) + np.uint64(1), np.uint64(0))
+    return codes
+
+
+def dequantize(times: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Records from quantized codes, with values rounded to their field's quantum"""
+    records = empty_records(len(times))
+    records["time"] = times
+    for index, (name, component) in enumerate(COLUMNS):
+        column = codes[:, index]
+        values = np.where(column > 0, unzigzag(np.maximum(column, np.uint64(1)) - np.uint64(1)) * QUANTUM[name], np.nan)
+        if component is None:
+            records[name] = values
+        else:
+            records[name][:, component] = values
+    return records
+
+
+def _aligned(times: np.ndarray, previous: Optional[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+    """The previous run's codes for each of `times`, zero where the previous run had no such hour"""
+    aligned = np.zeros((len(times), len(COLUMNS)), dtype=np.uint64)
+    if previous is None or not len(previous[0]):
+        return aligned
+    previous_times, previous_codes = previous
+    positions = np.clip(np.searchsorted(previous_times, times), 0, len(previous_times) - 1)
+    found = previous_times[positions] == times
+    aligned[found] = previous_codes[positions[found]]
+    return aligned
+
+
+def encode_run(header: Dict[str, Any], times: np.ndarray, codes: np.ndarray,
+               previous: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> bytes:
+    """Encode one run of a spot as a frame, XOR-ed against the previous run's codes for the same hours
+
+    Consecutive runs overlap in most hours and change little, so most XOR-ed
+    codes are 0. Codes are written column by column, which keeps those zeros
+    together, and each run of zeros is packed into a single varint. Times are
+    stored as the first time then gaps.
+
+    Frame: varint header length, JSON header, varint payload length, payload
+    Payload: varints of [hours, first time, gaps..., zero-run packed xor codes column by column]
+    """
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    gaps = np.diff(times.astype(np.int64), prepend=np.int64(0))
+    payload = encode_varints(np.concatenate((
+        np.array([len(times)], dtype=np.uint64),
+        zigzag(gaps),
+        pack_zero_runs((codes ^ _aligned(times, previous)).T.ravel()),
+    )))
+    return encode_varints(np.array([len(header_bytes)])) + header_bytes + \
+        encode_varints(np.array([len(payload)])) + payload
+
+
+def decode_runs(buffer: bytes) -> Tuple[List[Tuple[Dict[str, Any], np.ndarray, np.ndarray]], int]:
+    """Decode a delta log into (header, times, codes) per run
+
+    Returns:
+        tuple: (runs, bytes decoded); a torn frame at the end (from an interrupted append) is dropped
+    """
+    runs = []
+    position = 0
+    previous = None
+    while position < len(buffer):
+        start = position
+        try:
+            length, position = _read_varint(buffer, position)
+            header = json.loads(buffer[position:position + length].decode("utf-8"))
+            position += length
+            length, position = _read_varint(buffer, position)
+            if position + length > len(buffer):
+                raise ValueError("Truncated frame")
+            values = decode_varints(buffer[position:position + length])
+            hours = int(values[0])
+            times = np.cumsum(unzigzag(values[1:1 + hours]))
+            codes = unpack_zero_runs(values[1 + hours:]).reshape(len(COLUMNS), hours).T ^ _aligned(times, previous)
+            position += length
+        except (ValueError, IndexError) as e:
+            print(f"Ignoring unreadable end of forecast delta log: {e}")
+            return runs, start
+        previous = (times, codes)
+        runs.append((header, times, codes))
+    return runs, position
+
+
+class ForecastDeltaStore(object):
+    """Per-spot log of recent runs, each stored as a delta against the spot's previous run
+
+    Values are quantized to QUANTUM, XOR-ed with the previous run's value for
+    the same hour and varint-encoded with runs of zeros packed, so unchanged
+    stretches of a field cost a byte or two. Each refresh appends one frame
+    per spot; once a log would hold more than max_runs runs it is compacted to
+    the newest max_runs // 2, re-encoded from a full first run. Halving rather
+    than dropping one run keeps the rewrite to once every max_runs // 2
+    appends instead of on every append once the log is full. The same encoding lets changes() answer "what changed since run
+    X" with only the hours whose quantized values differ.
+    """
+
+    def __init__(self, root: str = FORECAST_DELTA_DIR, max_runs: int = DELTA_MAX_RUNS):
+        self.root = root
+        self.max_runs = max_runs
+        # Runs a full log is compacted down to
+        self.compact_runs = max(max_runs // 2, 1)
+        self._lock = threading.Lock()
+        self._open: "OrderedDict[str, List[Tuple[Dict[str, Any], np.ndarray, np.ndarray]]]" = OrderedDict()
+        # Spots whose log ends in a torn frame, which must be rewritten rather than appended to
+        self._torn = set()
+
+    def _path(self, spot_id) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(spot_id))
+        return os.path.join(self.root, f"{safe}.delta")
+
+    def _runs(self, spot_id) -> List[Tuple[Dict[str, Any], np.ndarray, np.ndarray]]:
+        """Decoded runs of a spot, oldest first. Caller must hold the lock."""
+        spot_id = str(spot_id)
+        runs = self._open.get(spot_id)
+        if runs is not None:
+            self._open.move_to_end(spot_id)
+            return runs
+        try:
+            with open(self._path(spot_id), "rb") as infile:
+                buffer = infile.read()
+            runs, decoded = decode_runs(buffer)
+            if decoded < len(buffer):
+                self._torn.add(spot_id)
+        except FileNotFoundError:
+            runs = []
+        self._open[spot_id] = runs
+        while len(self._open) > OPEN_SPOTS:
+            self._open.popitem(last=False)
+        return runs
+
+    def append(self, snapshot) -> int:
+        """Append a refresh to each of its spots' logs
+
+        Args:
+            snapshot (ForecastSnapshot): The refresh's hourly forecasts; meta["run_id"] names the run
+
+        Returns:
+            int: Bytes written
+        """
+        run_id = snapshot.meta.get("run_id")
+        header = {"run_id": run_id, "created_at": int(datetime.datetime.now(timezone.utc).timestamp())}
+        written = 0
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            for spot_id in snapshot.spot_ids:
+                records = snapshot.get(spot_id)
+                records = records[np.argsort(records["time"], kind="stable")]
+                run = (header, records["time"].astype(np.int64), quantize(records))
+                previous_runs = self._runs(spot_id)
+                runs = [kept for kept in previous_runs if kept[0]["run_id"] != run_id] + [run]
+                path = self._path(spot_id)
+                rewrite = len(runs) == 1 or len(runs) > self.max_runs or len(runs) <= len(previous_runs) or \
+                    str(spot_id) in self._torn
+                if rewrite:
+                    if len(runs) > self.max_runs:
+                        runs = runs[-self.compact_runs:]
+                    frames = []
+                    for index, (kept_header, times, codes) in enumerate(runs):
+                        previous = runs[index - 1][1:] if index else None
+                        frames.append(encode_run(kept_header, times, codes, previous))
+                    data = b"".join(frames)
+                    with open(path + ".tmp", "wb") as outfile:
+                        outfile.write(data)
+                    os.replace(path + ".tmp", path)
+                    self._torn.discard(str(spot_id))
+                else:
+                    data = encode_run(header, run[1], run[2], runs[-2][1:])
+                    with open(path, "ab") as outfile:
+                        outfile.write(data)
+                written += len(data)
+                self._open[str(spot_id)] = runs
+        return written
+
+    def run_ids(self, spot_id) -> List[str]:
+        with self._lock:
+            return [header["run_id"] for header, _, _ in self._runs(spot_id)]
+
+    def changes(self, spot_id, since_run: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Hours of a spot's latest run that differ from run `since_run`
+
+        Returns:
+            dict: {"run_id", "created_at", "full", "records", "removed"}, where records
+                are the changed (or, if since_run isn't in the log, all) hours and removed
+                the times since_run had that the latest run doesn't. None if the spot has no runs.
+        """
+        with self._lock:
+            runs = self._runs(spot_id)
+            if not runs:
+                return None
+            header, times, codes = runs[-1]
+            base = next((run for run in runs if run[0]["run_id"] == since_run), None)
+
+        if base is None:
+            changed = np.ones(len(times), dtype=bool)
+            removed = np.zeros(0, dtype=np.int64)
+        else:
+            _, base_times, base_codes = base
+            aligned = _aligned(times, (base_times, base_codes))
+            new = ~np.isin(times, base_times)
+            changed = new | np.any(codes != aligned, axis=1)
+            removed = base_times[~np.isin(base_times, times)]
+        return {
+            "run_id": header["run_id"],
+            "created_at": header["created_at"],
+            "full": base is None,
+            "records": dequantize(times[changed], codes[changed]),
+            "removed": removed,
+        }
+
+
+forecast_delta_store = ForecastDeltaStore()
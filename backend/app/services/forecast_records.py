@@ -0,0 +1,150 @@
+# app/services/forecast_records.py
+import math
+import datetime
+from datetime import timezone
+from typing import Any, Dict, Optional, Tuple
+
+from .forecast_snapshot import MAX_SWELL_COMPONENTS, to_records
+
+
+# Names used for swell components in stored rows and API responses
+SWELL_COMPONENT_NAMES = ("primary", "secondary", "tertiary")
+
+
+def _value(value) -> Optional[float]:
+    """Convert a stored float32 to a JSON-friendly value (NaN becomes None)
+
+    Rounded to 3 decimals so float32 noise (312.8999938...) doesn't leak into rows.
+    """
+    value = float(value)
+    return None if math.isnan(value) else round(value, 3)
+
+
+class SwellRecord(object):
+    """One swell component of a forecast hour"""
+
+    __slots__ = ("height", "period", "direction")
+
+    def __init__(self, height, period, direction):
+        self.height = height
+        self.period = period
+        self.direction = direction
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        return {"height": self.height, "period": self.period, "direction": self.direction}
+
+
+class ForecastHourRecord(object):
+    """A single forecast hour for a spot, holding only the fields the app serves"""
+
+    __slots__ = ("time", "wave_height", "max_wave_height", "tide", "wind_speed", "wind_direction", "swells")
+
+    def __init__(self, time, wave_height, max_wave_height, wind_speed, wind_direction, swells: Tuple[SwellRecord, ...], tide=None):
+        self.time = time
+        self.wave_height = wave_height
+        self.max_wave_height = max_wave_height
+        self.tide = tide
+        self.wind_speed = wind_speed
+        self.wind_direction = wind_direction
+        self.swells = swells
+
+    def swell_components(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Swell components keyed primary/secondary/tertiary, as stored in spot_forecasts"""
+        return {name: swell.to_dict() for name, swell in zip(SWELL_COMPONENT_NAMES, self.swells)}
+
+    def to_model(self):
+        """Convert to the Pydantic API model. Only call this at the API edge."""
+        from ..models import ForecastHour, SwellComponent
+
+        return ForecastHour(
+            time=self.time,
+            wave_height=self.wave_height,
+            max_wave_height=self.max_wave_height,
+            tide=self.tide,
+            wind_speed=self.wind_speed,
+            wind_direction=self.wind_direction,
+            swell_components={
+                name: SwellComponent(**swell.to_dict()) for name, swell in zip(SWELL_COMPONENT_NAMES, self.swells)
+            }
+        )
+
+
+class SpotForecastSeries(object):
+    """A spot's hourly forecast, backed by a FORECAST_DTYPE records array
+
+    The refresh converts surfpy's BuoyData objects into this once and drops them,
+    so thousands of spot-hours cost a few dozen bytes each instead of a full
+    Python object graph per hour. Hour records and API models are only built
+    on demand.
+    """
+
+    __slots__ = ("spot_id", "records", "unit", "fetched_at")
+
+    def __init__(self, spot_id, records, unit: str, fetched_at: Optional[datetime.datetime] = None):
+        self.spot_id = spot_id
+        self.records = records
+        self.unit = unit
+        self.fetched_at = fetched_at or datetime.datetime.now(timezone.utc)
+
+    @classmethod
+    def from_buoy_data(cls, spot_id, data, unit: str):
+        """Build a series from surfpy.BuoyData, keeping only the served fields"""
+        return cls(spot_id, to_records(data), unit)
+
+    def __len__(self):
+        return len(self.records)
+
+    def corrected(self, factor: float):
+        """A copy with breaking heights scaled by a verification correction factor"""
+        records = self.records.copy()
+        records["minimum_breaking_height"] *= factor
+        records["maximum_breaking_height"] *= factor
+        return SpotForecastSeries(self.spot_id, records, self.unit, self.fetched_at)
+
+    def to_units(self, unit: str):
+        """This series in another unit system, converting whole columns at once"""
+        from .units import convert_records
+
+        if unit == self.unit:
+            return self
+        return SpotForecastSeries(self.spot_id, convert_records(self.records, self.unit, unit), unit, self.fetched_at)
+
+    def hour(self, index: int) -> ForecastHourRecord:
+        row = self.records[index]
+        swells = tuple(
+            SwellRecord(_value(row["swell_height"][j]), _value(row["swell_period"][j]), _value(row["swell_direction"][j]))
+            for j in range(MAX_SWELL_COMPONENTS)
+            if not math.isnan(row["swell_height"][j])
+        )
+        return ForecastHourRecord(
+            time=datetime.datetime.fromtimestamp(int(row["time"]), tz=timezone.utc),
+            wave_height=_value(row["minimum_breaking_height"]),
+            max_wave_height=_value(row["maximum_breaking_height"]),
+            wind_speed=_value(row["wind_speed"]),
+            wind_direction=_value(row["wind_direction"]),
+            swells=swells,
+            tide=_value(row["tide"])
+        )
+
+    def hours(self):
+        for index in range(len(self.records)):
+            yield self.hour(index)
+
+    def current(self) -> Optional[ForecastHourRecord]:
+        """The first forecast hour, which is what spot_forecasts stores"""
+        return self.hour(0) if len(self.records) else None
+
+    def to_row(self) -> Optional[Dict[str, Any]]:
+        """Build the spot_forecasts row for the current hour"""
+        current = self.current()
+        if current is None:
+            return None
+        return {
+            "spot_id": self.spot_id,
+            "timestamp": self.fetched_at.isoformat(),
+            "wave_height": current.wave_height,  # Using min breaking height as requested
+            "tide": current.tide,
+            "wind_speed": current.wind_speed,
+            "wind_direction": current.wind_direction,
+            "swell_components": current.swell_components()
+        }
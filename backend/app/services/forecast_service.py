@@ -1,81 +1,103 @@
 # app/services/forecast_service.py
 import os
+import time
+import uuid
 import datetime
 from datetime import timezone
 import json
 import pytz
-import surfpy
-from supabase import create_client, Client
 from typing import List, Dict, Any, Optional
 
+from ..database import get_supabase_client
+from .weather_cache import weather_cache
+from .forecast_cache import forecast_cache, next_version
+from .metrics import time_phase, record_refresh_run
+from .refresh_events import refresh_events
+from .refresh_trace import refresh_tracer
+from .refresh_retries import retry_queue, failure_reason
+from .upstream import install_upstream_replay
 
-def tune_spot(location):
-    """Tune surf location parameters based on spot name
+# Wave model time steps fetched per refresh (hourly for the GFS wave models), enough for the multi-day
+# summaries and best-time index to cover whole days rather than the rest of today
+FORECAST_HOURS = int(os.environ.get("FORECAST_HOURS", "120"))
+
+
+def spot_tuning(name):
+    """Look up wave model parameters for a spot based on its name
     
     Args:
-        location (surfpy.Location): The surf location to tune parameters for
+        name (str): Spot name
+        
+    Returns:
+        dict: depth (meters), angle (degrees the beach faces) and slope
     """
-    # Default values if no specific tuning is applied
-    default_depth = 30.0  # meters
-    default_angle = 195.0  # degrees (South-Southwest facing)
-    default_slope = 0.02  # beach slope
-    
-    # Spot-specific tuning based on name
-    name = location.name.lower() if location.name else ""
+    name = name.lower() if name else ""
     
     if "shell beach" in name:
-        # Shell Beach parameters
-        location.depth = 30.0  # Using default depth without specific buoy data
-        location.angle = 195.0  # South-Southwest facing
-        location.slope = 0.01
+        # Shell Beach parameters - South-Southwest facing
+        return {"depth": 30.0, "angle": 195.0, "slope": 0.01}
         
     elif "pismo beach" in name:
-        # Pismo Beach parameters - more gradual slope than Shell Beach
-        location.depth = 30.0  # Using default depth without specific buoy data
-        location.angle = 225.0  # Southwest facing
-        location.slope = 0.005  # More gradual slope
+        # Pismo Beach parameters - Southwest facing, more gradual slope than Shell Beach
+        return {"depth": 30.0, "angle": 225.0, "slope": 0.005}
         
     elif "morro bay" in name:
-        # Morro Bay parameters - protected bay
-        location.depth = 30.0  # Using default depth without specific buoy data
-        location.angle = 270.0  # West facing
-        location.slope = 0.015
+        # Morro Bay parameters - protected bay, West facing
+        return {"depth": 30.0, "angle": 270.0, "slope": 0.015}
         
-    else:
-        # Use default parameters for unknown spots
-        location.depth = default_depth
-        location.angle = default_angle
-        location.slope = default_slope
+    # Default parameters for unknown spots (South-Southwest facing)
+    return {"depth": 30.0, "angle": 195.0, "slope": 0.02}
+
+def tune_spot(location):
+    """Tune surf location parameters based on spot name
+    
+    Args:
+        location (surfpy.Location): The surf location to tune parameters for
+    """
+    tuning = spot_tuning(location.name)
+    location.depth = tuning["depth"]  # Using default depth without specific buoy data
+    location.angle = tuning["angle"]
+    location.slope = tuning["slope"]
     
     print(f"Tuned parameters for {location.name}: depth={location.depth}m, angle={location.angle}°, slope={location.slope}")
 
-# initialize Supabase client
-supabase_url = os.environ.get("SUPABASE_URL")
-supabase_key = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
-
 def get_all_surf_spots():
     """Retrieve all surf spots from the database"""
+    supabase = get_supabase_client()
     response = supabase.table("surf_spots").select("*").execute()
     return response.data
 
-def fetch_forecast_for_spot(spot):
-    """Fetch forecast data for a specific spot using surfpy
+def spot_location(spot):
+    """surfpy.Location for a spot, before any wave model tuning"""
+    import surfpy
+
+    return surfpy.Location(spot["latitude"], spot["longitude"], altitude=0.0, name=spot["name"])
+
+def fetch_forecast_series_for_spot(spot, wave_model=None, weather_source=None):
+    """Fetch the hourly forecast series for a specific spot using surfpy
+    
+    surfpy's BuoyData objects are converted into a compact SpotForecastSeries as
+    soon as breaking wave heights are solved, and dropped.
     
     Args:
         spot (dict): Surf spot data containing id, name, latitude, longitude
+        wave_model (surfpy.WaveModel, optional): Wave model to fetch from. Defaults to the US west coast GFS model.
+        weather_source (optional): Object with get_hourly_forecast(location). Defaults to the shared weather cache.
         
     Returns:
-        dict: Forecast data for the current timestamp with wave height, tide, wind, and swell components
+        SpotForecastSeries: Hourly forecast in English units, or None if the fetch failed
     """
+    # surfpy pulls in pygrib, numpy and pyproj, so only import it when a refresh actually runs
+    import surfpy
+    from .forecast_records import SpotForecastSeries
+    from .tides import fill_tides
+
+    # Fetch from the record/replay server instead of NOMADS and weather.gov when one is configured
+    install_upstream_replay()
+
     try:
         # Create surfpy location objects for wave and wind data
-        surf_location = surfpy.Location(
-            spot["latitude"], 
-            spot["longitude"], 
-            altitude=0.0, 
-            name=spot["name"]
-        )
+        surf_location = spot_location(spot)
         
         # Set default wave model parameters
         surf_location.depth = 30.0  # Default depth in meters
@@ -86,76 +108,69 @@ def fetch_forecast_for_spot(spot):
         tune_spot(surf_location)
         
         # Initialize the west coast wave model
-        west_coast_wave_model = surfpy.wavemodel.us_west_coast_gfs_wave_model()
+        west_coast_wave_model = wave_model or surfpy.wavemodel.us_west_coast_gfs_wave_model()
         
         print(f'Fetching GFS Wave Data for {spot["name"]}')
-        # Get forecast for the next 24 hours
-        wave_grib_data = west_coast_wave_model.fetch_grib_datas(0, 24, surf_location)
-        raw_wave_data = west_coast_wave_model.parse_grib_datas(surf_location, wave_grib_data)
+        # Get forecast for the next FORECAST_HOURS hours
+        with time_phase("grib_fetch"):
+            wave_grib_data = west_coast_wave_model.fetch_grib_datas(0, FORECAST_HOURS, surf_location)
+        with time_phase("grib_parse"):
+            raw_wave_data = west_coast_wave_model.parse_grib_datas(surf_location, wave_grib_data)
         
         if not raw_wave_data:
             print(f'Failed to fetch wave forecast data for {spot["name"]}')
             return None
             
         # Convert raw wave data to buoy data format
-        data = west_coast_wave_model.to_buoy_data(raw_wave_data)
+        with time_phase("to_buoy_data"):
+            data = west_coast_wave_model.to_buoy_data(raw_wave_data)
         
-        # Fetch weather data (wind)
+        # Fetch weather data (wind), shared between spots in the same NWS grid cell
         print(f'Fetching local weather data for {spot["name"]}')
-        weather_data = surfpy.WeatherApi.fetch_hourly_forecast(surf_location)
+        with time_phase("weather_fetch"):
+            weather_data = (weather_source or weather_cache).get_hourly_forecast(surf_location)
         
         # Merge wave and weather data
         if weather_data:
-            surfpy.merge_wave_weather_data(data, weather_data)
+            with time_phase("merge"):
+                surfpy.merge_wave_weather_data(data, weather_data)
         
         # Calculate breaking wave heights
-        for dat in data:
-            dat.solve_breaking_wave_heights(surf_location)
-            dat.change_units(surfpy.units.Units.english)  # Convert to English units (feet)
-        
-        # Get the current forecast (first item in the data array)
-        if len(data) > 0:
-            current_forecast = data[0]
-            
-            # TODO: Add tide data fetching logic back in
-            tide_value = None
-            tide_station_id = None
-            tide_station_name = None
-            
-            # Extract the required data for our forecast
-            forecast = {
-                "spot_id": spot["id"],
-                "timestamp": datetime.datetime.now(timezone.utc).isoformat(),
-                "wave_height": current_forecast.minimum_breaking_height,  # Using min breaking height as requested
-                "tide": tide_value,
-                "wind_speed": current_forecast.wind_speed,
-                "wind_direction": current_forecast.wind_direction,
-                "swell_components": {}
-            }
-            
-            # Extract swell components (up to 3)
-            if hasattr(current_forecast, 'swell_components') and current_forecast.swell_components:
-                swell_components = current_forecast.swell_components
-                component_names = ["primary", "secondary", "tertiary"]
-                
-                for i, component_name in enumerate(component_names):
-                    if i < len(swell_components):
-                        swell = swell_components[i]
-                        forecast["swell_components"][component_name] = {
-                            "height": swell.wave_height,
-                            "period": swell.period,
-                            "direction": swell.direction
-                        }
-            
-            return forecast
-        else:
+        with time_phase("breaking_wave_solve"):
+            for dat in data:
+                dat.solve_breaking_wave_heights(surf_location)
+
+        if len(data) == 0:
             print(f"No forecast data available for {spot['name']}")
             return None
+
+        # Convert to English units (feet, mph) column-wise rather than per BuoyData
+        with time_phase("to_records"):
+            series = SpotForecastSeries.from_buoy_data(spot["id"], data, data[0].unit).to_units(surfpy.units.Units.english)
+
+        # Interpolate water level from the station's high/low predictions, shared between spots per station
+        with time_phase("tide_fetch"):
+            fill_tides([spot], {spot["id"]: series.records}, series.unit, locations={spot["id"]: surf_location})
+        return series
             
     except Exception as e:
         print(f"Error fetching forecast for {spot['name']}: {e}")
         return None
 
+def fetch_forecast_for_spot(spot, wave_model=None, weather_source=None):
+    """Fetch forecast data for a specific spot using surfpy
+    
+    Args:
+        spot (dict): Surf spot data containing id, name, latitude, longitude
+        wave_model (surfpy.WaveModel, optional): See fetch_forecast_series_for_spot
+        weather_source (optional): See fetch_forecast_series_for_spot
+        
+    Returns:
+        dict: Forecast data for the current timestamp with wave height, tide, wind, and swell components
+    """
+    series = fetch_forecast_series_for_spot(spot, wave_model=wave_model, weather_source=weather_source)
+    return series.to_row() if series else None
+
 def process_forecast_data(forecast_data):
     """Process forecast data into our database format
     
@@ -172,33 +187,238 @@ def process_forecast_data(forecast_data):
 def update_spot_forecast(spot_id, forecast):
     """Update the forecast data for a specific spot
     
+    The new row is inserted under a new version before older versions are
+    deleted, and readers take the newest version, so the spot always has a
+    forecast to serve while it is replaced.
+    
     Args:
         spot_id (str): ID of the surf spot
         forecast (dict): Forecast data for the spot
     """
-    # First, delete old forecasts for this spot
-    now = datetime.datetime.now(timezone.utc).isoformat()
-    supabase.table("spot_forecasts").delete().eq("spot_id", spot_id).execute()
+    supabase = get_supabase_client()
+    version = next_version()
+    row = {**forecast, "version": version}
+
+    with time_phase("db_write"):
+        supabase.table("spot_forecasts").insert(row).execute()
+        supabase.table("spot_forecasts").delete().eq("spot_id", spot_id).lt("version", version).execute()
     
-    # Then insert the new forecast
-    supabase.table("spot_forecasts").insert(forecast).execute()
+    # Write through so read endpoints serve the new forecast immediately
+    forecast_cache.publish(spot_id, row, version)
+    refresh_events.publish("forecast", {"spot_id": spot_id, "forecast": row})
 
-def update_all_spot_forecasts():
-    """Update forecasts for all spots"""
-    spots = get_all_surf_spots()
+def publish_spot_forecasts(forecasts, version=None):
+    """Publish forecast rows for many spots at once under one version
+    
+    Like update_spot_forecast, but with one insert and one delete for all the
+    spots, e.g. when a sharded run that staged its rows completes.
+    
+    Args:
+        forecasts (list): spot_forecasts rows, each with its spot_id
+        version (int, optional): Version to publish under, new if not given
+    
+    Returns:
+        int: The version published
+    """
+    version = version or next_version()
+    if not forecasts:
+        return version
+    rows = [{**forecast, "version": version} for forecast in forecasts]
+    supabase = get_supabase_client()
+
+    with time_phase("db_write"):
+        supabase.table("spot_forecasts").insert(rows).execute()
+        supabase.table("spot_forecasts").delete().in_("spot_id", list({row["spot_id"] for row in rows})) \
+            .lt("version", version).execute()
+    
+    for row in rows:
+        forecast_cache.publish(row["spot_id"], row, version)
+        refresh_events.publish("forecast", {"spot_id": row["spot_id"], "forecast": row})
+    return version
+
+def update_daily_forecasts(spots, snapshot):
+    """Post-refresh stage: precompute and store per-day summaries for the refreshed spots"""
+    from .forecast_days import store_daily_forecasts
+
+    with time_phase("daily_aggregate"):
+        store_daily_forecasts(spots, snapshot)
+
+def update_best_times(spots, snapshot):
+    """Post-refresh stage: rescore the refreshed spots for the best-time-to-surf ranking"""
+    from .best_time import best_time_index
+
+    with time_phase("best_time_score"):
+        best_time_index.update(spots, snapshot)
+
+def archive_forecasts(spots, snapshot):
+    """Post-refresh stage: append the refresh to the historical forecast archive"""
+    from .forecast_archive import forecast_archive
+
+    with time_phase("archive_write"):
+        forecast_archive.append(snapshot)
+
+def apply_forecast_corrections(spots, snapshot):
+    """Post-refresh stage: scale breaking heights by each spot's verification correction factor
+    
+    Runs after archiving so the archive keeps the raw model output that
+    verification compares reviews against.
+    """
+    for spot_id, factor in snapshot.meta.get("corrections", {}).items():
+        records = snapshot.get(spot_id)
+        if records is not None:
+            records["minimum_breaking_height"] *= factor
+            records["maximum_breaking_height"] *= factor
+
+def store_forecast_deltas(spots, snapshot):
+    """Post-refresh stage: append each spot's served (corrected) forecast to its run-to-run delta log"""
+    from .forecast_deltas import forecast_delta_store
+
+    with time_phase("delta_write"):
+        forecast_delta_store.append(snapshot)
+
+def load_correction_factors():
+    """Per-spot correction factors from forecast verification, or none if they can't be read"""
+    try:
+        from .forecast_verification import load_correction_factors as load_factors
+        return load_factors()
+    except Exception as e:
+        print(f"Error loading forecast correction factors: {e}")
+        return {}
+
+def run_forecast_verification():
+    """Scheduled job: verify archived forecasts against new reviews"""
+    from .forecast_verification import run_verification
+
+    run_verification()
+
+# Run in order after every refresh with (spots, snapshot) for the spots that updated
+POST_REFRESH_STAGES = [
+    archive_forecasts, apply_forecast_corrections, store_forecast_deltas, update_daily_forecasts, update_best_times
+]
+
+def run_post_refresh_stages(spots, snapshot, stages=None):
+    """Run post-refresh stages, logging failures so one stage can't block the others"""
+    for stage in (POST_REFRESH_STAGES if stages is None else stages):
+        try:
+            stage(spots, snapshot)
+        except Exception as e:
+            print(f"Post-refresh stage {stage.__name__} failed: {e}")
+
+def prefetch_spot_tides(spots):
+    """Fetch every tide station's high/low events for the forecast horizon once, before any spot
+    
+    Each spot's fetch then fills its tides from the shared tide event cache,
+    so spots can be saved as soon as they are fetched. Tides are optional, so
+    a failure is only logged.
+    
+    Args:
+        spots (list): Surf spot dicts about to be refreshed
+    """
+    from .tides import prefetch_tide_events
+    from .units import ENGLISH
+
+    start = int(time.time())
+    try:
+        with time_phase("tide_fetch"):
+            prefetch_tide_events(
+                spots, start, start + FORECAST_HOURS * 3600, ENGLISH,
+                locations={spot["id"]: spot_location(spot) for spot in spots}
+            )
+    except Exception as e:
+        print(f"Error prefetching tide events: {e}")
+
+def refresh_spot_forecasts(spots, wave_model=None, weather_source=None, save_forecast=None, run_id=None, post_refresh=None):
+    """Fetch and store forecasts for the given spots
+    
+    Tide events are prefetched for every station first; each spot is then
+    saved as soon as it is fetched. Progress is published on refresh_events
+    for streaming clients, and each forecast row as it is published (by
+    update_spot_forecast, so a save_forecast that only stages rows sends
+    none). Once every spot is fetched, the hourly series are gathered into one
+    ForecastSnapshot and handed to the post-refresh stages. Spots that fail to
+    fetch or save are classified and put on the retry queue.
+    
+    Args:
+        spots (list): Surf spot dicts to refresh
+        wave_model (surfpy.WaveModel, optional): Wave model override, see fetch_forecast_for_spot
+        weather_source (optional): Weather source override, see fetch_forecast_for_spot
+        save_forecast (callable, optional): Called with (spot_id, forecast). Defaults to update_spot_forecast.
+        run_id (str, optional): Identifier for this run, generated if not given
+        post_refresh (list, optional): Stages to run instead of POST_REFRESH_STAGES
+        
+    Returns:
+        int: Number of spots whose forecast was updated
+    """
+    save_forecast = save_forecast or update_spot_forecast
+    run_id = run_id or uuid.uuid4().hex
+    started = time.perf_counter()
     updated_count = 0
+    series_by_spot = {}
+    corrections = load_correction_factors()
+    trace = refresh_tracer.start_run(run_id)
+    refresh_events.publish("refresh_started", {"run_id": run_id, "total": len(spots)})
+    with trace.stages():
+        prefetch_spot_tides(spots)
     
-    for spot in spots:
-        forecast = fetch_forecast_for_spot(spot)
-        if forecast:
-            # Process the forecast data if needed
-            processed_forecast = process_forecast_data(forecast)
-            
-            # Update the database
-            update_spot_forecast(spot["id"], processed_forecast)
-            updated_count += 1
+    failures = {}
+    
+    for index, spot in enumerate(spots):
+        saved = False
+        with trace.spot(spot) as spot_trace:
+            series = fetch_forecast_series_for_spot(spot, wave_model=wave_model, weather_source=weather_source)
+            if series:
+                # Serve verification-corrected heights; the raw series is what gets archived
+                factor = corrections.get(str(spot["id"]))
+                processed_forecast = process_forecast_data((series.corrected(factor) if factor else series).to_row())
+                
+                # Update the database
+                try:
+                    save_forecast(spot["id"], processed_forecast)
+                    saved = True
+                except Exception as e:
+                    print(f"Error saving forecast for {spot['name']}: {e}")
+                    failures[spot["id"]] = {"reason": "db", "error": str(e)}
+            if saved:
+                updated_count += 1
+                series_by_spot[spot["id"]] = series.records
+            spot_trace["status"] = "updated" if saved else "failed"
+        if not saved and spot["id"] not in failures:
+            failures[spot["id"]] = {"reason": failure_reason(spot_trace["failed_phase"]), "error": spot_trace["error"]}
+        
+        refresh_events.publish("spot_progress", {
+            "run_id": run_id,
+            "spot_id": spot["id"],
+            "status": "updated" if saved else "failed",
+            "completed": index + 1,
+            "total": len(spots)
+        })
+    
+    if series_by_spot:
+        from .forecast_snapshot import ForecastSnapshot
+
+        snapshot = ForecastSnapshot.from_series(series_by_spot, {
+            "unit": "english",
+            "run_id": run_id,
+            "corrections": {str(spot_id): corrections[str(spot_id)] for spot_id in series_by_spot if str(spot_id) in corrections}
+        })
+        with trace.stages():
+            run_post_refresh_stages([spot for spot in spots if spot["id"] in series_by_spot], snapshot, post_refresh)
     
+    # Queue failed spots for a backoff retry of just those spots, and clear the ones that recovered
+    try:
+        retry_queue.record(failures, series_by_spot.keys(), run_id)
+    except Exception as e:
+        print(f"Error recording failed spots for retry: {e}")
+    
+    trace.finish(updated_count, len(spots))
+    record_refresh_run(updated_count, len(spots) - updated_count, time.perf_counter() - started)
+    refresh_events.publish("refresh_completed", {"run_id": run_id, "updated": updated_count, "total": len(spots)})
     print(f"Updated forecasts for {updated_count}/{len(spots)} spots at {datetime.datetime.now()}")
+    return updated_count
+
+def update_all_spot_forecasts():
+    """Update forecasts for all spots"""
+    refresh_spot_forecasts(get_all_surf_spots())
 
 # For testing the script directly
 if __name__ == "__main__":
@@ -0,0 +1,286 @@
+# app/services/forecast_snapshot.py
+import os
+import json
+import base64
+import math
+import datetime
+from datetime import timezone
+from typing import Dict, Any, Iterable, List, Optional
+
+import numpy as np
+
+
+# Up to three swell components are kept, matching primary/secondary/tertiary in the API
+MAX_SWELL_COMPONENTS = 3
+
+# One row per forecast hour; missing values are NaN
+FORECAST_DTYPE = np.dtype([
+    ("time", "<i8"),                      # unix seconds, UTC
+    ("wind_speed", "<f4"),
+    ("wind_direction", "<f4"),
+    ("minimum_breaking_height", "<f4"),
+    ("maximum_breaking_height", "<f4"),
+    ("wave_height", "<f4"),               # wave_summary height
+    ("wave_period", "<f4"),               # wave_summary period
+    ("wave_direction", "<f4"),            # wave_summary direction
+    ("swell_height", "<f4", (MAX_SWELL_COMPONENTS,)),
+    ("swell_period", "<f4", (MAX_SWELL_COMPONENTS,)),
+    ("swell_direction", "<f4", (MAX_SWELL_COMPONENTS,)),
+    ("air_temperature", "<f4"),           # from the merged NWS hourly forecast
+    ("tide", "<f4"),                      # water level interpolated from NOAA high/low predictions
+])
+
+# Index of where each spot's rows live in the shared records array.
+# Spot ids are stored as strings since surf_spots uses UUIDs and spots uses serial ints.
+INDEX_DTYPE = np.dtype([("spot_id", "<U64"), ("start", "<i8"), ("stop", "<i8")])
+
+FORMAT_VERSION = 3
+RECORDS_FILE = "records.npy"
+INDEX_FILE = "index.npy"
+META_FILE = "meta.json"
+
+
+def _number(value):
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _field(obj, name):
+    """Read a field from either a surfpy object or its serialized dict"""
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _timestamp(value):
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return int(value)
+
+
+def empty_records(length: int) -> np.ndarray:
+    """Allocate a records array with every value field set to NaN"""
+    records = np.zeros(length, dtype=FORECAST_DTYPE)
+    for name in FORECAST_DTYPE.names:
+        if name != "time":
+            records[name] = np.nan
+    return records
+
+
+def to_records(data: Iterable[Any]) -> np.ndarray:
+    """Convert forecast hours into a typed records array
+
+    Values are gathered column by column in one pass and written as whole
+    arrays, so no per-row numpy scalars are allocated.
+
+    Args:
+        data (list): surfpy.BuoyData objects, or the dicts surfpy.serialize produces for them
+
+    Returns:
+        np.ndarray: Array with FORECAST_DTYPE, one row per hour
+    """
+    data = list(data)
+    count = len(data)
+    records = empty_records(count)
+    if not count:
+        return records
+
+    scalars = {name: [] for name in ("wind_speed", "wind_direction", "minimum_breaking_height",
+                                     "maximum_breaking_height", "wave_height", "wave_period", "wave_direction",
+                                     "air_temperature", "tide")}
+    swells = {name: np.full((count, MAX_SWELL_COMPONENTS), np.nan, dtype="<f4")
+              for name in ("swell_height", "swell_period", "swell_direction")}
+    times = []
+
+    for i, dat in enumerate(data):
+        times.append(_timestamp(_field(dat, "date")))
+        scalars["wind_speed"].append(_number(_field(dat, "wind_speed")))
+        scalars["wind_direction"].append(_number(_field(dat, "wind_direction")))
+        scalars["minimum_breaking_height"].append(_number(_field(dat, "minimum_breaking_height")))
+        scalars["maximum_breaking_height"].append(_number(_field(dat, "maximum_breaking_height")))
+        scalars["air_temperature"].append(_number(_field(dat, "air_temperature")))
+        scalars["tide"].append(_number(_field(dat, "tide")))
+
+        summary = _field(dat, "wave_summary")
+        scalars["wave_height"].append(_number(_field(summary, "wave_height")) if summary is not None else math.nan)
+        scalars["wave_period"].append(_number(_field(summary, "period")) if summary is not None else math.nan)
+        scalars["wave_direction"].append(_number(_field(summary, "direction")) if summary is not None else math.nan)
+
+        for j, swell in enumerate((_field(dat, "swell_components") or [])[:MAX_SWELL_COMPONENTS]):
+            swells["swell_height"][i, j] = _number(_field(swell, "wave_height"))
+            swells["swell_period"][i, j] = _number(_field(swell, "period"))
+            swells["swell_direction"][i, j] = _number(_field(swell, "direction"))
+
+    records["time"] = times
+    for name, values in scalars.items():
+        records[name] = values
+    for name, values in swells.items():
+        records[name] = values
+    return records
+
+
+def to_buoy_data(records: np.ndarray, unit: str) -> List[Any]:
+    """Rebuild surfpy.BuoyData objects from a records array
+
+    Args:
+        records (np.ndarray): Array with FORECAST_DTYPE
+        unit (str): surfpy unit system the values are in (e.g. surfpy.units.Units.english)
+
+    Returns:
+        list: surfpy.BuoyData, one per row
+    """
+    import surfpy
+
+    data = []
+    for row in records:
+        dat = surfpy.BuoyData(unit, datetime.datetime.fromtimestamp(int(row["time"]), tz=timezone.utc))
+        dat.wind_speed = float(row["wind_speed"])
+        dat.wind_direction = float(row["wind_direction"])
+        dat.minimum_breaking_height = float(row["minimum_breaking_height"])
+        dat.maximum_breaking_height = float(row["maximum_breaking_height"])
+        dat.air_temperature = float(row["air_temperature"])
+        dat.wave_summary = surfpy.Swell(
+            unit,
+            wave_height=float(row["wave_height"]),
+            period=float(row["wave_period"]),
+            direction=float(row["wave_direction"])
+        )
+        dat.swell_components = [
+            surfpy.Swell(
+                unit,
+                wave_height=float(row["swell_height"][j]),
+                period=float(row["swell_period"][j]),
+                direction=float(row["swell_direction"][j])
+            )
+            for j in range(MAX_SWELL_COMPONENTS)
+            if not math.isnan(row["swell_height"][j])
+        ]
+        data.append(dat)
+    return data
+
+
+class ForecastSnapshot(object):
+    """Hourly forecasts for many spots stored as one contiguous records array
+
+    On disk a snapshot is a directory holding records.npy (all spots' rows back to
+    back), index.npy (spot_id -> row range) and meta.json. Reads memory-map
+    records.npy, so get() returns a zero-copy view and loading hundreds of spots
+    does not parse anything.
+    """
+
+    def __init__(self, records: np.ndarray, index: np.ndarray, meta: Optional[Dict[str, Any]] = None):
+        self.records = records
+        self.index = index
+        self.meta = meta or {}
+        self._positions = {str(spot_id): i for i, spot_id in enumerate(index["spot_id"])}
+
+    @classmethod
+    def from_series(cls, series: Dict[int, np.ndarray], meta: Optional[Dict[str, Any]] = None):
+        """Build a snapshot from per-spot records arrays
+
+        Args:
+            series (dict): spot_id (int or str) -> records array (FORECAST_DTYPE)
+            meta (dict, optional): Extra metadata, e.g. unit and model_run
+        """
+        index = np.zeros(len(series), dtype=INDEX_DTYPE)
+        start = 0
+        for i, (spot_id, records) in enumerate(series.items()):
+            index[i] = (str(spot_id), start, start + len(records))
+            start += len(records)
+        records = np.concatenate(list(series.values())) if series else np.zeros(0, dtype=FORECAST_DTYPE)
+        return cls(records.astype(FORECAST_DTYPE, copy=False), index, meta)
+
+    @classmethod
+    def from_buoy_data(cls, spot_data: Dict[int, List[Any]], unit: str, model_run: Optional[str] = None):
+        """Build a snapshot from surfpy.BuoyData lists keyed by spot_id"""
+        meta = {"unit": unit, "model_run": model_run}
+        return cls.from_series({spot_id: to_records(data) for spot_id, data in spot_data.items()}, meta)
+
+    @property
+    def spot_ids(self) -> List[str]:
+        return [str(spot_id) for spot_id in self.index["spot_id"]]
+
+    def __contains__(self, spot_id):
+        return str(spot_id) in self._positions
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, spot_id) -> Optional[np.ndarray]:
+        """Return a view of one spot's rows, or None if the spot isn't in the snapshot"""
+        position = self._positions.get(str(spot_id))
+        if position is None:
+            return None
+        entry = self.index[position]
+        return self.records[int(entry["start"]):int(entry["stop"])]
+
+    def to_buoy_data(self, spot_id) -> Optional[List[Any]]:
+        """Rebuild one spot's surfpy.BuoyData list"""
+        records = self.get(spot_id)
+        if records is None:
+            return None
+        return to_buoy_data(records, self.meta.get("unit", "english"))
+
+    def save(self, directory: str):
+        """Write the snapshot to a directory, replacing any previous contents"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, RECORDS_FILE), np.ascontiguousarray(self.records))
+        np.save(os.path.join(directory, INDEX_FILE), self.index)
+        with open(os.path.join(directory, META_FILE), "w") as outfile:
+            json.dump({**self.meta, "format_version": FORMAT_VERSION}, outfile)
+
+    def to_payload(self) -> Dict[str, Any]:
+        """The snapshot as a JSON-safe dict (records base64-encoded), e.g. to stage it on a table row"""
+        return {
+            "records": base64.b64encode(np.ascontiguousarray(self.records).tobytes()).decode("ascii"),
+            "index": [[str(entry["spot_id"]), int(entry["start"]), int(entry["stop"])] for entry in self.index],
+            "meta": self.meta,
+            "format_version": FORMAT_VERSION,
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]):
+        """Rebuild a snapshot from to_payload()"""
+        if payload.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported forecast snapshot version {payload.get('format_version')}")
+        records = np.frombuffer(base64.b64decode(payload["records"]), dtype=FORECAST_DTYPE).copy()
+        index = np.array([tuple(entry) for entry in payload["index"]], dtype=INDEX_DTYPE)
+        return cls(records, index, payload.get("meta"))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True):
+        """Load a snapshot directory, memory-mapping the records by default"""
+        with open(os.path.join(directory, META_FILE), "r") as infile:
+            meta = json.load(infile)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported forecast snapshot version {meta.get('format_version')} in {directory}")
+        records = np.load(os.path.join(directory, RECORDS_FILE), mmap_mode="r" if mmap else None)
+        index = np.load(os.path.join(directory, INDEX_FILE))
+        return cls(records, index, meta)
+
+
+def convert_serialized_forecast(json_path: str, directory: str, spot_id: int = 0):
+    """Convert a surfpy.serialize JSON forecast (like the recorded test fixtures) into a snapshot"""
+    with open(json_path, "r") as infile:
+        data = json.load(infile)
+    unit = data[0]["unit"] if data else "english"
+    snapshot = ForecastSnapshot.from_series({spot_id: to_records(data)}, {"unit": unit, "source": os.path.basename(json_path)})
+    snapshot.save(directory)
+    return snapshot
+
+
+# For converting recorded forecasts directly
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Usage: python -m app.services.forecast_snapshot FORECAST.json SNAPSHOT_DIR")
+        sys.exit(1)
+    converted = convert_serialized_forecast(sys.argv[1], sys.argv[2])
+    print(f"Wrote {len(converted.records)} forecast hours to {sys.argv[2]}")
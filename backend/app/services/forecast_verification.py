@@ -0,0 +1,225 @@
+# app/services/forecast_verification.py
+import os
+import datetime
+from datetime import timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..database import get_supabase_client
+from .forecast_archive import forecast_archive
+
+
+# A review is matched to the archived forecast hour nearest its created_at, if within this window
+MATCH_WINDOW_SECONDS = int(os.environ.get("VERIFICATION_MATCH_WINDOW_SECONDS", "10800"))
+# A review's spot is matched to the surf_spots row with the same name, or else the nearest one within this many degrees
+SPOT_MATCH_DEGREES = float(os.environ.get("VERIFICATION_SPOT_MATCH_DEGREES", "0.05"))
+# Reviews fetched per page
+REVIEW_PAGE_SIZE = 5000
+# Correction factors are shrunk toward 1 as if this many perfect reviews had been seen
+CORRECTION_PRIOR_REVIEWS = 10
+# Bounds on the multiplicative correction applied to breaking heights
+MIN_CORRECTION, MAX_CORRECTION = 0.5, 2.0
+
+STATS_TABLE = "spot_forecast_verification"
+RUNS_TABLE = "forecast_verification_runs"
+
+
+def _timestamp(value: str) -> int:
+    return int(datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+def last_processed_review_id(supabase) -> int:
+    """The highest review id a previous verification run got through"""
+    response = supabase.table(RUNS_TABLE).select("last_review_id").order("last_review_id", desc=True).limit(1).execute()
+    return response.data[0]["last_review_id"] if response.data else 0
+
+
+def fetch_new_reviews(supabase, after_id: int) -> List[Dict[str, Any]]:
+    """Reviews with an id above after_id, oldest first, paged"""
+    reviews = []
+    while True:
+        response = supabase.table("reviews").select("id", "spot_id", "wave_height", "created_at") \
+            .gt("id", after_id).order("id").limit(REVIEW_PAGE_SIZE).execute()
+        reviews.extend(response.data)
+        if len(response.data) < REVIEW_PAGE_SIZE:
+            return reviews
+        after_id = response.data[-1]["id"]
+
+
+def resolve_surf_spots(supabase, spot_ids) -> Dict[str, str]:
+    """Map reviews' spot ids to the surf_spots ids their forecasts are archived under
+
+    Reviews reference the spots table (integer ids), while forecasts, the
+    archive and correction factors are keyed by surf_spots UUIDs. A spot maps
+    to the surf spot with the same name, or else the nearest one within
+    SPOT_MATCH_DEGREES; spots with neither are left out.
+
+    Returns:
+        dict: spots id (str) -> surf_spots id (str)
+    """
+    spots = supabase.table("spots").select("id", "name", "latitude", "longitude").in_("id", list(spot_ids)).execute().data
+    surf_spots = supabase.table("surf_spots").select("id", "name", "latitude", "longitude").execute().data
+    if not spots or not surf_spots:
+        return {}
+    by_name = {(surf_spot.get("name") or "").strip().lower(): str(surf_spot["id"]) for surf_spot in surf_spots}
+    coordinates = np.array([[surf_spot["latitude"], surf_spot["longitude"]] for surf_spot in surf_spots], dtype=np.float64)
+    resolved = {}
+    for spot in spots:
+        surf_spot_id = by_name.get((spot.get("name") or "").strip().lower())
+        if surf_spot_id is None:
+            distances = np.hypot(*(coordinates - [spot["latitude"], spot["longitude"]]).T)
+            nearest = int(np.argmin(distances))
+            if distances[nearest] <= SPOT_MATCH_DEGREES:
+                surf_spot_id = str(surf_spots[nearest]["id"])
+        if surf_spot_id is not None:
+            resolved[str(spot["id"])] = surf_spot_id
+    return resolved
+
+
+def match_reviews(review_times: np.ndarray, forecast_times: np.ndarray) -> np.ndarray:
+    """Index of the nearest forecast hour for each review, or -1 if none is within the window
+
+    Both arrays are in seconds (unix times, or times offset by a per-spot key);
+    forecast_times must be sorted.
+    """
+    if not len(forecast_times):
+        return np.full(len(review_times), -1)
+    after = np.clip(np.searchsorted(forecast_times, review_times), 0, len(forecast_times) - 1)
+    before = np.clip(after - 1, 0, len(forecast_times) - 1)
+    nearest = np.where(
+        np.abs(forecast_times[before] - review_times) <= np.abs(forecast_times[after] - review_times), before, after
+    )
+    return np.where(np.abs(forecast_times[nearest] - review_times) <= MATCH_WINDOW_SECONDS, nearest, -1)
+
+
+def correction_factor(reviews: int, sum_observed: float, sum_forecast: float) -> float:
+    """Multiplicative breaking height correction, shrunk toward 1 for spots with few reviews"""
+    if reviews == 0 or sum_forecast <= 0:
+        return 1.0
+    raw = float(np.clip(sum_observed / sum_forecast, MIN_CORRECTION, MAX_CORRECTION))
+    return round(1 + (raw - 1) * reviews / (reviews + CORRECTION_PRIOR_REVIEWS), 4)
+
+
+def _stats_row(spot_id, sums: Dict[str, float], last_review_id: int) -> Dict[str, Any]:
+    count = sums["reviews"]
+    return {
+        "spot_id": spot_id,
+        **sums,
+        "bias": round(sums["sum_error"] / count, 3),                     # forecast minus observed (ft)
+        "mae": round(sums["sum_abs_error"] / count, 3),
+        "rmse": round(float(np.sqrt(sums["sum_squared_error"] / count)), 3),
+        "correction_factor": correction_factor(count, sums["sum_observed"], sums["sum_forecast"]),
+        "last_review_id": last_review_id,
+        "updated_at": datetime.datetime.now(timezone.utc).isoformat()
+    }
+
+
+def run_verification(archive=None) -> Dict[str, int]:
+    """Compare new reviews' reported wave heights to what was forecast for that spot and hour
+
+    Only reviews added since the last run are read, and each review's spot is
+    resolved to its surf spot (see resolve_surf_spots); statistics and
+    correction factors are keyed by surf spot id. The archived forecasts of
+    every reviewed spot are loaded in one pass (latest model run per hour),
+    and all reviews are matched to their spot's nearest forecast hour with one
+    binary search over a combined (spot, time) key. Per-spot sums are added to
+    the stored totals, from which bias, MAE, RMSE and the correction factor
+    are recomputed.
+
+    Args:
+        archive (ForecastArchive, optional): Defaults to the shared forecast archive
+
+    Returns:
+        dict: Reviews processed and matched, and spots updated
+    """
+    archive = archive or forecast_archive
+    supabase = get_supabase_client()
+    watermark = last_processed_review_id(supabase)
+    reviews = fetch_new_reviews(supabase, watermark)
+    if not reviews:
+        return {"processed": 0, "matched": 0, "spots": 0}
+
+    last_review_id = max(review["id"] for review in reviews)
+    reviews = [review for review in reviews if review.get("wave_height") is not None and review.get("created_at")]
+    processed = len(reviews)
+    surf_spot_ids = resolve_surf_spots(supabase, {review["spot_id"] for review in reviews}) if reviews else {}
+    reviews = [review for review in reviews if str(review["spot_id"]) in surf_spot_ids]
+    new_sums = {}
+    matched_total = 0
+    if reviews:
+        spots, review_spots = np.unique([surf_spot_ids[str(review["spot_id"])] for review in reviews], return_inverse=True)
+        times = np.array([_timestamp(review["created_at"]) for review in reviews], dtype=np.int64)
+        observed = np.array([review["wave_height"] for review in reviews], dtype=np.float64)
+
+        # Every affected spot's archived hours in one pass over the archive, sorted by (spot, time)
+        first, last = int(times.min()) - MATCH_WINDOW_SECONDS, int(times.max()) + MATCH_WINDOW_SECONDS + 1
+        forecast_spots, forecast = archive.query_many(spots, first, last, latest_only=True)
+
+        # One (spot, time) key per row: spots are spaced further apart than the match window, so
+        # a single searchsorted over all reviews never matches a review to another spot's forecast
+        stride = (last - first) + MATCH_WINDOW_SECONDS + 1
+        nearest = match_reviews(
+            review_spots * stride + (times - first), forecast_spots * stride + (forecast["time"] - first)
+        )
+        matched = nearest >= 0
+        # Reviews report a single height; compare against the middle of the breaking range
+        forecast_height = (forecast["minimum_breaking_height"].astype(np.float64) + forecast["maximum_breaking_height"]) / 2
+        predicted = forecast_height[nearest[matched]]
+        actual, owners = observed[matched], review_spots[matched]
+        valid = ~np.isnan(predicted)
+        predicted, actual, owners = predicted[valid], actual[valid], owners[valid]
+        error = predicted - actual
+
+        def per_spot(values=None):
+            return np.bincount(owners, weights=values, minlength=len(spots))
+
+        counts = per_spot()
+        sums = {
+            "sum_error": per_spot(error),
+            "sum_abs_error": per_spot(np.abs(error)),
+            "sum_squared_error": per_spot(error ** 2),
+            "sum_observed": per_spot(actual),
+            "sum_forecast": per_spot(predicted),
+        }
+        for position in np.flatnonzero(counts):
+            new_sums[str(spots[position])] = {
+                "reviews": int(counts[position]),
+                **{name: float(values[position]) for name, values in sums.items()}
+            }
+        matched_total = len(error)
+
+    if new_sums:
+        existing = supabase.table(STATS_TABLE).select("*").in_("spot_id", list(new_sums)).execute().data
+        existing = {str(row["spot_id"]): row for row in existing}
+        rows = []
+        for spot_id, sums in new_sums.items():
+            previous = existing.get(spot_id, {})
+            totals = {name: value + (previous.get(name) or 0) for name, value in sums.items()}
+            rows.append(_stats_row(spot_id, totals, last_review_id))
+        supabase.table(STATS_TABLE).upsert(rows, on_conflict="spot_id").execute()
+
+    supabase.table(RUNS_TABLE).insert({
+        "last_review_id": last_review_id,
+        "processed": processed,
+        "matched": matched_total,
+        "finished_at": datetime.datetime.now(timezone.utc).isoformat()
+    }).execute()
+    print(f"Verified {matched_total}/{processed} new reviews against archived forecasts for {len(new_sums)} spots")
+    return {"processed": processed, "matched": matched_total, "spots": len(new_sums)}
+
+
+def load_correction_factors() -> Dict[str, float]:
+    """Per-spot breaking height correction factors from verification, keyed by spot id string"""
+    supabase = get_supabase_client()
+    response = supabase.table(STATS_TABLE).select("spot_id", "correction_factor").execute()
+    return {
+        str(row["spot_id"]): row["correction_factor"]
+        for row in response.data
+        if row.get("correction_factor") not in (None, 1.0)
+    }
+
+
+# For running the verification job directly
+if __name__ == "__main__":
+    run_verification()
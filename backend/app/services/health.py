@@ -0,0 +1,116 @@
+# app/services/health.py
+import os
+import time
+import datetime
+import threading
+from typing import Dict, Any, Optional
+
+from ..database import get_supabase_client
+
+
+# How often the background job pings Supabase
+DB_PING_INTERVAL_SECONDS = int(os.environ.get("HEALTH_DB_PING_INTERVAL_SECONDS", "15"))
+# A DB ping older than this makes the instance not ready
+DB_PING_MAX_AGE_SECONDS = int(os.environ.get("HEALTH_DB_PING_MAX_AGE_SECONDS", "60"))
+# A newest published forecast fetched longer ago than this makes the instance not ready (4 missed 3-hour runs)
+FORECAST_MAX_AGE_SECONDS = int(os.environ.get("HEALTH_FORECAST_MAX_AGE_SECONDS", str(12 * 3600)))
+# How long a computed readiness snapshot is reused between probes
+READINESS_CACHE_TTL_SECONDS = float(os.environ.get("HEALTH_READINESS_CACHE_TTL_SECONDS", "2"))
+
+
+class HealthMonitor(object):
+    """Tracks readiness in the background so probes never touch the database
+
+    A scheduler job pings Supabase every DB_PING_INTERVAL_SECONDS and records the
+    outcome. The ping reads when the newest published forecast was fetched, so
+    forecast freshness is the same on every worker, whichever one refreshed.
+    /readyz then only reads this in-memory state, cached for
+    READINESS_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self):
+        self.scheduler = None
+        self.last_db_ping_ok: Optional[float] = None
+        self.last_db_error: Optional[str] = None
+        self.last_forecast_at: Optional[float] = None
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_at = 0.0
+        self._lock = threading.Lock()
+
+    def start(self, scheduler):
+        """Register the background DB ping on the app scheduler
+
+        Args:
+            scheduler (BackgroundScheduler): Scheduler whose state is reported and which runs the ping
+        """
+        self.scheduler = scheduler
+        scheduler.add_job(
+            self.ping_database,
+            "interval",
+            seconds=DB_PING_INTERVAL_SECONDS,
+            id="health_db_ping",
+            name="Health check database ping",
+            replace_existing=True,
+            next_run_time=datetime.datetime.now()  # Ping once right away
+        )
+
+    def ping_database(self):
+        """Read the newest published forecast's fetch time from Supabase and record the outcome"""
+        try:
+            response = get_supabase_client().table("spot_forecasts").select("timestamp") \
+                .order("version", desc=True).limit(1).execute()
+            if response.data:
+                fetched_at = datetime.datetime.fromisoformat(str(response.data[0]["timestamp"]).replace("Z", "+00:00"))
+                if fetched_at.tzinfo is None:
+                    fetched_at = fetched_at.replace(tzinfo=datetime.timezone.utc)
+                self.last_forecast_at = fetched_at.timestamp()
+            self.last_db_ping_ok = time.time()
+            self.last_db_error = None
+        except Exception as e:
+            self.last_db_error = str(e)
+
+    def readiness(self) -> Dict[str, Any]:
+        """Return the cached readiness snapshot, recomputing it once the TTL lapses"""
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._snapshot_at < READINESS_CACHE_TTL_SECONDS:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or now - self._snapshot_at >= READINESS_CACHE_TTL_SECONDS:
+                self._snapshot = self._compute()
+                self._snapshot_at = now
+            return self._snapshot
+
+    def _compute(self) -> Dict[str, Any]:
+        wall_now = time.time()
+
+        db_age = wall_now - self.last_db_ping_ok if self.last_db_ping_ok else None
+        db_ok = db_age is not None and db_age < DB_PING_MAX_AGE_SECONDS
+
+        refresh_age = wall_now - self.last_forecast_at if self.last_forecast_at else None
+        # No forecast published yet (a new database) is fine; the first run is up to 3 hours away
+        refresh_ok = refresh_age is None or refresh_age < FORECAST_MAX_AGE_SECONDS
+
+        scheduler_running = bool(self.scheduler and self.scheduler.running)
+
+        return {
+            "ready": db_ok and refresh_ok and scheduler_running,
+            "checks": {
+                "database": {
+                    "ok": db_ok,
+                    "last_ping_age_seconds": round(db_age, 1) if db_age is not None else None,
+                    "error": self.last_db_error
+                },
+                "forecast_refresh": {
+                    "ok": refresh_ok,
+                    "last_refresh_age_seconds": round(refresh_age, 1) if refresh_age is not None else None
+                },
+                "scheduler": {
+                    "ok": scheduler_running
+                }
+            }
+        }
+
+
+health_monitor = HealthMonitor()
@@ -0,0 +1,273 @@
+# app/services/metrics.py
+import time
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Tuple
+
+
+# Latency buckets in seconds, from fast API reads up to slow GRIB downloads
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """Base class for a labelled metric in the Prometheus text format"""
+
+    metric_type = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Sample lines for every label set"""
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}"
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    metric_type = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. the result of the last refresh run"""
+
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations, e.g. latencies in seconds"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (plus +Inf), running sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def get(self, **labels):
+        """Return (count, sum) of observations for the given labels"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None:
+                return 0, 0.0
+            return sum(state[0]), state[1]
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the wrapped block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total)) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+# API request latency
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Latency of API requests by route template",
+    ["method", "route", "status"]
+)
+
+# Supabase queries
+supabase_queries_total = Counter(
+    "supabase_queries_total",
+    "Supabase queries executed by table and operation",
+    ["table", "operation", "outcome"]
+)
+supabase_query_duration_seconds = Histogram(
+    "supabase_query_duration_seconds",
+    "Latency of Supabase queries by table and operation",
+    ["table", "operation"]
+)
+
+# Forecast refresh job
+forecast_refresh_phase_duration_seconds = Histogram(
+    "forecast_refresh_phase_duration_seconds",
+    "Time spent in each phase of a spot forecast refresh",
+    ["phase"]
+)
+forecast_refresh_duration_seconds = Histogram(
+    "forecast_refresh_duration_seconds",
+    "Wall time of a full forecast refresh run",
+    []
+)
+forecast_refresh_spots_total = Counter(
+    "forecast_refresh_spots_total",
+    "Spots processed by forecast refresh runs",
+    ["result"]
+)
+forecast_refresh_last_run_spots = Gauge(
+    "forecast_refresh_last_run_spots",
+    "Spots that succeeded or failed in the most recent refresh run",
+    ["result"]
+)
+forecast_refresh_last_completed_timestamp_seconds = Gauge(
+    "forecast_refresh_last_completed_timestamp_seconds",
+    "Unix time the most recent refresh run completed",
+    []
+)
+
+# Caches
+cache_requests_total = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"]
+)
+cache_hit_ratio = Gauge(
+    "cache_hit_ratio",
+    "Fraction of cache lookups served from the cache",
+    ["cache"]
+)
+
+
+# Trace the current spot or run records its phases on (see refresh_trace), if one is active
+active_trace: ContextVar = ContextVar("active_trace", default=None)
+
+
+@contextmanager
+def time_phase(phase):
+    """Time one phase of the forecast refresh (grib_fetch, grib_parse, weather_fetch, ...)
+
+    The duration is observed on the phase histogram and, when a refresh trace
+    is active, recorded as a span on it along with any exception raised.
+
+    Usage:
+        with time_phase("grib_fetch"):
+            ...
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        forecast_refresh_phase_duration_seconds.observe(elapsed, phase=phase)
+        trace = active_trace.get()
+        if trace is not None:
+            trace.add_span(phase, start, elapsed, error)
+
+
+def record_cache_lookup(cache, hit):
+    """Count a cache hit or miss and update the cache's hit ratio"""
+    cache_requests_total.inc(cache=cache, result="hit" if hit else "miss")
+    hits = cache_requests_total.get(cache=cache, result="hit")
+    misses = cache_requests_total.get(cache=cache, result="miss")
+    cache_hit_ratio.set(hits / (hits + misses), cache=cache)
+
+
+def record_refresh_run(succeeded, failed, duration):
+    """Record the outcome of a full forecast refresh run"""
+    forecast_refresh_spots_total.inc(succeeded, result="succeeded")
+    forecast_refresh_spots_total.inc(failed, result="failed")
+    forecast_refresh_last_run_spots.set(succeeded, result="succeeded")
+    forecast_refresh_last_run_spots.set(failed, result="failed")
+    forecast_refresh_duration_seconds.observe(duration)
+    forecast_refresh_last_completed_timestamp_seconds.set(time.time())
+
+
+def render_latest() -> str:
+    """Render every registered metric in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
@@ -0,0 +1,233 @@
+# app/services/refresh_coordinator.py
+import os
+import time
+import uuid
+import datetime
+import threading
+from collections import OrderedDict
+from datetime import timezone
+from typing import Any, Dict, List, Optional
+
+from .forecast_service import get_all_surf_spots, refresh_spot_forecasts
+from .refresh_retries import retry_queue
+from .refresh_shards import REFRESH_SHARDING, sharded_refresh, cycle_run_id
+
+
+# Minimum seconds between refreshes of the same spot, unless forced (the scheduler forces)
+MIN_REFRESH_INTERVAL_SECONDS = int(os.environ.get("MIN_REFRESH_INTERVAL_SECONDS", "600"))
+# How many finished runs are kept for status lookups
+RUN_HISTORY_SIZE = 50
+
+# A run is "joined" when its sharded cycle run was already started by another worker, which refreshes it
+FINISHED_STATUSES = ("completed", "joined")
+
+
+class RefreshThrottled(Exception):
+    """Raised when every requested spot was refreshed within the minimum interval"""
+
+    def __init__(self, retry_after: float, last_run: Optional["RefreshRun"] = None):
+        super().__init__(f"Forecasts were refreshed recently, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+        self.last_run = last_run
+
+
+class RefreshRun(object):
+    """One forecast refresh, covering either every spot or a set of spot ids"""
+
+    def __init__(self, spot_ids: Optional[List[str]] = None, source: str = "manual"):
+        self.run_id = uuid.uuid4().hex
+        self.spot_ids = set(spot_ids) if spot_ids is not None else None  # None means all spots
+        self.source = source
+        self.status = "queued"
+        self.requested_at = datetime.datetime.now(timezone.utc)
+        self.started_at: Optional[datetime.datetime] = None
+        self.finished_at: Optional[datetime.datetime] = None
+        self.coalesced_requests = 0
+        self.updated = None
+        self.total = None
+        self.error: Optional[str] = None
+        self.shard_run_id: Optional[str] = None  # The shared cycle run, for sharded full refreshes
+
+    def covers(self, spot_ids: Optional[List[str]]) -> bool:
+        """Whether this run already refreshes every spot in the requested scope"""
+        if self.spot_ids is None:
+            return True
+        return spot_ids is not None and set(spot_ids) <= self.spot_ids
+
+    def merge(self, spot_ids: Optional[List[str]]):
+        """Widen a queued run to also cover the requested scope"""
+        self.spot_ids = None if spot_ids is None or self.spot_ids is None else self.spot_ids | set(spot_ids)
+        self.coalesced_requests += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "status": self.status,
+            "scope": "all" if self.spot_ids is None else sorted(self.spot_ids),
+            "source": self.source,
+            "requested_at": self.requested_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "coalesced_requests": self.coalesced_requests,
+            "updated": self.updated,
+            "total": self.total,
+            "error": self.error,
+            "shard_run_id": self.shard_run_id
+        }
+
+
+class RefreshCoordinator(object):
+    """Serializes forecast refreshes and coalesces duplicate triggers
+
+    At most one refresh runs at a time. A trigger whose scope is already covered by
+    the running or queued run joins it and gets that run's id back; otherwise it is
+    merged into the single queued run, which starts when the current one finishes.
+    Spots refreshed within MIN_REFRESH_INTERVAL_SECONDS are skipped unless forced.
+    """
+
+    def __init__(self, min_interval_seconds=MIN_REFRESH_INTERVAL_SECONDS):
+        self.min_interval_seconds = min_interval_seconds
+        self._lock = threading.Lock()
+        self._running: Optional[RefreshRun] = None
+        self._queued: Optional[RefreshRun] = None
+        self._runs: "OrderedDict[str, RefreshRun]" = OrderedDict()
+        self._last_refreshed: Dict[str, float] = {}
+        self._last_full_refresh: Optional[float] = None
+        self._last_run: Optional[RefreshRun] = None
+
+    def trigger(self, spot_ids: Optional[List[str]] = None, source: str = "manual", force: bool = False):
+        """Request a refresh of all spots, or only the given spot ids
+
+        Args:
+            spot_ids (list, optional): Spots to refresh. None refreshes every spot.
+            source (str): Who asked, e.g. "manual" or "scheduler"
+            force (bool): Skip the minimum interval check
+
+        Returns:
+            tuple: (RefreshRun, created) where created is False if the request joined an existing run
+
+        Raises:
+            RefreshThrottled: If every requested spot was refreshed too recently
+        """
+        if spot_ids is not None:
+            spot_ids = [str(spot_id) for spot_id in spot_ids]
+
+        with self._lock:
+            for run in (self._running, self._queued):
+                if run is not None and run.covers(spot_ids):
+                    run.coalesced_requests += 1
+                    return run, False
+
+            if not force:
+                spot_ids = self._throttle(spot_ids)
+
+            if self._queued is not None:
+                self._queued.merge(spot_ids)
+                return self._queued, False
+
+            run = RefreshRun(spot_ids, source)
+            self._remember(run)
+            if self._running is None:
+                self._start(run)
+            else:
+                self._queued = run
+            return run, True
+
+    def _throttle(self, spot_ids):
+        """Drop spots refreshed within the minimum interval. Caller must hold the lock."""
+        now = time.monotonic()
+        if spot_ids is None:
+            if self._last_full_refresh is not None and now - self._last_full_refresh < self.min_interval_seconds:
+                raise RefreshThrottled(self.min_interval_seconds - (now - self._last_full_refresh), self._last_run)
+            return None
+
+        due = [
+            spot_id for spot_id in spot_ids
+            if now - self._last_refreshed.get(spot_id, float("-inf")) >= self.min_interval_seconds
+        ]
+        if not due:
+            oldest = min(self._last_refreshed[spot_id] for spot_id in spot_ids)
+            raise RefreshThrottled(self.min_interval_seconds - (now - oldest), self._last_run)
+        return due
+
+    def _remember(self, run: RefreshRun):
+        self._runs[run.run_id] = run
+        while len(self._runs) > RUN_HISTORY_SIZE:
+            self._runs.popitem(last=False)
+
+    def _start(self, run: RefreshRun):
+        """Start a run on a worker thread. Caller must hold the lock."""
+        self._running = run
+        run.status = "running"
+        run.started_at = datetime.datetime.now(timezone.utc)
+        threading.Thread(target=self._execute, args=(run,), name=f"forecast-refresh-{run.run_id}", daemon=True).start()
+
+    def _execute(self, run: RefreshRun):
+        spots = []
+        try:
+            spots = get_all_surf_spots()
+            if run.spot_ids is not None:
+                spots = [spot for spot in spots if str(spot["id"]) in run.spot_ids]
+                if run.source == "retry":
+                    # Spots deleted since they failed would otherwise stay due forever
+                    retry_queue.forget(set(run.spot_ids) - {str(spot["id"]) for spot in spots})
+            run.total = len(spots)
+            if REFRESH_SHARDING and run.spot_ids is None:
+                # Every worker's scheduled refresh in this cycle is the same run; only the first to start
+                # it plans the shards, the others join through the shard table. A manual or retry
+                # refresh is its own run. This counts only the spots refreshed here.
+                run.shard_run_id = cycle_run_id() if run.source == "scheduler" else f"{cycle_run_id()}-{run.run_id}"
+                updated = sharded_refresh.refresh(spots, run.shard_run_id)
+                run.updated = updated or 0
+                run.status = "joined" if updated is None else "completed"
+            else:
+                run.updated = refresh_spot_forecasts(spots, run_id=run.run_id)
+                run.status = "completed"
+        except Exception as e:
+            print(f"Forecast refresh {run.run_id} failed: {e}")
+            run.status = "failed"
+            run.error = str(e)
+        finally:
+            run.finished_at = datetime.datetime.now(timezone.utc)
+            self._finish(run, spots if run.status in FINISHED_STATUSES else [])
+
+    def _finish(self, run: RefreshRun, spots):
+        with self._lock:
+            now = time.monotonic()
+            for spot in spots:
+                self._last_refreshed[str(spot["id"])] = now
+            if run.status in FINISHED_STATUSES and run.spot_ids is None:
+                self._last_full_refresh = now
+            self._last_run = run
+            self._running = None
+            if self._queued is not None:
+                queued, self._queued = self._queued, None
+                self._start(queued)
+
+    def get_run(self, run_id: str) -> Optional[RefreshRun]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def scheduled_refresh(self):
+        """Entry point for the scheduler: refresh every spot, joining any manual run in flight"""
+        self.trigger(source="scheduler", force=True)
+
+    def retry_failed(self):
+        """Entry point for the retry poller: refresh only the failed spots whose backoff has elapsed"""
+        try:
+            spot_ids = retry_queue.due()
+        except Exception as e:
+            print(f"Error reading the refresh retry queue: {e}")
+            return None
+        if not spot_ids:
+            return None
+        run, _ = self.trigger(spot_ids, source="retry", force=True)
+        return run
+
+
+def spot_ids_for_region(region: str) -> List[str]:
+    """Resolve a region (the spots' location field) to spot ids"""
+    return [str(spot["id"]) for spot in get_all_surf_spots() if spot.get("location") == region]
+
+
+refresh_coordinator = RefreshCoordinator()
@@ -0,0 +1,83 @@
+# app/services/refresh_events.py
+import json
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscription(object):
+    """One connected client's queue of refresh events"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, spot_id: Optional[str] = None):
+        self.loop = loop
+        self.spot_id = spot_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def wants(self, data: Dict[str, Any]) -> bool:
+        """Run-level events go to everyone; spot events only to matching subscribers"""
+        return self.spot_id is None or "spot_id" not in data or str(data["spot_id"]) == self.spot_id
+
+    def offer(self, item):
+        """Queue an event, dropping the oldest one if this client has fallen behind. Runs on the loop."""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(item)
+
+
+class RefreshEventBus(object):
+    """Fans refresh progress and new forecast rows out to streaming clients
+
+    The refresh runs on the refresh coordinator's worker thread, while
+    subscribers live on the event loop, so publishing hands each event to the
+    subscriber's loop with call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, spot_id=None) -> Subscription:
+        """Register a subscriber on the running event loop
+
+        Args:
+            spot_id (optional): Only receive spot events for this spot
+        """
+        subscription = Subscription(asyncio.get_running_loop(), str(spot_id) if spot_id is not None else None)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        """Send an event to every interested subscriber. Safe to call from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if not subscription.wants(data):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, (event, data))
+            except RuntimeError:
+                # The subscriber's loop has closed; drop it
+                self.unsubscribe(subscription)
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+refresh_events = RefreshEventBus()
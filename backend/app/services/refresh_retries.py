@@ -0,0 +1,151 @@
+# app/services/refresh_retries.py
+import os
+import random
+import datetime
+from datetime import timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..database import get_supabase_client
+
+
+# Delay before a failed spot is first retried; doubles with each further failure
+RETRY_BASE_SECONDS = int(os.environ.get("REFRESH_RETRY_BASE_SECONDS", "120"))
+# Longest delay between retries of one spot
+RETRY_MAX_SECONDS = int(os.environ.get("REFRESH_RETRY_MAX_SECONDS", "3600"))
+# Up to this fraction of each delay is added at random, so spots that failed together don't all retry together
+RETRY_JITTER = 0.2
+# Failures in a row before a spot is dead-lettered, by reason. Provider and database outages
+# clear on their own; a parse failure usually means the spot or the data format is wrong.
+MAX_ATTEMPTS = {"fetch": 6, "weather": 6, "db": 6, "parse": 2}
+
+RETRY_TABLE = "spot_refresh_retries"
+
+FAILURE_REASONS = ("fetch", "parse", "weather", "db")
+
+# Failure reason for each refresh phase (see forecast_service) a spot can fail in
+PHASE_REASONS = {
+    "grib_fetch": "fetch",
+    "tide_fetch": "fetch",
+    "grib_parse": "parse",
+    "to_buoy_data": "parse",
+    "breaking_wave_solve": "parse",
+    "to_records": "parse",
+    "weather_fetch": "weather",
+    "merge": "weather",
+    "db_write": "db",
+}
+
+
+def failure_reason(phase: Optional[str]) -> str:
+    """Classify a failed spot by the phase that raised; a spot that failed without raising got no wave data"""
+    return PHASE_REASONS.get(phase, "fetch")
+
+
+def retry_delay(attempts: int, base_seconds: float = RETRY_BASE_SECONDS, max_seconds: float = RETRY_MAX_SECONDS,
+                jitter: float = RETRY_JITTER) -> float:
+    """Seconds to wait before retrying a spot that has failed `attempts` times in a row"""
+    delay = min(base_seconds * 2 ** (attempts - 1), max_seconds)
+    return delay * (1 + random.uniform(0, jitter))
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(timezone.utc)
+
+
+class RetryQueue(object):
+    """Durable queue of spots whose last refresh failed
+
+    Each failed spot gets one row in spot_refresh_retries holding why it failed,
+    how many times in a row, and when it is next due. Rows survive restarts, so
+    a retry pass only has to read the (small) table and refresh the spots that
+    are due rather than rerun every spot. A spot that keeps failing past its
+    reason's MAX_ATTEMPTS is dead-lettered: it stays in the table with status
+    "dead" and is no longer retried until requeued. A successful refresh, by
+    retry or by a full run, removes the spot's row.
+    """
+
+    def __init__(self, base_seconds: float = RETRY_BASE_SECONDS, max_seconds: float = RETRY_MAX_SECONDS,
+                 max_attempts: Optional[Dict[str, int]] = None, table: str = RETRY_TABLE):
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.max_attempts = max_attempts or MAX_ATTEMPTS
+        self.table = table
+
+    def record(self, failures: Dict[Any, Dict[str, Any]], succeeded: Iterable, run_id: Optional[str] = None):
+        """Record the outcome of a refresh run
+
+        Args:
+            failures (dict): Spot id -> {"reason", "error"} for each spot that failed
+            succeeded (iterable): Ids of spots that updated
+            run_id (str, optional): The run, for tracing a failure back to its refresh trace
+        """
+        supabase = get_supabase_client()
+        queued = {
+            row["spot_id"]: row
+            for row in supabase.table(self.table).select("spot_id", "attempts", "status").execute().data
+        }
+
+        now = _now()
+        rows = []
+        for spot_id, failure in failures.items():
+            spot_id = str(spot_id)
+            reason = failure["reason"]
+            previous = queued.get(spot_id)
+            attempts = (previous["attempts"] if previous else 0) + 1
+            dead = (previous is not None and previous["status"] == "dead") or \
+                attempts >= self.max_attempts.get(reason, max(self.max_attempts.values()))
+            delay = retry_delay(attempts, self.base_seconds, self.max_seconds)
+            rows.append({
+                "spot_id": spot_id,
+                "reason": reason,
+                "error": failure.get("error"),
+                "attempts": attempts,
+                "status": "dead" if dead else "pending",
+                "next_attempt_at": None if dead else (now + datetime.timedelta(seconds=delay)).isoformat(),
+                "last_failed_at": now.isoformat(),
+                "run_id": run_id,
+            })
+            if dead and (previous is None or previous["status"] != "dead"):
+                print(f"Spot {spot_id} dead-lettered after {attempts} failed refreshes ({reason}: {failure.get('error')})")
+        if rows:
+            supabase.table(self.table).upsert(rows, on_conflict="spot_id").execute()
+
+        recovered = [spot_id for spot_id in (str(spot_id) for spot_id in succeeded) if spot_id in queued]
+        if recovered:
+            supabase.table(self.table).delete().in_("spot_id", recovered).execute()
+
+    def forget(self, spot_ids: Iterable):
+        """Drop spots from the queue, e.g. ones that no longer exist"""
+        spot_ids = [str(spot_id) for spot_id in spot_ids]
+        if spot_ids:
+            get_supabase_client().table(self.table).delete().in_("spot_id", spot_ids).execute()
+
+    def due(self, now: Optional[datetime.datetime] = None) -> List[str]:
+        """Ids of pending spots whose next retry is due"""
+        supabase = get_supabase_client()
+        response = supabase.table(self.table).select("spot_id").eq("status", "pending") \
+            .lte("next_attempt_at", (now or _now()).isoformat()).execute()
+        return [row["spot_id"] for row in response.data]
+
+    def entries(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Queued spots, optionally only "pending" or "dead" ones, most recently failed first"""
+        query = get_supabase_client().table(self.table).select("*")
+        if status is not None:
+            query = query.eq("status", status)
+        return query.order("last_failed_at", desc=True).execute().data
+
+    def requeue(self, spot_id) -> Optional[Dict[str, Any]]:
+        """Give a spot (usually a dead-lettered one) a fresh set of attempts, due now
+
+        Returns:
+            dict: The updated row, or None if the spot isn't queued
+        """
+        response = get_supabase_client().table(self.table).update({
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": _now().isoformat(),
+        }).eq("spot_id", str(spot_id)).execute()
+        return response.data[0] if response.data else None
+
+
+retry_queue = RetryQueue()
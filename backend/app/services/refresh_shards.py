@@ -0,0 +1,493 @@
+# app/services/refresh_shards.py
+import os
+import math
+import random
+import socket
+import datetime
+import threading
+from datetime import timezone
+from typing import Any, Dict, List, Optional
+
+from ..database import get_supabase_client
+from .forecast_cache import next_version
+from .forecast_service import (
+    get_all_surf_spots, refresh_spot_forecasts, publish_spot_forecasts, update_daily_forecasts,
+    run_post_refresh_stages, POST_REFRESH_STAGES
+)
+
+
+# Set to "1" to split full refreshes into shards that any worker polling the shard table can claim
+REFRESH_SHARDING = os.environ.get("REFRESH_SHARDING", "") == "1"
+# Side of the square lat/lon tiles spots are grouped into. Spots in a tile share GRIB downloads.
+SHARD_TILE_DEGREES = float(os.environ.get("SHARD_TILE_DEGREES", "1.0"))
+# How far (in degrees of latitude and of longitude) a spot may be from the location a GRIB download
+# was requested around and still be read from it. Keep this within the subregion surfpy requests
+# around a location; spots farther out get a download of their own.
+GRIB_REUSE_DEGREES = float(os.environ.get("GRIB_REUSE_DEGREES", "0.5"))
+# A claimed shard whose worker hasn't finished it after this long can be claimed by another worker
+SHARD_CLAIM_TIMEOUT_SECONDS = int(os.environ.get("SHARD_CLAIM_TIMEOUT_SECONDS", "900"))
+# Claims of one shard before it is given up on and the run publishes without it
+MAX_SHARD_ATTEMPTS = 3
+# Full refreshes started by any worker within the same UTC-aligned cycle of this many hours are one
+# run. Matches the scheduler's 3-hour refresh interval.
+REFRESH_CYCLE_HOURS = int(os.environ.get("REFRESH_CYCLE_HOURS", "3"))
+# Wave model for spots that don't name one
+DEFAULT_WAVE_MODEL = "us_west_coast"
+
+RUNS_TABLE = "forecast_refresh_runs"
+SHARDS_TABLE = "forecast_refresh_shards"
+
+# Shard statuses that still need a worker
+OPEN_STATUSES = ("pending", "claimed")
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(timezone.utc)
+
+
+def _parse_time(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def cycle_run_id(now: Optional[datetime.datetime] = None, cycle_hours: int = REFRESH_CYCLE_HOURS) -> str:
+    """The run id every worker uses for the refresh cycle `now` falls in, e.g. "cycle-2025070103" """
+    now = now or _now()
+    cycle_start = now.replace(hour=now.hour - now.hour % cycle_hours, minute=0, second=0, microsecond=0)
+    return f"cycle-{cycle_start:%Y%m%d%H}"
+
+
+def wave_model_key(spot: Dict[str, Any]) -> str:
+    return spot.get("wave_model") or DEFAULT_WAVE_MODEL
+
+
+def shard_key(spot: Dict[str, Any], tile_degrees: float = SHARD_TILE_DEGREES) -> str:
+    """The shard a spot belongs to: its wave model and lat/lon tile, e.g. "us_west_coast:35:-121" """
+    lat_tile = math.floor(float(spot["latitude"]) / tile_degrees)
+    lon_tile = math.floor(float(spot["longitude"]) / tile_degrees)
+    return f"{wave_model_key(spot)}:{lat_tile}:{lon_tile}"
+
+
+def plan_shards(spots: List[Dict[str, Any]], tile_degrees: float = SHARD_TILE_DEGREES) -> Dict[str, List[Dict[str, Any]]]:
+    """Group spots by shard key"""
+    shards: Dict[str, List[Dict[str, Any]]] = {}
+    for spot in spots:
+        shards.setdefault(shard_key(spot, tile_degrees), []).append(spot)
+    return shards
+
+
+def create_wave_model(key: str):
+    """The surfpy GFS wave model for a wave model key, e.g. "atlantic" -> atlantic_gfs_wave_model()"""
+    import surfpy
+
+    return getattr(surfpy.wavemodel, f"{key}_gfs_wave_model")()
+
+
+def _covers(center, location, reuse_degrees: float) -> bool:
+    """Whether a GRIB download requested around `center` also covers `location`"""
+    if center is None:
+        return True  # Requested without a location, so it is the whole grid
+    if location is None:
+        return False
+    lon_distance = abs(float(location.longitude) - float(center.longitude)) % 360
+    return abs(float(location.latitude) - float(center.latitude)) <= reuse_degrees \
+        and min(lon_distance, 360 - lon_distance) <= reuse_degrees
+
+
+class TileWaveModel(object):
+    """A shard's wave model, sharing GRIB downloads between the tile's spots
+
+    A spot's fetch reuses an earlier download of the same hours if it was
+    requested around a location within GRIB_REUSE_DEGREES of the spot, so the
+    spot is inside its subregion, and goes to the model otherwise.
+    parse_grib_datas still picks each spot's own nearest grid point out of the
+    download. Everything else is passed through to the model.
+    """
+
+    def __init__(self, model, reuse_degrees: float = GRIB_REUSE_DEGREES):
+        self.model = model
+        self.reuse_degrees = reuse_degrees
+        self._gribs: Dict[Any, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def fetch_grib_datas(self, start_time_index, end_time_index, location=None):
+        with self._lock:
+            downloads = self._gribs.setdefault((start_time_index, end_time_index), [])
+            for center, grib in downloads:
+                if _covers(center, location, self.reuse_degrees):
+                    return grib
+            grib = self.model.fetch_grib_datas(start_time_index, end_time_index, location)
+            downloads.append((location, grib))
+            return grib
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+class ShardedRefresh(object):
+    """Splits a refresh run into wave model/tile shards that several workers claim
+
+    A run is a row in forecast_refresh_runs plus one row per shard in
+    forecast_refresh_shards. Every worker's scheduled refresh names the run
+    after the current refresh cycle and inserts it only if it isn't there yet,
+    so one worker per cycle plans the shards and the rest just claim them
+    (through work_open_runs). Workers claim shards with a conditional update
+    (only a shard still in the status the worker read can be taken), so each
+    shard, and its GRIB downloads, are done by one worker. A worker that
+    dies mid-shard loses its claim after SHARD_CLAIM_TIMEOUT_SECONDS, and one
+    that dies while publishing loses the run to another worker after as long.
+
+    Shards don't publish anything: each stages its forecast rows and its raw
+    hourly series on its shard row, without running the post-refresh stages.
+    When the last shard finishes, the worker that finished it merges every
+    shard's series into one snapshot, runs the post-refresh stages on it (so
+    the archive, delta log and best-time index get whole runs), and publishes
+    all the forecast and daily rows under one new version in one swap.
+    Readers and streaming clients move to the new run only once all of it is
+    there. The archive, delta log and best-time index live on each worker's
+    own disk, so every other worker replays the stages from the staged series
+    once the run is published (apply_published_runs).
+    """
+
+    def __init__(self, tile_degrees: float = SHARD_TILE_DEGREES,
+                 claim_timeout_seconds: float = SHARD_CLAIM_TIMEOUT_SECONDS, wave_model_factory=None):
+        self.tile_degrees = tile_degrees
+        self.claim_timeout_seconds = claim_timeout_seconds
+        self.wave_model_factory = wave_model_factory or create_wave_model
+        self._lock = threading.Lock()
+        # Newest published run version whose stages this worker has replayed, None until the first check
+        self._applied_version: Optional[int] = None
+        # Runs whose stages already ran here, because this worker published them
+        self._applied_runs = set()
+
+    def create_run(self, spots: List[Dict[str, Any]], run_id: str) -> Optional[Dict[str, Any]]:
+        """Record a run and its shards, ready to be claimed, unless another worker already has
+
+        The run row is inserted if absent, as "planning" until its shards are
+        in. A planning run whose worker died before finishing it is taken over
+        after SHARD_CLAIM_TIMEOUT_SECONDS.
+
+        Returns:
+            dict: The run, or None if another worker created (or is creating) it
+        """
+        supabase = get_supabase_client()
+        shards = plan_shards(spots, self.tile_degrees)
+        now = _now()
+        run = {
+            "run_id": run_id,
+            "status": "planning",
+            "shards": len(shards),
+            "total": len(spots),
+            "created_at": now.isoformat(),
+        }
+        created = supabase.table(RUNS_TABLE).upsert(run, on_conflict="run_id", ignore_duplicates=True).execute().data
+        if not created:
+            expired = (now - datetime.timedelta(seconds=self.claim_timeout_seconds)).isoformat()
+            created = supabase.table(RUNS_TABLE).update(run).eq("run_id", run_id).eq("status", "planning") \
+                .lt("created_at", expired).execute().data
+            if not created:
+                return None
+
+        # Upserted, so taking over a half-planned run doesn't trip over the shards it already has
+        supabase.table(SHARDS_TABLE).upsert([
+            {
+                "run_id": run_id,
+                "shard_key": key,
+                "wave_model": wave_model_key(shard_spots[0]),
+                "spot_ids": [str(spot["id"]) for spot in shard_spots],
+                "status": "pending",
+                "attempts": 0,
+            }
+            for key, shard_spots in shards.items()
+        ], on_conflict="run_id,shard_key").execute()
+        supabase.table(RUNS_TABLE).update({"status": "running"}).eq("run_id", run_id).execute()
+        print(f"Forecast refresh {run_id} split into {len(shards)} shards")
+        return {**created[0], "status": "running"}
+
+    def open_runs(self) -> List[str]:
+        """Runs that still have shards to refresh or are being published"""
+        response = get_supabase_client().table(RUNS_TABLE).select("run_id") \
+            .in_("status", ["running", "publishing"]).execute()
+        return [row["run_id"] for row in response.data]
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """A run with a count of its shards by status"""
+        supabase = get_supabase_client()
+        runs = supabase.table(RUNS_TABLE).select("*").eq("run_id", run_id).execute().data
+        if not runs:
+            return None
+        counts: Dict[str, int] = {}
+        for shard in supabase.table(SHARDS_TABLE).select("status").eq("run_id", run_id).execute().data:
+            counts[shard["status"]] = counts.get(shard["status"], 0) + 1
+        return {**runs[0], "shard_status": counts}
+
+    def claim(self, run_id: str, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Claim an unclaimed (or abandoned) shard of a run, or None if there is none"""
+        supabase = get_supabase_client()
+        now = _now()
+        expired = now - datetime.timedelta(seconds=self.claim_timeout_seconds)
+        candidates = supabase.table(SHARDS_TABLE).select("shard_key", "status", "attempts", "claimed_at") \
+            .eq("run_id", run_id).in_("status", list(OPEN_STATUSES)).execute().data
+        # Workers starting together shouldn't all race for the same shard
+        random.shuffle(candidates)
+
+        for shard in candidates:
+            if shard["status"] == "claimed" and _parse_time(shard["claimed_at"]) > expired:
+                continue
+            gave_up = shard["attempts"] >= MAX_SHARD_ATTEMPTS
+            query = supabase.table(SHARDS_TABLE).update(
+                {"status": "failed", "error": "Claim expired too many times"} if gave_up else
+                {"status": "claimed", "worker_id": worker_id, "claimed_at": now.isoformat(), "attempts": shard["attempts"] + 1}
+            ).eq("run_id", run_id).eq("shard_key", shard["shard_key"]).eq("status", shard["status"])
+            if shard["status"] == "claimed":
+                query = query.eq("claimed_at", shard["claimed_at"])
+            claimed = query.execute().data
+            if claimed and gave_up:
+                self.publish_if_finished(run_id)
+            elif claimed:
+                return claimed[0]
+        return None
+
+    def refresh_shard(self, shard: Dict[str, Any], spots: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """Refresh one claimed shard's spots, staging what they produced instead of publishing it
+
+        Returns:
+            dict: {"forecasts": [...], "snapshot": ForecastSnapshot payload or None, "updated": n}
+        """
+        forecasts: List[Dict[str, Any]] = []
+        snapshots = []
+
+        def stage_snapshot(stage_spots, snapshot):
+            snapshots.append(snapshot)
+
+        wave_model = TileWaveModel(self.wave_model_factory(shard["wave_model"]))
+        updated = refresh_spot_forecasts(
+            spots,
+            wave_model=wave_model,
+            save_forecast=lambda spot_id, forecast: forecasts.append(forecast),
+            run_id=shard["run_id"],
+            post_refresh=[stage_snapshot],
+            **kwargs
+        )
+        return {"forecasts": forecasts, "snapshot": snapshots[0].to_payload() if snapshots else None, "updated": updated}
+
+    def complete(self, shard: Dict[str, Any], result: Dict[str, Any]):
+        """Stage a finished shard's results, publishing the run if it was the last shard"""
+        get_supabase_client().table(SHARDS_TABLE).update({
+            "status": "done",
+            "result": {"forecasts": result["forecasts"], "snapshot": result["snapshot"]},
+            "updated": result["updated"],
+            "finished_at": _now().isoformat(),
+        }).eq("run_id", shard["run_id"]).eq("shard_key", shard["shard_key"]).eq("worker_id", shard["worker_id"]).execute()
+        self.publish_if_finished(shard["run_id"])
+
+    def release(self, shard: Dict[str, Any], error: Exception):
+        """Give a shard that raised back to the pool, or fail it once it has used its attempts"""
+        failed = shard["attempts"] >= MAX_SHARD_ATTEMPTS
+        get_supabase_client().table(SHARDS_TABLE).update({
+            "status": "failed" if failed else "pending",
+            "error": str(error),
+        }).eq("run_id", shard["run_id"]).eq("shard_key", shard["shard_key"]).eq("worker_id", shard["worker_id"]).execute()
+        if failed:
+            self.publish_if_finished(shard["run_id"])
+
+    def publish_if_finished(self, run_id: str) -> bool:
+        """Publish a run once none of its shards is pending or claimed
+
+        Only one worker wins the running -> publishing update, so a run is
+        published once. A run left publishing by a worker that died is taken
+        over after SHARD_CLAIM_TIMEOUT_SECONDS. Failed shards' spots keep their
+        previous forecasts.
+
+        Returns:
+            bool: Whether this call published the run
+        """
+        supabase = get_supabase_client()
+        statuses = supabase.table(SHARDS_TABLE).select("status").eq("run_id", run_id).execute().data
+        if any(shard["status"] in OPEN_STATUSES for shard in statuses):
+            return False
+        now = _now()
+        publishing = {"status": "publishing", "publishing_at": now.isoformat()}
+        won = supabase.table(RUNS_TABLE).update(publishing).eq("run_id", run_id) \
+            .eq("status", "running").execute().data
+        if not won:
+            expired = (now - datetime.timedelta(seconds=self.claim_timeout_seconds)).isoformat()
+            won = supabase.table(RUNS_TABLE).update(publishing).eq("run_id", run_id) \
+                .eq("status", "publishing").lt("publishing_at", expired).execute().data
+            if not won:
+                return False
+
+        try:
+            shards = supabase.table(SHARDS_TABLE).select("result", "updated").eq("run_id", run_id) \
+                .eq("status", "done").execute().data
+            results = [shard["result"] or {} for shard in shards]
+            forecasts = [row for result in results for row in result.get("forecasts", [])]
+            days = self.run_stages(run_id, [result["snapshot"] for result in results if result.get("snapshot")])
+            with self._lock:
+                self._applied_runs.add(run_id)
+
+            from .forecast_days import publish_daily_rows
+
+            version = next_version()
+            publish_spot_forecasts(forecasts, version)
+            publish_daily_rows(days, version)
+            supabase.table(RUNS_TABLE).update({
+                "status": "complete",
+                "version": version,
+                "updated": sum(shard["updated"] or 0 for shard in shards),
+                "failed_shards": sum(1 for shard in statuses if shard["status"] == "failed"),
+                "completed_at": _now().isoformat(),
+            }).eq("run_id", run_id).execute()
+        except Exception as e:
+            print(f"Error publishing forecast refresh {run_id}: {e}")
+            supabase.table(RUNS_TABLE).update({"status": "failed", "error": str(e)}).eq("run_id", run_id).execute()
+            raise
+        print(f"Published forecast refresh {run_id}: {len(forecasts)} spots from {len(shards)} shards")
+        return True
+
+    def run_stages(self, run_id: str, payloads: List[Dict[str, Any]], collect_days: bool = True) -> List[Dict[str, Any]]:
+        """Run the post-refresh stages once over every shard's staged series
+
+        Args:
+            run_id (str): The run the series belong to
+            payloads (list): Each done shard's staged ForecastSnapshot payload
+            collect_days (bool): Build the run's daily rows; off when replaying a run already published
+
+        Returns:
+            list: The run's daily rows, collected rather than stored so they publish with the forecasts
+        """
+        from .forecast_days import daily_rows
+        from .forecast_snapshot import ForecastSnapshot
+
+        series, corrections = {}, {}
+        for snapshot in (ForecastSnapshot.from_payload(payload) for payload in payloads):
+            for spot_id in snapshot.spot_ids:
+                series[spot_id] = snapshot.get(spot_id)
+            corrections.update(snapshot.meta.get("corrections", {}))
+        if not series:
+            return []
+        snapshot = ForecastSnapshot.from_series(series, {"unit": "english", "run_id": run_id, "corrections": corrections})
+        spots = [spot for spot in get_all_surf_spots() if str(spot["id"]) in snapshot]
+
+        days: List[Dict[str, Any]] = []
+
+        def collect_daily_forecasts(stage_spots, stage_snapshot):
+            days.extend(daily_rows(stage_spots, stage_snapshot))
+
+        stages = [collect_daily_forecasts if stage is update_daily_forecasts else stage for stage in POST_REFRESH_STAGES]
+        if not collect_days:
+            stages = [stage for stage in stages if stage is not collect_daily_forecasts]
+        run_post_refresh_stages(spots, snapshot, stages)
+        return days
+
+    def apply_published_runs(self) -> int:
+        """Replay the post-refresh stages of runs published by other workers
+
+        Only the publishing worker ran the stages, and the archive, delta log
+        and best-time index they write are this worker's own. Runs published
+        since the last check are replayed oldest first from their shards'
+        staged series; the daily rows were published with the run and aren't
+        rebuilt. A worker's first check replays just the newest run.
+
+        Returns:
+            int: Runs replayed
+        """
+        supabase = get_supabase_client()
+        query = supabase.table(RUNS_TABLE).select("run_id", "version").eq("status", "complete")
+        with self._lock:
+            applied_version = self._applied_version
+        if applied_version is None:
+            runs = query.order("version", desc=True).limit(1).execute().data
+        else:
+            runs = query.gt("version", applied_version).order("version").execute().data
+
+        replayed = 0
+        for run in runs:
+            with self._lock:
+                published_here = run["run_id"] in self._applied_runs
+                self._applied_runs.discard(run["run_id"])
+            if not published_here:
+                shards = supabase.table(SHARDS_TABLE).select("result").eq("run_id", run["run_id"]) \
+                    .eq("status", "done").execute().data
+                payloads = [(shard["result"] or {}).get("snapshot") for shard in shards]
+                self.run_stages(run["run_id"], [payload for payload in payloads if payload], collect_days=False)
+                replayed += 1
+                print(f"Replayed post-refresh stages of forecast refresh {run['run_id']}")
+            with self._lock:
+                self._applied_version = run["version"]
+        return replayed
+
+    def work(self, run_id: str, worker_id: Optional[str] = None, spots: Optional[List[Dict[str, Any]]] = None,
+             **kwargs) -> int:
+        """Claim and refresh a run's shards until none is left to claim
+
+        Other workers may still be finishing shards when this returns.
+
+        Args:
+            run_id (str): Run to work on
+            worker_id (str, optional): Defaults to host and process id
+            spots (list, optional): Spot dicts, read from surf_spots if not given
+            **kwargs: Passed to refresh_spot_forecasts (e.g. a weather_source override)
+
+        Returns:
+            int: Spots this worker updated
+        """
+        worker_id = worker_id or worker_name()
+        spots_by_id = None if spots is None else {str(spot["id"]): spot for spot in spots}
+        updated = 0
+        while True:
+            shard = self.claim(run_id, worker_id)
+            if shard is None:
+                return updated
+            if spots_by_id is None:
+                spots_by_id = {str(spot["id"]): spot for spot in get_all_surf_spots()}
+            shard_spots = [spots_by_id[spot_id] for spot_id in shard["spot_ids"] if spot_id in spots_by_id]
+            try:
+                result = self.refresh_shard(shard, shard_spots, **kwargs)
+            except Exception as e:
+                print(f"Shard {shard['shard_key']} of forecast refresh {run_id} failed: {e}")
+                self.release(shard, e)
+                continue
+            self.complete(shard, result)
+            updated += result["updated"]
+
+    def refresh(self, spots: List[Dict[str, Any]], run_id: Optional[str] = None, **kwargs) -> Optional[int]:
+        """Start this cycle's sharded run over `spots` and work on it, unless another worker started it
+
+        Args:
+            spots (list): Spot dicts to refresh
+            run_id (str, optional): Defaults to the current cycle's run id
+            **kwargs: Passed to work
+
+        Returns:
+            int: Spots this worker updated, or None if the run was already started elsewhere
+                (this worker then helps with it from work_open_runs)
+        """
+        run_id = run_id or cycle_run_id()
+        if self.create_run(spots, run_id) is None:
+            print(f"Forecast refresh {run_id} was already started by another worker")
+            return None
+        return self.work(run_id, spots=spots, **kwargs)
+
+    def work_open_runs(self):
+        """Scheduler entry point on every worker
+
+        Helps with any run that has unclaimed shards or is stuck publishing,
+        then replays the stages of runs published since the last call.
+        """
+        try:
+            for run_id in self.open_runs():
+                self.work(run_id)
+                self.publish_if_finished(run_id)
+        except Exception as e:
+            print(f"Error working on forecast refresh shards: {e}")
+        try:
+            self.apply_published_runs()
+        except Exception as e:
+            print(f"Error replaying published forecast refreshes: {e}")
+
+
+sharded_refresh = ShardedRefresh()
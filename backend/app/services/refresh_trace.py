@@ -0,0 +1,244 @@
+# app/services/refresh_trace.py
+import os
+import sys
+import json
+import time
+import random
+import threading
+import datetime
+from contextlib import contextmanager
+from datetime import timezone
+from typing import Any, Dict, List, Optional
+
+from .metrics import active_trace
+
+
+# JSON lines file that spot spans and run summaries are appended to; "-" writes to stdout, "" disables tracing
+REFRESH_TRACE_PATH = os.environ.get(
+    "REFRESH_TRACE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".cache", "refresh_traces.jsonl")
+)
+# The trace file is rotated to <path>.1 once it grows past this size
+REFRESH_TRACE_MAX_BYTES = int(os.environ.get("REFRESH_TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+# Set to "cprofile" to profile each spot's fetch with cProfile
+REFRESH_PROFILE = os.environ.get("REFRESH_PROFILE", "").lower()
+# Fraction of spots profiled when profiling is on
+REFRESH_PROFILE_SAMPLE_RATE = float(os.environ.get("REFRESH_PROFILE_SAMPLE_RATE", "1.0"))
+# Where per-spot and per-run pstats files go
+REFRESH_PROFILE_DIR = os.environ.get(
+    "REFRESH_PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".cache", "profiles")
+)
+# Slowest spots listed in each run summary
+SLOWEST_SPOTS = 5
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def _error_name(error: Optional[BaseException]) -> Optional[str]:
+    return f"{type(error).__name__}: {error}" if error is not None else None
+
+
+class SpanTrace(object):
+    """Spans recorded while a trace is active, in the order phases finished"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add_span(self, phase: str, start: float, seconds: float, error: Optional[BaseException] = None):
+        span = {"phase": phase, "offset_ms": round((start - self.started) * 1000, 3), "ms": round(seconds * 1000, 3)}
+        if error is not None:
+            span["error"] = _error_name(error)
+        self.spans.append(span)
+
+    def phase_totals(self) -> Dict[str, float]:
+        """Milliseconds per phase, summing phases that ran more than once"""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span["phase"]] = round(totals.get(span["phase"], 0.0) + span["ms"], 3)
+        return totals
+
+
+class RunTrace(SpanTrace):
+    """Structured timing for one refresh run: a JSON line per spot, then a run summary
+
+    Spot lines carry each phase span (offset from the spot's start, duration
+    and any error) plus wall-clock start time and thread id, so they can be
+    lined up with an external sampling profiler such as py-spy. Phases timed
+    outside a spot, like the post-refresh stages, are recorded on the run.
+    """
+
+    def __init__(self, tracer: "RefreshTracer", run_id: str):
+        super().__init__()
+        self.tracer = tracer
+        self.run_id = run_id
+        self.started_at = datetime.datetime.now(timezone.utc)
+        self.spots: List[Dict[str, Any]] = []
+        self._profile_stats = None
+
+    @contextmanager
+    def spot(self, spot: Dict[str, Any]):
+        """Trace one spot's refresh; yields a dict the caller can set "status" on
+
+        Once the block exits, the dict also holds the first phase that raised
+        ("failed_phase") and its error, or None for both.
+        """
+        trace = SpanTrace()
+        result: Dict[str, Any] = {"status": None}
+        profiler = self.tracer.start_profiler()
+        started_at = time.time()
+        token = active_trace.set(trace)
+        try:
+            yield result
+        finally:
+            active_trace.reset(token)
+            elapsed = time.perf_counter() - trace.started
+            line = {
+                "type": "spot",
+                "run_id": self.run_id,
+                "spot_id": spot.get("id"),
+                "spot_name": spot.get("name"),
+                "status": result["status"],
+                "started_at": started_at,
+                "thread_id": threading.get_ident(),
+                "ms": round(elapsed * 1000, 3),
+                "phases": trace.phase_totals(),
+                "spans": trace.spans,
+            }
+            errors = [span for span in trace.spans if "error" in span]
+            if errors:
+                line["error"] = errors[-1]["error"]
+            result["failed_phase"] = errors[0]["phase"] if errors else None
+            result["error"] = errors[0]["error"] if errors else None
+            if profiler is not None:
+                line["profile"] = self._save_profile(profiler, spot)
+            self.spots.append(line)
+            self.tracer.emit(line)
+
+    @contextmanager
+    def stages(self):
+        """Record phases timed in the block (e.g. post-refresh stages) on the run"""
+        token = active_trace.set(self)
+        try:
+            yield
+        finally:
+            active_trace.reset(token)
+
+    def _save_profile(self, profiler, spot) -> Optional[str]:
+        import pstats
+
+        profiler.disable()
+        try:
+            os.makedirs(self.tracer.profile_dir, exist_ok=True)
+            path = os.path.join(self.tracer.profile_dir, f"{self.run_id}-{spot.get('id')}.prof")
+            profiler.dump_stats(path)
+            if self._profile_stats is None:
+                self._profile_stats = pstats.Stats(profiler)
+            else:
+                self._profile_stats.add(profiler)
+            return path
+        except OSError as e:
+            print(f"Could not save refresh profile for spot {spot.get('id')}: {e}")
+            return None
+
+    def summary(self, updated: int, total: int) -> Dict[str, Any]:
+        by_phase: Dict[str, List[float]] = {}
+        for line in self.spots:
+            for phase, ms in line["phases"].items():
+                by_phase.setdefault(phase, []).append(ms)
+        phases = {
+            phase: {
+                "spots": len(values),
+                "total_ms": round(sum(values), 3),
+                "mean_ms": round(sum(values) / len(values), 3),
+                "p50_ms": _percentile(values, 0.5),
+                "p95_ms": _percentile(values, 0.95),
+                "max_ms": max(values),
+            }
+            for phase, values in by_phase.items()
+        }
+        failures: Dict[str, int] = {}
+        for line in self.spots:
+            if line["status"] != "updated":
+                phase = next((span["phase"] for span in line["spans"] if "error" in span), "unknown")
+                failures[phase] = failures.get(phase, 0) + 1
+        slowest = sorted(self.spots, key=lambda line: line["ms"], reverse=True)[:SLOWEST_SPOTS]
+        return {
+            "type": "run",
+            "run_id": self.run_id,
+            "started_at": self.started_at.isoformat(),
+            "ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "spots": total,
+            "updated": updated,
+            "failed": total - updated,
+            "failures_by_phase": failures,
+            "phases": phases,
+            "stages": self.phase_totals(),
+            "slowest": [{"spot_id": line["spot_id"], "ms": line["ms"]} for line in slowest],
+        }
+
+    def finish(self, updated: int, total: int) -> Dict[str, Any]:
+        """Emit the run summary (and the run's merged profile, if any)"""
+        summary = self.summary(updated, total)
+        if self._profile_stats is not None:
+            path = os.path.join(self.tracer.profile_dir, f"{self.run_id}.prof")
+            try:
+                self._profile_stats.dump_stats(path)
+                summary["profile"] = path
+            except OSError as e:
+                print(f"Could not save refresh profile for run {self.run_id}: {e}")
+        self.tracer.emit(summary)
+        return summary
+
+
+class RefreshTracer(object):
+    """Writes refresh traces as JSON lines and decides which spots get profiled"""
+
+    def __init__(self, path: Optional[str] = REFRESH_TRACE_PATH, profile: str = REFRESH_PROFILE,
+                 sample_rate: float = REFRESH_PROFILE_SAMPLE_RATE, profile_dir: str = REFRESH_PROFILE_DIR):
+        self.path = path
+        self.profile = profile
+        self.sample_rate = sample_rate
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+
+    def start_run(self, run_id: str) -> RunTrace:
+        return RunTrace(self, run_id)
+
+    def start_profiler(self):
+        """A running cProfile profiler for this spot, or None if it isn't sampled"""
+        if self.profile != "cprofile" or random.random() >= self.sample_rate:
+            return None
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a concurrent spot's) is already active on this thread
+            return None
+        return profiler
+
+    def emit(self, line: Dict[str, Any]):
+        if not self.path:
+            return
+        text = json.dumps(line, default=str) + "\n"
+        if self.path == "-":
+            sys.stdout.write(text)
+            return
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) > REFRESH_TRACE_MAX_BYTES:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a") as outfile:
+                    outfile.write(text)
+            except OSError as e:
+                print(f"Could not write refresh trace: {e}")
+
+
+refresh_tracer = RefreshTracer()
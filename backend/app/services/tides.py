@@ -0,0 +1,215 @@
+# app/services/tides.py
+import os
+import time
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+# NOAA CO-OPS station used for spots without a tide_station_id (Port San Luis, near the seeded SLO spots)
+DEFAULT_TIDE_STATION = os.environ.get("DEFAULT_TIDE_STATION", "9412110")
+# How long fetched high/low predictions are reused; they are astronomical predictions and rarely change
+TIDE_CACHE_TTL_SECONDS = int(os.environ.get("TIDE_CACHE_TTL_SECONDS", str(12 * 3600)))
+# After a failed fetch, spots using the station skip tides for this long instead of refetching
+TIDE_FAILURE_RETRY_SECONDS = 300
+# Extremes are fetched this far beyond the requested range so its ends fall between two events
+TIDE_EVENT_PADDING_SECONDS = 86400
+
+# Separates each series' events when many series are searched as one sorted array.
+# Unix seconds stay far below 2**40, so (series * stride + time) keeps series apart and times ordered.
+SERIES_STRIDE = np.int64(1) << np.int64(40)
+
+
+def tide_levels(event_times, event_levels, times, event_series=None, series=None) -> np.ndarray:
+    """Continuous water level reconstructed from high/low tide events
+
+    Between two consecutive extremes the level follows half a cosine wave,
+    which matches the shape of a semidiurnal tide far better than a polynomial
+    through every event and stays bounded by the neighbouring extremes. Each
+    time is located with one binary search, so the cost is O((n + m) log n)
+    for n events and m times.
+
+    Many stations (or spots) can be evaluated in one call by labelling events
+    and times with a series number; events never interpolate across series.
+
+    Args:
+        event_times (array): Event times in unix seconds, sorted within each series
+        event_levels (array): Water level at each event
+        times (array): Unix seconds to evaluate at
+        event_series (array, optional): Series number for each event, sorted. Defaults to a single series.
+        series (array, optional): Series number for each time
+
+    Returns:
+        np.ndarray: Water level at each time, NaN outside its series' first and last event
+    """
+    event_times = np.asarray(event_times, dtype=np.int64)
+    event_levels = np.asarray(event_levels, dtype=np.float64)
+    times = np.asarray(times, dtype=np.int64)
+    event_series = np.zeros(len(event_times), dtype=np.int64) if event_series is None else np.asarray(event_series, dtype=np.int64)
+    series = np.zeros(len(times), dtype=np.int64) if series is None else np.asarray(series, dtype=np.int64)
+    levels = np.full(len(times), np.nan)
+    if not len(event_times) or not len(times):
+        return levels
+
+    event_keys = event_series * SERIES_STRIDE + event_times
+    keys = series * SERIES_STRIDE + times
+    after = np.searchsorted(event_keys, keys, side="right")
+    before = after - 1
+    last = len(event_keys) - 1
+    before_clipped = np.clip(before, 0, last)
+    after_clipped = np.clip(after, 0, last)
+
+    has_before = (before >= 0) & (event_series[before_clipped] == series)
+    has_after = (after <= last) & (event_series[after_clipped] == series)
+    t0, t1 = event_times[before_clipped], event_times[after_clipped]
+    h0, h1 = event_levels[before_clipped], event_levels[after_clipped]
+
+    between = has_before & has_after
+    span = np.where(between, t1 - t0, 1)
+    fraction = np.where(between, (times - t0) / span, 0.0)
+    curve = h0 + (h1 - h0) * (1 - np.cos(np.pi * fraction)) / 2
+    levels[between] = curve[between]
+    # A time exactly on its series' last event has no following event but a known level
+    on_event = has_before & ~has_after & (times == t0)
+    levels[on_event] = h0[on_event]
+    return levels
+
+
+def station_for_spot(spot: Dict[str, Any]) -> str:
+    """NOAA tide station for a spot"""
+    return str(spot.get("tide_station_id") or DEFAULT_TIDE_STATION)
+
+
+def fetch_tide_events(station_id: str, location, start: int, stop: int, unit: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Predicted high/low tide events for a station from NOAA via surfpy
+
+    Returns:
+        tuple: (event times in unix seconds, water levels), sorted by time
+    """
+    import datetime
+    from datetime import timezone
+    import surfpy
+    from .upstream import install_upstream_replay
+
+    install_upstream_replay()
+    station = surfpy.TideStation(station_id, location)
+    events, _ = station.fetch_tide_data(
+        datetime.datetime.fromtimestamp(start, tz=timezone.utc),
+        datetime.datetime.fromtimestamp(stop, tz=timezone.utc),
+        interval=surfpy.TideStation.DataInterval.high_low,
+        unit=unit
+    )
+    events = [event for event in events or [] if event.water_level is not None]
+    times = np.array([int(event.date.timestamp()) for event in events], dtype=np.int64)
+    levels = np.array([event.water_level for event in events], dtype=np.float64)
+    order = np.argsort(times, kind="stable")
+    return times[order], levels[order]
+
+
+class TideEventCache(object):
+    """Shares fetched high/low tide events between spots that use the same station
+
+    Events are cached per station along with the time range they cover; a
+    request outside that range refetches the station with padding on both sides.
+    A failed fetch is remembered briefly as "no events" so one NOAA outage costs
+    one request per station rather than one per spot.
+    """
+
+    def __init__(self, ttl_seconds=TIDE_CACHE_TTL_SECONDS, fetch=fetch_tide_events):
+        self.ttl_seconds = ttl_seconds
+        self.fetch = fetch
+        # (station, unit) -> (expires at, range start, range stop, event times, event levels)
+        self._events: Dict[Tuple[str, str], Tuple[float, int, int, np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def get_events(self, station_id: str, location, start: int, stop: int, unit: str) -> Tuple[np.ndarray, np.ndarray]:
+        """High/low events for a station covering [start, stop]"""
+        key = (station_id, unit)
+        with self._lock:
+            entry = self._events.get(key)
+        if entry and time.monotonic() < entry[0] and entry[1] <= start and stop <= entry[2]:
+            return entry[3], entry[4]
+
+        fetch_start, fetch_stop = start - TIDE_EVENT_PADDING_SECONDS, stop + TIDE_EVENT_PADDING_SECONDS
+        try:
+            times, levels = self.fetch(station_id, location, fetch_start, fetch_stop, unit)
+            expires_at = time.monotonic() + self.ttl_seconds
+        except Exception as e:
+            print(f"Could not fetch tide events for station {station_id}: {e}")
+            times, levels = np.zeros(0, dtype=np.int64), np.zeros(0)
+            expires_at = time.monotonic() + TIDE_FAILURE_RETRY_SECONDS
+        with self._lock:
+            self._events[key] = (expires_at, fetch_start, fetch_stop, times, levels)
+        return times, levels
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+
+def prefetch_tide_events(spots: Iterable[Dict[str, Any]], start: int, stop: int, unit: str,
+                         locations: Optional[Dict[Any, Any]] = None, cache: Optional[TideEventCache] = None) -> int:
+    """Fetch each station's high/low events for [start, stop] into the cache, once per station
+
+    Run before a refresh so each spot's fill_tides call finds its station's
+    events already cached, however the spots are ordered.
+
+    Returns:
+        int: Number of stations fetched
+    """
+    cache = cache or tide_event_cache
+    stations = {}
+    for spot in spots:
+        stations.setdefault(station_for_spot(spot), spot)
+    for station_id, spot in stations.items():
+        cache.get_events(station_id, (locations or {}).get(spot["id"]), start, stop, unit)
+    return len(stations)
+
+
+def fill_tides(spots: Iterable[Dict[str, Any]], records_by_spot: Dict[Any, np.ndarray], unit: str,
+               locations: Optional[Dict[Any, Any]] = None, cache: Optional[TideEventCache] = None):
+    """Fill the tide field of every spot's records in place with one vectorized evaluation
+
+    Args:
+        spots (list): Spot dicts with id and optionally tide_station_id
+        records_by_spot (dict): spot_id -> FORECAST_DTYPE records to fill
+        unit (str): Unit system the records are in (english or metric)
+        locations (dict, optional): spot_id -> surfpy.Location passed on to the event fetch
+        cache (TideEventCache, optional): Defaults to the shared tide event cache
+    """
+    cache = cache or tide_event_cache
+    spots = [spot for spot in spots if spot["id"] in records_by_spot and len(records_by_spot[spot["id"]])]
+    if not spots:
+        return
+
+    # One event series per station, fetched once for the range every spot needs
+    stations = sorted({station_for_spot(spot) for spot in spots})
+    start = min(int(records_by_spot[spot["id"]]["time"].min()) for spot in spots)
+    stop = max(int(records_by_spot[spot["id"]]["time"].max()) for spot in spots)
+    event_times, event_levels, event_series = [], [], []
+    for number, station_id in enumerate(stations):
+        location = next((
+            (locations or {}).get(spot["id"]) for spot in spots if station_for_spot(spot) == station_id
+        ), None)
+        times, levels = cache.get_events(station_id, location, start, stop, unit)
+        event_times.append(times)
+        event_levels.append(levels)
+        event_series.append(np.full(len(times), number, dtype=np.int64))
+    station_numbers = {station_id: number for number, station_id in enumerate(stations)}
+    times = np.concatenate([records_by_spot[spot["id"]]["time"] for spot in spots])
+    series = np.concatenate([
+        np.full(len(records_by_spot[spot["id"]]), station_numbers[station_for_spot(spot)], dtype=np.int64)
+        for spot in spots
+    ])
+    levels = tide_levels(
+        np.concatenate(event_times), np.concatenate(event_levels), times, np.concatenate(event_series), series
+    )
+    offset = 0
+    for spot in spots:
+        records = records_by_spot[spot["id"]]
+        records["tide"] = levels[offset:offset + len(records)]
+        offset += len(records)
+
+
+tide_event_cache = TideEventCache()
@@ -0,0 +1,161 @@
+# app/services/units.py
+import datetime
+from functools import lru_cache
+from typing import Dict
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+
+# Unit systems, named like surfpy.units.Units
+METRIC = "metric"
+ENGLISH = "english"
+KNOTS = "knots"
+
+# Factors to convert into a base unit (meters per second and meters)
+SPEED_TO_MPS = {"m/s": 1.0, "mph": 0.44704, "knots": 0.514444, "kph": 1 / 3.6}
+HEIGHT_TO_M = {"m": 1.0, "ft": 0.3048}
+
+# Units each system uses for each measurement; periods and directions are the same in every system
+SYSTEM_UNITS = {
+    METRIC: {"speed": "m/s", "height": "m", "temperature": "C"},
+    ENGLISH: {"speed": "mph", "height": "ft", "temperature": "F"},
+    KNOTS: {"speed": "knots", "height": "ft", "temperature": "F"},
+}
+
+# Span of unix seconds covered by each zone's offset table; times outside it use the nearest end's offset
+OFFSET_TABLE_RANGE = (0, int(datetime.datetime(2100, 1, 1, tzinfo=datetime.timezone.utc).timestamp()))
+# Offsets are sampled this far apart when building a table; zones never change offset twice within it
+OFFSET_SAMPLE_SECONDS = 7 * 24 * 3600
+
+# Which measurement each FORECAST_DTYPE field holds
+RECORD_MEASUREMENTS = {
+    "wind_speed": "speed",
+    "minimum_breaking_height": "height",
+    "maximum_breaking_height": "height",
+    "wave_height": "height",
+    "swell_height": "height",
+    "air_temperature": "temperature",
+    "tide": "height",
+}
+
+
+def convert_speed(values, from_unit: str, to_unit: str) -> np.ndarray:
+    """Convert speeds between m/s, mph, knots and kph"""
+    values = np.asarray(values, dtype=np.float64)
+    if from_unit == to_unit:
+        return values
+    return values * (SPEED_TO_MPS[from_unit] / SPEED_TO_MPS[to_unit])
+
+
+def convert_height(values, from_unit: str, to_unit: str) -> np.ndarray:
+    """Convert heights between meters and feet"""
+    values = np.asarray(values, dtype=np.float64)
+    if from_unit == to_unit:
+        return values
+    return values * (HEIGHT_TO_M[from_unit] / HEIGHT_TO_M[to_unit])
+
+
+def convert_temperature(values, from_unit: str, to_unit: str) -> np.ndarray:
+    """Convert temperatures between C, F and K"""
+    values = np.asarray(values, dtype=np.float64)
+    if from_unit == to_unit:
+        return values
+    celsius = {"C": values, "F": (values - 32) * 5 / 9, "K": values - 273.15}[from_unit]
+    return {"C": celsius, "F": celsius * 9 / 5 + 32, "K": celsius + 273.15}[to_unit]
+
+
+CONVERTERS = {"speed": convert_speed, "height": convert_height, "temperature": convert_temperature}
+
+
+def convert_records(records: np.ndarray, from_system: str, to_system: str) -> np.ndarray:
+    """Convert a forecast records array between unit systems in one pass per field
+
+    Replaces calling BuoyData.change_units on every hour. Fields missing from
+    the array's dtype are skipped, so this works for FORECAST_DTYPE and the
+    archive's extended rows alike.
+
+    Args:
+        records (np.ndarray): Rows with FORECAST_DTYPE fields
+        from_system (str): METRIC, ENGLISH or KNOTS
+        to_system (str): METRIC, ENGLISH or KNOTS
+
+    Returns:
+        np.ndarray: A converted copy (or the same array if the systems match)
+    """
+    if from_system == to_system:
+        return records
+    converted = records.copy()
+    for field, measurement in RECORD_MEASUREMENTS.items():
+        if field in records.dtype.names:
+            converted[field] = CONVERTERS[measurement](
+                records[field], SYSTEM_UNITS[from_system][measurement], SYSTEM_UNITS[to_system][measurement]
+            )
+    return converted
+
+
+def _utc_offset(tz: ZoneInfo, timestamp: int) -> int:
+    return int(datetime.datetime.fromtimestamp(timestamp, tz).utcoffset().total_seconds())
+
+
+@lru_cache(maxsize=None)
+def _offset_table(tz_name: str):
+    """UTC transition times (unix seconds) and the UTC offset in seconds that starts at each
+
+    Built from zoneinfo's public API: the offset is sampled every
+    OFFSET_SAMPLE_SECONDS, and each change is narrowed to the exact second by
+    bisection.
+    """
+    tz = ZoneInfo(tz_name)
+    start, stop = OFFSET_TABLE_RANGE
+    samples = np.arange(start, stop + OFFSET_SAMPLE_SECONDS, OFFSET_SAMPLE_SECONDS)
+    sampled = [_utc_offset(tz, int(timestamp)) for timestamp in samples]
+    starts, offsets = [np.iinfo(np.int64).min], [sampled[0]]
+    for position in np.flatnonzero(np.diff(sampled)):
+        low, high = int(samples[position]), int(samples[position + 1])
+        while high - low > 1:
+            middle = (low + high) // 2
+            if _utc_offset(tz, middle) == sampled[position]:
+                low = middle
+            else:
+                high = middle
+        starts.append(high)
+        offsets.append(sampled[position + 1])
+    return np.array(starts, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+
+def utc_offsets(tz_name: str, times: np.ndarray) -> np.ndarray:
+    """UTC offsets in seconds for an array of unix timestamps in one timezone
+
+    Looks each timestamp up in the zone's transition table with searchsorted
+    instead of localizing datetimes one at a time. Tables are built once per zone.
+    """
+    starts, offsets = _offset_table(tz_name)
+    positions = np.searchsorted(starts, times, side="right") - 1
+    return offsets[np.clip(positions, 0, len(offsets) - 1)]
+
+
+def to_local(times: np.ndarray, tz_name: str) -> np.ndarray:
+    """Convert unix timestamps (UTC) to naive local datetime64[s] values for display"""
+    times = np.asarray(times, dtype=np.int64)
+    return (times + utc_offsets(tz_name, times)).astype("datetime64[s]")
+
+
+def to_local_by_zone(times: np.ndarray, zones: np.ndarray) -> np.ndarray:
+    """Local unix seconds for rows that each belong to a timezone, e.g. many spots at once
+
+    Args:
+        times (np.ndarray): Unix timestamps (UTC)
+        zones (np.ndarray): IANA timezone name for each timestamp
+    """
+    times = np.asarray(times, dtype=np.int64)
+    local = times.copy()
+    for zone in np.unique(zones):
+        in_zone = zones == zone
+        local[in_zone] += utc_offsets(str(zone), times[in_zone])
+    return local
+
+
+def system_units(system: str) -> Dict[str, str]:
+    """Units used for speed, height and temperature in a unit system"""
+    return SYSTEM_UNITS[system]
@@ -0,0 +1,71 @@
+# app/services/upstream.py
+import os
+import threading
+from typing import Optional
+from urllib.parse import urlsplit
+
+
+# Base URL of a record/replay server (tests/benchmarks/replay_server.py) that stands in for the
+# forecast data providers, e.g. http://localhost:8765. Unset means talk to the real services.
+UPSTREAM_REPLAY_URL = os.environ.get("UPSTREAM_REPLAY_URL")
+
+# Hosts surfpy and the forecast service fetch from: NOMADS GRIB, weather.gov and NOAA tides
+REPLAYED_HOSTS = (
+    "nomads.ncep.noaa.gov",
+    "api.weather.gov",
+    "api.tidesandcurrents.noaa.gov",
+    "tidesandcurrents.noaa.gov",
+)
+
+_install_lock = threading.Lock()
+_installed_base: Optional[str] = None
+
+
+def replay_url(url: str, base_url: str) -> str:
+    """Rewrite a provider URL onto the replay server as <base>/<host>/<path>?<query>
+
+    URLs for other hosts, or already on the replay server, are returned unchanged.
+    """
+    parts = urlsplit(url)
+    if parts.hostname not in REPLAYED_HOSTS:
+        return url
+    rewritten = f"{base_url.rstrip('/')}/{parts.hostname}{parts.path or '/'}"
+    return f"{rewritten}?{parts.query}" if parts.query else rewritten
+
+
+def install_upstream_replay(base_url: Optional[str] = None) -> bool:
+    """Send every requests call to the data providers through the replay server
+
+    surfpy builds its NOMADS, weather.gov and tide URLs internally and fetches
+    them with requests, so the redirect happens at the transport: each prepared
+    request to a REPLAYED_HOSTS host is rewritten before it is sent. Safe to call
+    repeatedly; only the first call patches.
+
+    Args:
+        base_url (str, optional): Replay server URL. Defaults to UPSTREAM_REPLAY_URL.
+
+    Returns:
+        bool: Whether requests are being redirected
+    """
+    global _installed_base
+    base_url = base_url or UPSTREAM_REPLAY_URL
+    if not base_url:
+        return False
+
+    with _install_lock:
+        if _installed_base is not None:
+            _installed_base = base_url
+            return True
+
+        import requests
+
+        send = requests.Session.send
+
+        def send_via_replay(session, request, **kwargs):
+            request.url = replay_url(request.url, _installed_base)
+            return send(session, request, **kwargs)
+
+        requests.Session.send = send_via_replay
+        _installed_base = base_url
+    print(f"Forecast data providers are being replayed from {base_url}")
+    return True
@@ -0,0 +1,171 @@
+# app/services/weather_cache.py
+import os
+import copy
+import json
+import time
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+from .metrics import record_cache_lookup
+from .upstream import install_upstream_replay
+
+
+# weather.gov points endpoint, used to resolve a coordinate to its forecast grid cell
+NWS_POINTS_URL = "https://api.weather.gov/points/{latitude:.4f},{longitude:.4f}"
+NWS_USER_AGENT = os.environ.get("NWS_USER_AGENT", "surf-app (wavefinder.onrender.com)")
+
+# Where the spot -> gridpoint mapping is persisted between runs
+GRIDPOINT_CACHE_PATH = os.environ.get(
+    "NWS_GRIDPOINT_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".cache", "nws_gridpoints.json")
+)
+
+# How long a fetched hourly forecast is shared before it is fetched again
+WEATHER_CACHE_TTL_SECONDS = int(os.environ.get("WEATHER_CACHE_TTL_SECONDS", "3600"))
+
+
+class WeatherForecastCache(object):
+    """Shares hourly weather forecasts between spots in the same NWS grid cell
+
+    Each spot is resolved to its weather.gov gridpoint once and the mapping is
+    persisted to disk. Hourly forecasts are then cached per grid cell, so nearby
+    spots like Shell Beach and Pismo Beach share a single fetch until the TTL expires.
+    """
+
+    def __init__(self, gridpoint_path=GRIDPOINT_CACHE_PATH, ttl_seconds=WEATHER_CACHE_TTL_SECONDS):
+        self.gridpoint_path = gridpoint_path
+        self.ttl_seconds = ttl_seconds
+        self._gridpoints = self._load_gridpoints()
+        self._forecasts: Dict[str, Tuple[float, list]] = {}
+        self._lock = threading.Lock()
+        self._cell_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def _location_key(location):
+        return f"{location.latitude:.4f},{location.longitude:.4f}"
+
+    def _load_gridpoints(self):
+        """Load the persisted location -> gridpoint mapping, if any"""
+        try:
+            with open(self.gridpoint_path, "r") as infile:
+                return json.load(infile)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_gridpoints(self):
+        """Persist the location -> gridpoint mapping atomically"""
+        try:
+            os.makedirs(os.path.dirname(self.gridpoint_path), exist_ok=True)
+            tmp_path = self.gridpoint_path + ".tmp"
+            with open(tmp_path, "w") as outfile:
+                json.dump(self._gridpoints, outfile)
+            os.replace(tmp_path, self.gridpoint_path)
+        except OSError as e:
+            print(f"Could not persist NWS gridpoint cache: {e}")
+
+    def resolve_gridpoint(self, location) -> Optional[Dict[str, Any]]:
+        """Resolve a location to its NWS forecast grid cell
+
+        Args:
+            location (surfpy.Location): The location to resolve
+
+        Returns:
+            dict: grid_id, grid_x and grid_y of the cell, or None if it could not be resolved
+        """
+        key = self._location_key(location)
+        with self._lock:
+            gridpoint = self._gridpoints.get(key)
+        record_cache_lookup("nws_gridpoint", hit=gridpoint is not None)
+        if gridpoint:
+            return gridpoint
+
+        import requests
+
+        install_upstream_replay()
+        try:
+            response = requests.get(
+                NWS_POINTS_URL.format(latitude=location.latitude, longitude=location.longitude),
+                headers={"User-Agent": NWS_USER_AGENT, "Accept": "application/geo+json"},
+                timeout=10
+            )
+            response.raise_for_status()
+            properties = response.json()["properties"]
+            gridpoint = {
+                "grid_id": properties["gridId"],
+                "grid_x": properties["gridX"],
+                "grid_y": properties["gridY"]
+            }
+        except (requests.RequestException, KeyError, ValueError) as e:
+            print(f"Could not resolve NWS gridpoint for {location.name}: {e}")
+            return None
+
+        with self._lock:
+            self._gridpoints[key] = gridpoint
+            self._save_gridpoints()
+        return gridpoint
+
+    def _cell_lock(self, cell_key):
+        with self._lock:
+            lock = self._cell_locks.get(cell_key)
+            if lock is None:
+                lock = self._cell_locks[cell_key] = threading.Lock()
+            return lock
+
+    def _cached_forecast(self, cell_key):
+        with self._lock:
+            entry = self._forecasts.get(cell_key)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            return entry[1]
+        return None
+
+    def get_hourly_forecast(self, location):
+        """Get the hourly weather forecast for a location, shared per grid cell
+
+        Args:
+            location (surfpy.Location): The location to fetch weather for
+
+        Returns:
+            list: Hourly surfpy.BuoyData weather records, or None if the fetch failed
+        """
+        import surfpy
+
+        gridpoint = self.resolve_gridpoint(location)
+        if not gridpoint:
+            # Fall back to an uncached fetch when the cell is unknown
+            return surfpy.WeatherApi.fetch_hourly_forecast(location)
+
+        cell_key = f'{gridpoint["grid_id"]}/{gridpoint["grid_x"]},{gridpoint["grid_y"]}'
+        data = self._cached_forecast(cell_key)
+        hit = data is not None
+        if data is None:
+            # Only one spot per cell fetches; the others wait and reuse its result
+            with self._cell_lock(cell_key):
+                data = self._cached_forecast(cell_key)
+                hit = data is not None
+                if data is None:
+                    data = surfpy.WeatherApi.fetch_hourly_forecast(location)
+                    if data:
+                        with self._lock:
+                            self._forecasts[cell_key] = (time.monotonic(), data)
+                            self._expire()
+        record_cache_lookup("weather_forecast", hit=hit)
+        if not data:
+            return data
+
+        # Hand out shallow copies so merging into one spot's wave data can't leak into another's
+        return [copy.copy(hour) for hour in data]
+
+    def _expire(self):
+        """Drop expired grid cell forecasts. Caller must hold the lock."""
+        now = time.monotonic()
+        expired = [key for key, (fetched_at, _) in self._forecasts.items() if now - fetched_at >= self.ttl_seconds]
+        for key in expired:
+            del self._forecasts[key]
+
+    def clear(self):
+        """Drop all cached forecasts, keeping the gridpoint mapping"""
+        with self._lock:
+            self._forecasts.clear()
+
+
+weather_cache = WeatherForecastCache()
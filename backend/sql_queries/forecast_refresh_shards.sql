@@ -0,0 +1,39 @@
+-- Sharded forecast refreshes: a run is split into one shard per wave model and lat/lon tile,
+-- and refresh workers claim shards from this table. There is one run per refresh cycle
+-- (run_id 'cycle-YYYYMMDDHH'), inserted by whichever worker gets there first.
+CREATE TABLE IF NOT EXISTS forecast_refresh_runs (
+  run_id TEXT PRIMARY KEY,
+  version BIGINT,                     -- spot_forecasts / spot_forecast_days version the run published under
+  status TEXT NOT NULL CHECK (status IN ('planning', 'running', 'publishing', 'complete', 'failed')),
+  shards INTEGER NOT NULL,
+  total INTEGER NOT NULL,             -- spots in the run
+  updated INTEGER,
+  failed_shards INTEGER,
+  error TEXT,
+  created_at TIMESTAMPTZ NOT NULL,
+  publishing_at TIMESTAMPTZ,          -- when a worker started publishing; taken over by another once it is too old
+  completed_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS forecast_refresh_shards (
+  id SERIAL PRIMARY KEY,
+  run_id TEXT NOT NULL REFERENCES forecast_refresh_runs(run_id) ON DELETE CASCADE,
+  shard_key TEXT NOT NULL,            -- '<wave model>:<lat tile>:<lon tile>'
+  wave_model TEXT NOT NULL,
+  spot_ids JSONB NOT NULL,
+  status TEXT NOT NULL CHECK (status IN ('pending', 'claimed', 'done', 'failed')),
+  worker_id TEXT,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  claimed_at TIMESTAMPTZ,
+  finished_at TIMESTAMPTZ,
+  updated INTEGER,
+  result JSONB,                       -- staged forecast rows and hourly series, published when the whole run finishes
+  error TEXT,
+  UNIQUE (run_id, shard_key)
+);
+
+-- Index for workers looking for open shards
+CREATE INDEX IF NOT EXISTS forecast_refresh_shards_run_status_idx ON forecast_refresh_shards(run_id, status);
+
+COMMENT ON TABLE forecast_refresh_runs IS 'Sharded forecast refresh runs; readers see a run once its status is complete';
+COMMENT ON TABLE forecast_refresh_shards IS 'Work-claiming table for sharded forecast refreshes';
@@ -0,0 +1,29 @@
+-- Forecast verification: reviews' reported wave heights vs archived forecasts
+CREATE TABLE IF NOT EXISTS spot_forecast_verification (
+  spot_id TEXT PRIMARY KEY,           -- surf_spots UUID the reviews' spots resolve to
+  reviews INTEGER NOT NULL,           -- reviews matched to a forecast hour
+  sum_error FLOAT NOT NULL,           -- running sums, so runs only add new reviews
+  sum_abs_error FLOAT NOT NULL,
+  sum_squared_error FLOAT NOT NULL,
+  sum_observed FLOAT NOT NULL,
+  sum_forecast FLOAT NOT NULL,
+  bias FLOAT,                         -- mean forecast minus observed (ft)
+  mae FLOAT,
+  rmse FLOAT,
+  correction_factor FLOAT NOT NULL DEFAULT 1.0,  -- applied to breaking heights on refresh
+  last_review_id INTEGER,
+  updated_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS forecast_verification_runs (
+  id SERIAL PRIMARY KEY,
+  last_review_id INTEGER NOT NULL,    -- reviews up to this id have been processed
+  processed INTEGER NOT NULL,
+  matched INTEGER NOT NULL,
+  finished_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS forecast_verification_runs_last_review_idx ON forecast_verification_runs(last_review_id);
+
+COMMENT ON TABLE spot_forecast_verification IS 'Per-spot forecast error statistics and correction factors from review verification';
+COMMENT ON TABLE forecast_verification_runs IS 'Verification job runs; the highest last_review_id is the incremental watermark';
@@ -0,0 +1,23 @@
+-- Publish versions for forecast rows. A refresh inserts a spot's new rows under a new
+-- version and then deletes older versions, so readers (which take the newest version)
+-- never see a spot without a forecast while it is replaced.
+ALTER TABLE spot_forecasts ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE spot_forecast_days ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+-- Index for reading each spot's newest version
+CREATE INDEX IF NOT EXISTS spot_forecasts_spot_version_idx ON spot_forecasts(spot_id, version DESC);
+CREATE INDEX IF NOT EXISTS spot_forecast_days_spot_version_idx ON spot_forecast_days(spot_id, version DESC, date);
+-- Index for the readiness ping, which reads the newest published forecast of any spot
+CREATE INDEX IF NOT EXISTS spot_forecasts_version_idx ON spot_forecasts(version DESC);
+
+-- Versions are handed out by one sequence so that rows published by different workers
+-- order correctly, whatever their clocks say. Start it past any version already stored.
+CREATE SEQUENCE IF NOT EXISTS forecast_version_seq;
+SELECT setval('forecast_version_seq', GREATEST(
+  (SELECT COALESCE(MAX(version), 0) FROM spot_forecasts),
+  (SELECT COALESCE(MAX(version), 0) FROM spot_forecast_days),
+  1
+));
+
+CREATE OR REPLACE FUNCTION next_forecast_version() RETURNS BIGINT
+LANGUAGE sql AS $$ SELECT nextval('forecast_version_seq') $$;
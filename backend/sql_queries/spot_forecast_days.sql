@@ -0,0 +1,34 @@
+-- Per-day forecast summaries, precomputed after each forecast refresh
+CREATE TABLE IF NOT EXISTS spot_forecast_days (
+  id SERIAL PRIMARY KEY,
+  spot_id UUID REFERENCES surf_spots(id) ON DELETE CASCADE,
+  spot_name TEXT,
+  date DATE NOT NULL,           -- calendar day in the spot's local timezone
+  day TEXT NOT NULL,            -- weekday name, e.g. 'Monday'
+  timezone TEXT NOT NULL,
+  hours INTEGER NOT NULL,       -- forecast hours that fell on this day
+  wave_height_min FLOAT,        -- minimum breaking height (ft)
+  wave_height_max FLOAT,        -- maximum breaking height (ft)
+  wave_height_mean FLOAT,
+  wind_speed_min FLOAT,
+  wind_speed_max FLOAT,
+  wind_speed_mean FLOAT,
+  wind_direction_mean FLOAT,    -- circular mean (degrees)
+  air_temperature_min FLOAT,
+  air_temperature_max FLOAT,
+  air_temperature_mean FLOAT,
+  updated_at TIMESTAMPTZ NOT NULL
+);
+
+-- Create index on spot_id and date for the forecast endpoint
+CREATE INDEX IF NOT EXISTS spot_forecast_days_spot_date_idx ON spot_forecast_days(spot_id, date);
+
+-- Set up Row Level Security (RLS)
+ALTER TABLE spot_forecast_days ENABLE ROW LEVEL SECURITY;
+
+-- Policy: Anyone can view daily forecasts
+CREATE POLICY "Daily forecasts are viewable by everyone" 
+    ON spot_forecast_days FOR SELECT 
+    USING (true);
+
+COMMENT ON TABLE spot_forecast_days IS 'Daily min/max/mean forecast summaries per spot, rewritten after each refresh';
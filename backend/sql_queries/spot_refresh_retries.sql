@@ -0,0 +1,16 @@
+-- Spots whose last forecast refresh failed, retried with exponential backoff
+CREATE TABLE IF NOT EXISTS spot_refresh_retries (
+  spot_id TEXT PRIMARY KEY,           -- surf_spots UUID or spots id
+  reason TEXT NOT NULL CHECK (reason IN ('fetch', 'parse', 'weather', 'db')),
+  error TEXT,
+  attempts INTEGER NOT NULL,          -- failed refreshes in a row
+  status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'dead')),
+  next_attempt_at TIMESTAMPTZ,        -- NULL once dead-lettered
+  last_failed_at TIMESTAMPTZ NOT NULL,
+  run_id TEXT                         -- refresh run (and trace) the last failure came from
+);
+
+-- Index for the retry poller's due-spots query
+CREATE INDEX IF NOT EXISTS spot_refresh_retries_due_idx ON spot_refresh_retries(status, next_attempt_at);
+
+COMMENT ON TABLE spot_refresh_retries IS 'Retry queue and dead-letter list for failed spot forecast refreshes';
@@ -0,0 +1,6 @@
+-- NOAA CO-OPS station whose high/low predictions fill a spot's tide curve.
+-- Spots without one use DEFAULT_TIDE_STATION (Port San Luis, 9412110).
+ALTER TABLE surf_spots ADD COLUMN IF NOT EXISTS tide_station_id TEXT;
+
+UPDATE surf_spots SET tide_station_id = '9412110'
+WHERE name IN ('Shell Beach', 'Pismo Beach', 'Morro Bay') AND tide_station_id IS NULL;
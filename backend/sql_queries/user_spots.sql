@@ -0,0 +1,16 @@
+-- Spots saved by each user, read by the saved spots dashboard
+CREATE TABLE IF NOT EXISTS user_spots (
+  id SERIAL PRIMARY KEY,
+  user_id TEXT NOT NULL,
+  spot_id INTEGER REFERENCES spots(id) ON DELETE CASCADE,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE (user_id, spot_id)
+);
+
+-- Create index on user_id for dashboard lookups
+CREATE INDEX IF NOT EXISTS user_spots_user_idx ON user_spots(user_id);
+
+-- Create index on reviews.spot_id for the dashboard's batched review stats
+CREATE INDEX IF NOT EXISTS reviews_spot_idx ON reviews(spot_id);
+
+COMMENT ON TABLE user_spots IS 'Spots saved by users';
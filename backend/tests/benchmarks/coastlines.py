@@ -0,0 +1,148 @@
+"""
+Synthetic surf spots placed along real coastlines.
+
+Each regional wave model covers a stretch of coast, digitized here as a coarse
+polyline of real shoreline points. coastline_spots(N) spreads N spots along
+those polylines by arc length (stratified, so spacing is even but not on a
+grid) and keeps each spot inside its model's bounds, so a refresh over them
+exercises the same wave model and NWS grid cell mix a real deployment would.
+
+Spot names start with the recorded fixture nearest in character to the coast
+(e.g. "Pismo Beach @ us_west_coast 17"), which is what the replay sources in
+replay.py and tune_spot key on.
+"""
+
+import math
+import random
+from bisect import bisect_right
+
+# Approximate extents (min lat, max lat, min lon, max lon) of surfpy's regional GFS wave grids
+WAVE_MODEL_BOUNDS = {
+    "us_west_coast": (25.0, 50.0, -130.0, -110.0),
+    "atlantic": (0.0, 55.0, -100.0, -30.0),
+    "hawaii": (15.0, 27.0, -165.0, -150.0),
+}
+
+# surfpy constructor for each wave model
+WAVE_MODEL_FACTORIES = {
+    "us_west_coast": "us_west_coast_gfs_wave_model",
+    "atlantic": "atlantic_gfs_wave_model",
+    "hawaii": "hawaii_gfs_wave_model",
+}
+
+# Shoreline points (lat, lon), in order along the coast
+COASTLINES = {
+    "us_west_coast": [
+        (32.53, -117.12), (32.85, -117.27), (33.19, -117.39), (33.46, -117.71), (33.65, -118.00),
+        (33.74, -118.41), (34.01, -118.50), (34.03, -118.78), (34.09, -119.06), (34.27, -119.29),
+        (34.40, -119.70), (34.45, -120.47), (34.58, -120.65), (35.14, -120.64), (35.37, -120.85),
+        (35.67, -121.28), (36.27, -121.81), (36.60, -121.89), (36.95, -122.02), (37.46, -122.44),
+        (37.78, -122.51), (38.00, -123.02), (38.30, -123.05), (38.95, -123.74), (40.44, -124.41),
+        (40.80, -124.20), (41.75, -124.20), (42.05, -124.28), (43.37, -124.32), (44.63, -124.06),
+        (45.89, -123.96), (46.25, -124.06), (46.89, -124.12), (47.91, -124.64), (48.38, -124.72),
+    ],
+    "atlantic": [
+        (25.77, -80.13), (26.70, -80.03), (27.85, -80.45), (28.40, -80.60), (29.21, -81.01),
+        (30.33, -81.39), (31.98, -80.85), (32.75, -79.87), (33.69, -78.88), (34.21, -77.79),
+        (34.60, -76.54), (35.22, -75.53), (35.96, -75.62), (36.85, -75.97), (38.33, -75.08),
+        (38.93, -74.90), (39.36, -74.42), (40.11, -74.03), (40.58, -73.82), (41.07, -71.86),
+        (41.43, -71.46), (41.67, -69.95), (42.63, -70.60), (42.91, -70.81), (43.65, -70.20),
+        (44.38, -68.20),
+    ],
+    "hawaii": [
+        (21.26, -157.81), (21.30, -157.65), (21.46, -157.76), (21.64, -157.92), (21.68, -158.03),
+        (21.66, -158.05), (21.60, -158.10), (21.58, -158.23), (21.46, -158.21), (21.31, -158.12),
+        (21.27, -157.83),
+    ],
+}
+
+# Recorded fixtures (see replay.FIXTURES) that stand in for each coast's forecasts
+COAST_FIXTURES = {
+    "us_west_coast": ("Morro Bay", "Shell Beach", "Pismo Beach"),
+    "atlantic": ("Rhode Island",),
+    "hawaii": ("Morro Bay",),
+}
+
+# Spots are nudged up to this many degrees off the digitized shoreline
+JITTER_DEGREES = 0.01
+
+
+def _segment_lengths(points):
+    """Approximate length in km of each polyline segment (equirectangular)"""
+    lengths = []
+    for (lat1, lon1), (lat2, lon2) in zip(points, points[1:]):
+        x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+        y = math.radians(lat2 - lat1)
+        lengths.append(6371.0 * math.hypot(x, y))
+    return lengths
+
+
+def coastline_length_km(model):
+    return sum(_segment_lengths(COASTLINES[model]))
+
+
+def _split_count(count, models):
+    """Spots per model, proportional to coastline length"""
+    lengths = {model: coastline_length_km(model) for model in models}
+    total = sum(lengths.values())
+    shares = {model: int(count * length / total) for model, length in lengths.items()}
+    # Hand the rounding remainder to the longest coasts
+    for model in sorted(models, key=lambda m: -lengths[m])[:count - sum(shares.values())]:
+        shares[model] += 1
+    return shares
+
+
+def points_along(points, count, rng):
+    """`count` points spread along a polyline by arc length, one per equal-length stratum"""
+    lengths = _segment_lengths(points)
+    cumulative = [0.0]
+    for length in lengths:
+        cumulative.append(cumulative[-1] + length)
+    total = cumulative[-1]
+
+    placed = []
+    for k in range(count):
+        distance = (k + rng.random()) / count * total
+        segment = min(bisect_right(cumulative, distance) - 1, len(lengths) - 1)
+        fraction = (distance - cumulative[segment]) / lengths[segment] if lengths[segment] else 0.0
+        (lat1, lon1), (lat2, lon2) = points[segment], points[segment + 1]
+        placed.append((lat1 + (lat2 - lat1) * fraction, lon1 + (lon2 - lon1) * fraction))
+    return placed
+
+
+def coastline_spots(count, seed=0, models=None):
+    """Generate `count` synthetic spots along the coasts covered by the given wave models
+
+    Args:
+        count (int): Number of spots
+        seed (int): Random seed, so a given (count, seed) always yields the same spots
+        models (list, optional): Wave model keys from WAVE_MODEL_BOUNDS. Defaults to all of them.
+
+    Returns:
+        list: Spot dicts with id, name, latitude, longitude, wave_model and location
+    """
+    rng = random.Random(seed)
+    models = list(models or COASTLINES)
+    spots = []
+    for model, model_count in _split_count(count, models).items():
+        min_lat, max_lat, min_lon, max_lon = WAVE_MODEL_BOUNDS[model]
+        fixtures = COAST_FIXTURES[model]
+        for index, (latitude, longitude) in enumerate(points_along(COASTLINES[model], model_count, rng)):
+            latitude = min(max(latitude + rng.uniform(-JITTER_DEGREES, JITTER_DEGREES), min_lat), max_lat)
+            longitude = min(max(longitude + rng.uniform(-JITTER_DEGREES, JITTER_DEGREES), min_lon), max_lon)
+            spots.append({
+                "id": len(spots) + 1,
+                "name": f"{fixtures[index % len(fixtures)]} @ {model} {index + 1}",
+                "latitude": round(latitude, 4),
+                "longitude": round(longitude, 4),
+                "wave_model": model,
+                "location": model,
+            })
+    return spots
+
+
+if __name__ == "__main__":
+    import sys
+
+    for spot in coastline_spots(int(sys.argv[1]) if len(sys.argv) > 1 else 20):
+        print(f"{spot['id']:>5} {spot['wave_model']:<14} {spot['latitude']:>9.4f} {spot['longitude']:>10.4f}  {spot['name']}")
@@ -0,0 +1,198 @@
+"""
+Offline benchmark for the forecast refresh pipeline.
+
+Replays the recorded surfpy fixtures through refresh_spot_forecasts at several
+spot counts, without touching NOMADS, weather.gov or Supabase. Each spot count
+runs in a fresh interpreter so peak RSS is measured per run.
+
+For each spot count this reports:
+1. Throughput (spots/second) and total wall time
+2. Mean latency of each refresh phase (grib_fetch, grib_parse, to_buoy_data,
+   weather_fetch, merge, breaking_wave_solve, to_records, tide_fetch, db_write)
+3. Peak RSS of the process
+
+Results are written to tests/benchmarks/results/<timestamp>-<commit>.json so runs
+can be compared across commits.
+
+Usage:
+    python tests/benchmarks/forecast_pipeline_bench.py [--spots 10 100 1000] [--compare RESULTS.json]
+
+Options:
+    --spots N [N ...]       Spot counts to run (default: 10 100 1000)
+    --grib-latency-ms MS    Simulated GRIB download latency per spot (default: 0)
+    --weather-latency-ms MS Simulated weather fetch latency per spot (default: 0)
+    --compare PATH          Previous results file to compare throughput against
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import contextlib
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# Add the backend directory to the path so we can import from the app
+sys.path.append(BACKEND_DIR)
+
+PHASES = ["grib_fetch", "grib_parse", "to_buoy_data", "weather_fetch", "merge", "breaking_wave_solve",
+          "to_records", "tide_fetch", "db_write"]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_once(spot_count, grib_latency_ms, weather_latency_ms):
+    """Run one refresh over `spot_count` synthetic spots in this process"""
+    from replay import ReplayWaveModel, ReplayWeatherSource, replay_tide_events, synthetic_spots
+    from app.services.forecast_service import refresh_spot_forecasts
+    from app.services.metrics import forecast_refresh_phase_duration_seconds
+    from app.services.tides import tide_event_cache
+
+    spots = synthetic_spots(spot_count)
+    wave_model = ReplayWaveModel(fetch_latency_ms=grib_latency_ms)
+    weather_source = ReplayWeatherSource(fetch_latency_ms=weather_latency_ms)
+    tide_event_cache.fetch = replay_tide_events
+
+    written = []
+
+    def save_forecast(spot_id, forecast):
+        with forecast_refresh_phase_duration_seconds.time(phase="db_write"):
+            written.append(json.dumps(forecast))
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        updated = refresh_spot_forecasts(
+            spots,
+            wave_model=wave_model,
+            weather_source=weather_source,
+            save_forecast=save_forecast,
+            post_refresh=[]
+        )
+    elapsed = time.perf_counter() - start
+
+    phases = {}
+    for phase in PHASES:
+        count, total = forecast_refresh_phase_duration_seconds.get(phase=phase)
+        phases[phase] = {
+            "count": count,
+            "total_seconds": total,
+            "mean_ms": (total / count * 1000) if count else None
+        }
+
+    return {
+        "spots": spot_count,
+        "updated": updated,
+        "rows_written": len(written),
+        "wall_seconds": elapsed,
+        "spots_per_second": spot_count / elapsed if elapsed else None,
+        "phases": phases,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def run_in_subprocess(spot_count, args):
+    result = subprocess.run(
+        [
+            sys.executable, os.path.abspath(__file__), "--child",
+            "--spots", str(spot_count),
+            "--grib-latency-ms", str(args.grib_latency_ms),
+            "--weather-latency-ms", str(args.weather_latency_ms)
+        ],
+        cwd=BENCH_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        raise RuntimeError(f"Benchmark run with {spot_count} spots failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results, previous=None):
+    previous_by_count = {r["spots"]: r for r in (previous or {}).get("runs", [])}
+
+    print("\n" + "=" * 100)
+    print("FORECAST PIPELINE BENCHMARK")
+    print("=" * 100)
+    header = f"{'Spots':<8} {'Wall (s)':<10} {'Spots/s':<10} {'Peak RSS':<10}"
+    header += "".join(f" {phase[:14]:<15}" for phase in PHASES)
+    print(header)
+    print("-" * 100)
+
+    for run in results["runs"]:
+        row = f"{run['spots']:<8} {run['wall_seconds']:<10.2f} {run['spots_per_second']:<10.1f} {run['peak_rss_mb']:<7.0f} MB"
+        for phase in PHASES:
+            mean_ms = run["phases"][phase]["mean_ms"]
+            row += f" {(f'{mean_ms:.2f} ms' if mean_ms is not None else 'N/A'):<15}"
+        print(row)
+
+        before = previous_by_count.get(run["spots"])
+        if before and before.get("spots_per_second"):
+            change = (run["spots_per_second"] / before["spots_per_second"] - 1) * 100
+            print(f"{'':<8} vs {previous['commit']}: {change:+.1f}% throughput, "
+                  f"{run['peak_rss_mb'] - before['peak_rss_mb']:+.0f} MB peak RSS")
+
+    print("=" * 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the forecast pipeline on recorded fixtures.")
+    parser.add_argument("--spots", type=int, nargs="+", default=[10, 100, 1000], help="Spot counts to run")
+    parser.add_argument("--grib-latency-ms", type=float, default=0.0, help="Simulated GRIB download latency")
+    parser.add_argument("--weather-latency-ms", type=float, default=0.0, help="Simulated weather fetch latency")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_once(args.spots[0], args.grib_latency_ms, args.weather_latency_ms)))
+        return 0
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "grib_latency_ms": args.grib_latency_ms,
+        "weather_latency_ms": args.weather_latency_ms,
+        "runs": []
+    }
+    for spot_count in args.spots:
+        print(f"Running pipeline over {spot_count} synthetic spots...")
+        results["runs"].append(run_in_subprocess(spot_count, args))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['commit']}.json")
+    with open(out_path, "w") as outfile:
+        json.dump(results, outfile, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, "r") as infile:
+            previous = json.load(infile)
+
+    print_report(results, previous)
+    print(f"Results saved to {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
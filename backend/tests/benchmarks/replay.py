@@ -0,0 +1,147 @@
+"""
+Replay sources for running the forecast pipeline offline.
+
+The recorded surfpy output in tests/<spot>/..._forecast.json is deserialized back
+into surfpy BuoyData/Swell objects and served through the same interfaces the
+forecast service uses: a wave model (fetch_grib_datas / parse_grib_datas /
+to_buoy_data), a weather source (get_hourly_forecast) and a tide event fetch
+(predicted highs and lows of a synthetic semidiurnal tide). Synthetic spots are
+cloned from the recorded locations so the pipeline can be driven at any scale.
+"""
+
+import os
+import json
+import time
+import random
+import importlib
+from datetime import datetime, timezone
+
+TESTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Recorded fixtures: spot name -> (latitude, longitude, forecast json)
+FIXTURES = {
+    "Morro Bay": (35.3658, -120.8522, os.path.join(TESTS_DIR, "morro", "morro_bay_forecast.json")),
+    "Shell Beach": (35.1553, -120.6724, os.path.join(TESTS_DIR, "shell", "shell_beach_forecast.json")),
+    "Pismo Beach": (35.1428, -120.6412, os.path.join(TESTS_DIR, "pismo", "pismo_beach_forecast.json")),
+    "Rhode Island": (41.35, -71.4, os.path.join(TESTS_DIR, "rhode_island", "forecast.json")),
+}
+
+# Serialized fields that surfpy stores as unix timestamps
+DATE_FIELDS = ("date", "expiration_date")
+
+
+def deserialize(value):
+    """Rebuild surfpy objects from the output of surfpy.serialize"""
+    if isinstance(value, list):
+        return [deserialize(item) for item in value]
+    if isinstance(value, dict):
+        if "classname__" not in value:
+            return {key: deserialize(item) for key, item in value.items()}
+        module = importlib.import_module(value["modulename__"])
+        cls = getattr(module, value["classname__"])
+        obj = cls.__new__(cls)
+        for key, item in value.items():
+            if key.endswith("__"):
+                continue
+            if key in DATE_FIELDS and item is not None:
+                item = datetime.fromtimestamp(item, tz=timezone.utc)
+            setattr(obj, key, deserialize(item))
+        return obj
+    return value
+
+
+def fixture_for(name):
+    """Find the recorded fixture a (possibly synthetic) spot name was cloned from"""
+    for fixture_name in FIXTURES:
+        if name.startswith(fixture_name):
+            return fixture_name
+    raise KeyError(f"No recorded fixture for spot {name}")
+
+
+def load_fixture_text(fixture_name):
+    with open(FIXTURES[fixture_name][2], "r") as infile:
+        return infile.read()
+
+
+def synthetic_spots(count, seed=0, fixtures=None):
+    """Clone the recorded spots into `count` synthetic spots with jittered coordinates
+
+    Names keep the fixture prefix (e.g. "Morro Bay #12") so tune_spot and the
+    replay sources still resolve them.
+    """
+    rng = random.Random(seed)
+    names = list(fixtures or FIXTURES)
+    spots = []
+    for i in range(count):
+        name = names[i % len(names)]
+        latitude, longitude, _ = FIXTURES[name]
+        spots.append({
+            "id": i + 1,
+            "name": f"{name} #{i + 1}",
+            "latitude": latitude + rng.uniform(-0.05, 0.05),
+            "longitude": longitude + rng.uniform(-0.05, 0.05),
+        })
+    return spots
+
+
+class ReplayWaveModel(object):
+    """Stands in for a surfpy wave model, serving recorded forecasts
+
+    fetch_grib_datas returns the recorded payload (optionally after a simulated
+    download latency), parse_grib_datas decodes it and to_buoy_data rebuilds
+    metric-unit BuoyData the way the real model does.
+    """
+
+    def __init__(self, fetch_latency_ms=0.0):
+        self.fetch_latency_ms = fetch_latency_ms
+        self._payloads = {name: load_fixture_text(name) for name in FIXTURES}
+
+    def fetch_grib_datas(self, start_time_index, end_time_index, location=None):
+        if self.fetch_latency_ms:
+            time.sleep(self.fetch_latency_ms / 1000.0)
+        return self._payloads[fixture_for(location.name)]
+
+    def parse_grib_datas(self, location, grib_data):
+        return json.loads(grib_data)
+
+    def to_buoy_data(self, raw_data):
+        import surfpy
+
+        data = deserialize(raw_data)
+        for dat in data:
+            dat.change_units(surfpy.units.Units.metric)
+        return data
+
+
+class ReplayWeatherSource(object):
+    """Stands in for the weather cache, serving the recorded hourly wind"""
+
+    def __init__(self, fetch_latency_ms=0.0):
+        self.fetch_latency_ms = fetch_latency_ms
+        self._payloads = {name: json.loads(load_fixture_text(name)) for name in FIXTURES}
+
+    def get_hourly_forecast(self, location):
+        if self.fetch_latency_ms:
+            time.sleep(self.fetch_latency_ms / 1000.0)
+        return deserialize(self._payloads[fixture_for(location.name)])
+
+
+# Mean time between a high and the next low of the principal lunar tide (half of 12h 25m)
+HALF_TIDE_SECONDS = 22357
+
+
+def replay_tide_events(station_id, location, start, stop, unit):
+    """Stands in for the NOAA high/low prediction fetch with a synthetic tide
+
+    Highs of 5 ft and lows of 0.5 ft (or the metric equivalent) alternate
+    every half tidal cycle, with a small spring/neap variation.
+    """
+    import numpy as np
+
+    times = np.arange(start - start % HALF_TIDE_SECONDS, stop + HALF_TIDE_SECONDS, HALF_TIDE_SECONDS, dtype=np.int64)
+    high = (times // HALF_TIDE_SECONDS) % 2 == 0
+    springs = 0.5 * np.sin(2 * np.pi * times / (14.77 * 86400))
+    levels = np.where(high, 5.0 + springs, 0.5 - springs)
+    if unit == "metric":
+        levels = levels * 0.3048
+    return times, levels
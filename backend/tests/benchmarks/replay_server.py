@@ -0,0 +1,298 @@
+"""
+Record/replay HTTP stand-in for NOMADS, weather.gov and NOAA tides.
+
+Requests arrive as /<host>/<path>?<query> (app.services.upstream.replay_url
+rewrites provider URLs into that form) and are answered from a recordings
+directory:
+
+    <dir>/<host>/<key>.body    response body, byte for byte (GRIB or JSON)
+    <dir>/<host>/<key>.json    url, status, content type and when it was recorded
+
+In record mode, requests that aren't recorded yet are fetched from
+https://<host>/<path> and saved. In replay mode nothing touches the network:
+unknown requests get a 404. NOMADS paths embed the model run date and cycle
+(gfs.20250701/06/...t06z...), so replay falls back to the most recent recording
+with the same URL once dates and cycles are masked out; --strict disables that.
+
+Every response can be slowed down with a fixed latency before the first byte
+and a bandwidth cap while streaming the body, for reproducible measurements of
+the fetch path on a machine with no network.
+
+Usage:
+    # Capture a refresh's traffic, then serve it back
+    python tests/benchmarks/replay_server.py record --port 8765
+    python tests/benchmarks/replay_server.py serve --port 8765 --latency-ms 80 --bandwidth-kbps 4000
+    UPSTREAM_REPLAY_URL=http://localhost:8765 uvicorn app.main:app
+
+    # Run a surfpy script against the recordings, with the server in-process
+    python tests/benchmarks/replay_server.py exec [--record] -- tests/morro/morro_bay_test.py
+
+Options:
+    --dir PATH              Recordings directory (default: tests/benchmarks/recordings)
+    --port N                Port to listen on (default: 8765; exec picks a free port)
+    --latency-ms MS         Delay before each response (default: 0)
+    --bandwidth-kbps KBPS   Cap on response body throughput in kilobits/s (default: unlimited)
+    --strict                Only serve exact URL matches
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import runpy
+import hashlib
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(os.path.dirname(BENCH_DIR))
+RECORDINGS_DIR = os.path.join(BENCH_DIR, "recordings")
+
+# Add the backend directory to the path so we can import from the app
+sys.path.append(BACKEND_DIR)
+
+# Bytes written per throttled chunk
+CHUNK_SIZE = 16 * 1024
+# Seconds to wait for a provider while recording; NOMADS GRIB downloads can be slow
+UPSTREAM_TIMEOUT_SECONDS = 120
+# Sent upstream when the client didn't send one; weather.gov rejects requests without it
+DEFAULT_USER_AGENT = os.environ.get("NWS_USER_AGENT", "surf-app (wavefinder.onrender.com)")
+
+# Model run dates and cycle hours in NOMADS paths and file names
+_RUN_DATE = re.compile(r"20\d{6}")
+_CYCLE_DIR = re.compile(r"(\{date\}/)\d{2}(?=/)")
+_CYCLE_FILE = re.compile(r"\bt\d{2}z\b")
+
+
+def request_key(path_query):
+    return hashlib.sha1(path_query.encode("utf-8")).hexdigest()[:20]
+
+
+def url_shape(path_query):
+    """A request with its model run date and cycle masked, for matching across runs"""
+    shape = _RUN_DATE.sub("{date}", unquote(path_query))
+    shape = _CYCLE_DIR.sub(r"\1{cycle}", shape)
+    return _CYCLE_FILE.sub("t{cycle}z", shape)
+
+
+class Recordings(object):
+    """Recorded responses on disk, indexed by exact URL and by URL shape"""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._exact = {}
+        self._shapes = {}
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.isdir(self.root):
+            return
+        for host in sorted(os.listdir(self.root)):
+            host_dir = os.path.join(self.root, host)
+            if not os.path.isdir(host_dir):
+                continue
+            for name in os.listdir(host_dir):
+                if name.endswith(".json"):
+                    with open(os.path.join(host_dir, name), "r") as infile:
+                        self._index(host, json.load(infile))
+
+    def _index(self, host, meta):
+        entry = (host, meta["key"], meta["recorded_at"])
+        self._exact[(host, meta["path_query"])] = entry
+        shape = (host, url_shape(meta["path_query"]))
+        current = self._shapes.get(shape)
+        if current is None or current[2] <= meta["recorded_at"]:
+            self._shapes[shape] = entry
+
+    def find(self, host, path_query, loose=True):
+        """(meta, body path, how it matched) for a request, or None"""
+        with self._lock:
+            entry, match = self._exact.get((host, path_query)), "exact"
+            if entry is None and loose:
+                entry, match = self._shapes.get((host, url_shape(path_query))), "shape"
+        if entry is None:
+            return None
+        host, key, _ = entry
+        base = os.path.join(self.root, host, key)
+        with open(base + ".json", "r") as infile:
+            return json.load(infile), base + ".body", match
+
+    def save(self, host, path_query, status, content_type, body):
+        key = request_key(path_query)
+        host_dir = os.path.join(self.root, host)
+        os.makedirs(host_dir, exist_ok=True)
+        meta = {
+            "key": key,
+            "url": f"https://{host}{path_query}",
+            "path_query": path_query,
+            "status": status,
+            "content_type": content_type,
+            "size": len(body),
+            "recorded_at": datetime.now(timezone.utc).isoformat()
+        }
+        base = os.path.join(host_dir, key)
+        # Body first, so an indexed recording always has its body
+        with open(base + ".body.tmp", "wb") as outfile:
+            outfile.write(body)
+        os.replace(base + ".body.tmp", base + ".body")
+        with open(base + ".json.tmp", "w") as outfile:
+            json.dump(meta, outfile, indent=2)
+        os.replace(base + ".json.tmp", base + ".json")
+        with self._lock:
+            self._index(host, meta)
+        return meta, base + ".body"
+
+
+def fetch_upstream(host, path_query, headers):
+    """Fetch a request from the real provider; HTTP errors are returned (and recorded) like any response"""
+    request = urllib.request.Request(f"https://{host}{path_query}", headers={
+        "User-Agent": headers.get("User-Agent") or DEFAULT_USER_AGENT,
+        "Accept": headers.get("Accept") or "*/*",
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=UPSTREAM_TIMEOUT_SECONDS) as response:
+            return response.status, response.headers.get("Content-Type", "application/octet-stream"), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get("Content-Type", "text/plain"), e.read()
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serves /<host>/<path>?<query> from the server's recordings"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def _respond(self, send_body):
+        server = self.server
+        host, _, rest = self.path.lstrip("/").partition("/")
+        path_query = "/" + rest
+        found = server.recordings.find(host, path_query, loose=not server.strict)
+        source = found[2] if found else None
+
+        if server.record and (found is None or source != "exact"):
+            try:
+                status, content_type, body = fetch_upstream(host, path_query, self.headers)
+            except (OSError, ValueError) as e:
+                self._error(502, f"Could not fetch https://{host}{path_query}: {e}")
+                return
+            meta, body_path = server.recordings.save(host, path_query, status, content_type, body)
+            found, source = (meta, body_path, "recorded"), "recorded"
+
+        if found is None:
+            self._error(404, f"No recording for https://{host}{path_query}")
+            return
+
+        meta, body_path, _ = found
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000.0)
+        self.send_response(meta["status"])
+        self.send_header("Content-Type", meta["content_type"])
+        self.send_header("Content-Length", str(meta["size"]))
+        self.send_header("X-Replay", source)
+        self.end_headers()
+        if send_body:
+            self._stream(body_path)
+
+    def _stream(self, body_path):
+        bytes_per_second = self.server.bandwidth_kbps * 1000 / 8 if self.server.bandwidth_kbps else None
+        with open(body_path, "rb") as infile:
+            while True:
+                chunk = infile.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                started = time.perf_counter()
+                self.wfile.write(chunk)
+                if bytes_per_second:
+                    remaining = len(chunk) / bytes_per_second - (time.perf_counter() - started)
+                    if remaining > 0:
+                        time.sleep(remaining)
+
+    def _error(self, status, message):
+        body = json.dumps({"detail": message}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def create_server(recordings_dir=RECORDINGS_DIR, port=8765, record=False, latency_ms=0.0, bandwidth_kbps=None,
+                  strict=False, quiet=False):
+    """Create (but don't start) a replay server; port 0 picks a free port"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), ReplayHandler)
+    server.daemon_threads = True
+    server.recordings = Recordings(recordings_dir)
+    server.record = record
+    server.latency_ms = latency_ms
+    server.bandwidth_kbps = bandwidth_kbps
+    server.strict = strict
+    server.quiet = quiet
+    return server
+
+
+def server_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run_script(server, script, script_args):
+    """Run a Python script with its provider requests redirected to an in-process server"""
+    from app.services.upstream import install_upstream_replay
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        install_upstream_replay(server_url(server))
+        sys.argv = [script] + list(script_args)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay forecast provider HTTP traffic.")
+    parser.add_argument("mode", choices=["record", "serve", "exec"], help="record, serve recordings, or run a script")
+    parser.add_argument("--dir", default=RECORDINGS_DIR, help="Recordings directory")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before each response")
+    parser.add_argument("--bandwidth-kbps", type=float, help="Response body throughput cap")
+    parser.add_argument("--strict", action="store_true", help="Only serve exact URL matches")
+    parser.add_argument("--record", action="store_true", help="With exec: record requests that aren't recorded yet")
+    parser.add_argument("script", nargs="*", help="With exec: script and its arguments (after --)")
+    args = parser.parse_args()
+
+    record = args.mode == "record" or args.record
+    if args.mode == "exec":
+        if not args.script:
+            parser.error("exec needs a script to run")
+        server = create_server(args.dir, 0, record, args.latency_ms, args.bandwidth_kbps, args.strict, quiet=True)
+        run_script(server, args.script[0], args.script[1:])
+        return 0
+
+    server = create_server(args.dir, args.port, record, args.latency_ms, args.bandwidth_kbps, args.strict)
+    print(f"{'Recording' if record else 'Replaying'} provider traffic from {args.dir} on {server_url(server)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
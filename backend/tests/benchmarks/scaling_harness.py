@@ -0,0 +1,268 @@
+"""
+Spot-count scaling harness for the forecast refresh.
+
+Runs refresh_spot_forecasts (including every post-refresh stage) over N
+synthetic spots spread along the coasts of each wave model (coastlines.py),
+against recorded forecasts (replay.py) and the in-process fake Supabase, for a
+series of N. Each N runs in a fresh interpreter with its own temporary archive,
+delta logs and best-time index, so memory and on-disk state don't carry over.
+
+For each N this records:
+1. Wall time of the refresh
+2. Memory: peak RSS, and growth over the RSS before the refresh started
+3. Database writes (insert/upsert/update/delete) and reads
+
+The refresh should be linear in N. For each metric the harness fits the slope
+of log(metric) against log(N), overall and between consecutive N, and flags
+the metric as super-linear when a slope exceeds 1 + --tolerance. It exits with
+status 1 when anything is flagged so it can gate CI.
+
+Results are written to tests/benchmarks/results/scaling-<timestamp>-<commit>.json.
+
+Usage:
+    python tests/benchmarks/scaling_harness.py [--spots 25 50 100 200 400 800] [--plot scaling.png]
+
+Options:
+    --spots N [N ...]       Spot counts to run (default: 25 50 100 200 400 800)
+    --models M [M ...]      Wave models to place spots in (default: all, see coastlines.WAVE_MODEL_BOUNDS)
+    --db-latency-ms MS      Latency injected into every fake Supabase query (default: 0)
+    --tolerance T           Allowed slope above 1 before flagging (default: 0.2)
+    --plot PATH             Also draw the metrics against N to a PNG
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime
+
+from forecast_pipeline_bench import BENCH_DIR, BACKEND_DIR, RESULTS_DIR, git_commit, peak_rss_mb
+
+# Add the backend and tests directories to the path so we can import from the app and the fake backend
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "tests"))
+
+# Metrics checked for super-linear growth, with the smallest value worth fitting
+# (below it, timer and allocator noise dominates)
+SCALING_METRICS = {
+    "wall_seconds": 0.05,
+    "memory_growth_mb": 5.0,
+    "db_writes": 1,
+}
+
+WRITE_OPERATIONS = ("insert", "upsert", "update", "delete")
+
+
+def current_rss_mb():
+    """Resident set size right now, from /proc where available (falls back to the peak)"""
+    try:
+        with open("/proc/self/statm", "r") as infile:
+            return int(infile.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def run_once(spot_count, models, db_latency_ms):
+    """Run one full refresh over `spot_count` coastline spots in this process"""
+    from coastlines import coastline_spots
+    from replay import ReplayWaveModel, ReplayWeatherSource, replay_tide_events
+    from app.database import set_supabase_client
+    from fake_supabase import FakeSupabaseClient
+    from app.services.forecast_service import refresh_spot_forecasts
+    from app.services.tides import tide_event_cache
+
+    class CountingSupabaseClient(FakeSupabaseClient):
+        """Fake Supabase that counts executed queries by operation"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.operations = {}
+
+        def run(self, query):
+            self.operations[query._operation] = self.operations.get(query._operation, 0) + 1
+            return super().run(query)
+
+    spots = coastline_spots(spot_count, models=models)
+    client = CountingSupabaseClient(latency_ms=db_latency_ms, tables={"surf_spots": spots})
+    set_supabase_client(client)
+    tide_event_cache.fetch = replay_tide_events
+
+    baseline_rss = current_rss_mb()
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        updated = refresh_spot_forecasts(
+            spots,
+            wave_model=ReplayWaveModel(),
+            weather_source=ReplayWeatherSource()
+        )
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+
+    return {
+        "spots": spot_count,
+        "updated": updated,
+        "wall_seconds": elapsed,
+        "peak_rss_mb": peak,
+        "memory_growth_mb": max(peak - baseline_rss, 0.0),
+        "db_writes": sum(client.operations.get(operation, 0) for operation in WRITE_OPERATIONS),
+        "db_reads": client.operations.get("select", 0),
+        "db_operations": client.operations,
+    }
+
+
+def run_in_subprocess(spot_count, args, work_dir):
+    env = dict(
+        os.environ,
+        FORECAST_ARCHIVE_DIR=os.path.join(work_dir, f"archive-{spot_count}"),
+        FORECAST_DELTA_DIR=os.path.join(work_dir, f"deltas-{spot_count}"),
+        BEST_TIME_INDEX_PATH=os.path.join(work_dir, f"best-time-{spot_count}.npz"),
+    )
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child",
+        "--spots", str(spot_count),
+        "--db-latency-ms", str(args.db_latency_ms)
+    ]
+    if args.models:
+        command += ["--models"] + args.models
+    result = subprocess.run(command, cwd=BENCH_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr)
+        raise RuntimeError(f"Scaling run with {spot_count} spots failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def log_slope(counts, values):
+    """Least-squares slope of log(value) against log(count); 1 means linear"""
+    points = [(math.log(n), math.log(v)) for n, v in zip(counts, values) if n > 0 and v > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+
+def analyze_scaling(runs, tolerance=0.2):
+    """Fit how each metric grows with spot count and flag super-linear growth
+
+    Args:
+        runs (list): Run results with "spots" and the SCALING_METRICS keys
+        tolerance (float): Allowed slope above 1
+
+    Returns:
+        dict: metric -> {"slope", "steps": [{"from", "to", "slope"}], "superlinear"}
+    """
+    runs = sorted(runs, key=lambda run: run["spots"])
+    analysis = {}
+    for metric, floor in SCALING_METRICS.items():
+        usable = [run for run in runs if run[metric] >= floor]
+        counts = [run["spots"] for run in usable]
+        values = [run[metric] for run in usable]
+        steps = []
+        for before, after in zip(usable, usable[1:]):
+            slope = log_slope([before["spots"], after["spots"]], [before[metric], after[metric]])
+            if slope is not None:
+                steps.append({"from": before["spots"], "to": after["spots"], "slope": round(slope, 3)})
+        overall = log_slope(counts, values)
+        # A single noisy step isn't a trend; flag when the fit or the largest step is super-linear
+        superlinear = (overall is not None and overall > 1 + tolerance) or \
+            bool(steps and steps[-1]["slope"] > 1 + 2 * tolerance)
+        analysis[metric] = {
+            "slope": round(overall, 3) if overall is not None else None,
+            "steps": steps,
+            "superlinear": superlinear,
+        }
+    return analysis
+
+
+def print_report(results):
+    print("\n" + "=" * 90)
+    print("FORECAST REFRESH SCALING")
+    print("=" * 90)
+    print(f"{'Spots':<8} {'Wall (s)':<10} {'ms/spot':<10} {'Peak RSS':<11} {'Growth':<10} {'DB writes':<11} {'DB reads':<10}")
+    print("-" * 90)
+    for run in results["runs"]:
+        print(f"{run['spots']:<8} {run['wall_seconds']:<10.2f} {run['wall_seconds'] / run['spots'] * 1000:<10.1f} "
+              f"{run['peak_rss_mb']:<8.0f} MB {run['memory_growth_mb']:<7.0f} MB {run['db_writes']:<11} {run['db_reads']:<10}")
+    print("-" * 90)
+    for metric, fit in results["scaling"].items():
+        status = "SUPER-LINEAR" if fit["superlinear"] else "ok"
+        steps = ", ".join(f"{step['from']}->{step['to']}: {step['slope']:.2f}" for step in fit["steps"])
+        slope = f"{fit['slope']:.2f}" if fit["slope"] is not None else "n/a"
+        print(f"{metric:<18} slope {slope:<6} {status:<13} {steps}")
+    print("=" * 90)
+
+
+def plot_scaling(results, path):
+    """Draw each metric against spot count on log-log axes, with a linear reference"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    runs = sorted(results["runs"], key=lambda run: run["spots"])
+    counts = [run["spots"] for run in runs]
+    fig = Figure(figsize=(15, 4.5))
+    FigureCanvasAgg(fig)
+    for ax, metric in zip(fig.subplots(1, len(SCALING_METRICS)), SCALING_METRICS):
+        values = [run[metric] for run in runs]
+        ax.loglog(counts, values, "o-", label=metric)
+        if values[0] > 0:
+            ax.loglog(counts, [values[0] * n / counts[0] for n in counts], "k--", alpha=0.4, label="linear")
+        fit = results["scaling"][metric]
+        ax.set_title(f"{metric} (slope {fit['slope']})" + (" SUPER-LINEAR" if fit["superlinear"] else ""))
+        ax.set_xlabel("Spots")
+        ax.grid(True, which="both", alpha=0.3)
+        ax.legend(loc="upper left")
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how the forecast refresh scales with spot count.")
+    parser.add_argument("--spots", type=int, nargs="+", default=[25, 50, 100, 200, 400, 800], help="Spot counts to run")
+    parser.add_argument("--models", nargs="+", help="Wave models to place spots in")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Fake Supabase latency per query")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed log-log slope above 1")
+    parser.add_argument("--plot", help="Write a PNG of the metrics against spot count")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_once(args.spots[0], args.models, args.db_latency_ms)))
+        return 0
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "models": args.models,
+        "db_latency_ms": args.db_latency_ms,
+        "runs": []
+    }
+    with tempfile.TemporaryDirectory(prefix="scaling-") as work_dir:
+        for spot_count in sorted(args.spots):
+            print(f"Refreshing {spot_count} coastline spots...")
+            results["runs"].append(run_in_subprocess(spot_count, args, work_dir))
+    results["scaling"] = analyze_scaling(results["runs"], args.tolerance)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"scaling-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['commit']}.json")
+    with open(out_path, "w") as outfile:
+        json.dump(results, outfile, indent=2)
+
+    print_report(results)
+    if args.plot:
+        plot_scaling(results, args.plot)
+        print(f"Plot saved to {args.plot}")
+    print(f"Results saved to {out_path}")
+    return 1 if any(fit["superlinear"] for fit in results["scaling"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,384 @@
+"""
+In-process stand-in for the Supabase client, for tests, load testing and offline runs.
+
+Implements the subset of the postgrest query builder the app uses (select, eq,
+match, order, limit, insert, update, delete, count and friends) over in-memory
+tables, plus the database functions the app calls with rpc(), with optional
+injected latency per query to mimic a remote database.
+
+It lives with the tests rather than in the app so a deployment can never end up
+on an in-memory database. Install one with
+app.database.set_supabase_client(FakeSupabaseClient(...)), or serve the app on a
+seeded one for offline runs and load tests against a server:
+
+    python tests/fake_supabase.py [--port 8000]
+
+FAKE_SUPABASE_LATENCY_MS, FAKE_SUPABASE_JITTER_MS and FAKE_SUPABASE_SPOTS tune the
+served fake.
+"""
+import os
+import sys
+import copy
+import random
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+
+class FakeResponse(object):
+    """Mirrors postgrest's APIResponse: the rows in data, plus count when requested"""
+
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+    def __repr__(self):
+        return f"FakeResponse(data={self.data!r}, count={self.count!r})"
+
+
+class FakeRpcCall(object):
+    """A pending rpc() call, run on execute() like postgrest's function builder"""
+
+    def __init__(self, client: "FakeSupabaseClient", function: str, params: Dict[str, Any]):
+        self._client = client
+        self._function = function
+        self._params = params
+
+    def execute(self):
+        self._client.simulate_latency()
+        return self._client.call(self._function, self._params)
+
+
+class FakeQueryBuilder(object):
+    """Collects a query the way postgrest's builders do and runs it on execute()"""
+
+    def __init__(self, client: "FakeSupabaseClient", table: str):
+        self._client = client
+        self._table = table
+        self._operation = "select"
+        self._columns = "*"
+        self._count = None
+        self._payload = None
+        self._on_conflict = None
+        self._ignore_duplicates = False
+        self._filters = []
+        self._order = []
+        self._limit = None
+
+    # Operations
+
+    def select(self, *columns, count=None):
+        self._operation = "select"
+        self._columns = ",".join(columns) if columns else "*"
+        self._count = count
+        return self
+
+    def insert(self, rows, count=None, **kwargs):
+        self._operation = "insert"
+        self._payload = rows
+        self._count = count
+        return self
+
+    def upsert(self, rows, on_conflict="id", count=None, ignore_duplicates=False, **kwargs):
+        self._operation = "upsert"
+        self._payload = rows
+        self._on_conflict = on_conflict
+        self._ignore_duplicates = ignore_duplicates
+        self._count = count
+        return self
+
+    def update(self, values, count=None, **kwargs):
+        self._operation = "update"
+        self._payload = values
+        self._count = count
+        return self
+
+    def delete(self, count=None, **kwargs):
+        self._operation = "delete"
+        self._count = count
+        return self
+
+    # Filters
+
+    def eq(self, column, value):
+        self._filters.append(lambda row: _compare(row.get(column), value, lambda a, b: a == b))
+        return self
+
+    def neq(self, column, value):
+        self._filters.append(lambda row: _compare(row.get(column), value, lambda a, b: a != b))
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(lambda row: _compare(row.get(column), value, lambda a, b: a > b))
+        return self
+
+    def gte(self, column, value):
+        self._filters.append(lambda row: _compare(row.get(column), value, lambda a, b: a >= b))
+        return self
+
+    def lt(self, column, value):
+        self._filters.append(lambda row: _compare(row.get(column), value, lambda a, b: a < b))
+        return self
+
+    def lte(self, column, value):
+        self._filters.append(lambda row: _compare(row.get(column), value, lambda a, b: a <= b))
+        return self
+
+    def in_(self, column, values):
+        values = [str(value) for value in values]
+        self._filters.append(lambda row: str(row.get(column)) in values)
+        return self
+
+    def match(self, query: Dict[str, Any]):
+        for column, value in query.items():
+            self.eq(column, value)
+        return self
+
+    # Modifiers
+
+    def order(self, column, desc=False, **kwargs):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size, **kwargs):
+        self._limit = size
+        return self
+
+    def execute(self):
+        self._client.simulate_latency()
+        return self._client.run(self)
+
+
+def _compare(left, right, op):
+    """Compare a stored value to a filter value, coercing like postgrest's string filters do"""
+    if left is None:
+        return False
+    try:
+        return op(left, type(left)(right))
+    except (TypeError, ValueError):
+        return op(str(left), str(right))
+
+
+class FakeSupabaseClient(object):
+    """In-memory Supabase client with configurable per-query latency
+
+    Args:
+        latency_ms (float): Base latency injected into every execute()
+        jitter_ms (float): Extra uniformly random latency on top of the base
+        tables (dict, optional): Initial rows keyed by table name
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tables: Dict[str, List[Dict[str, Any]]] = {name: list(rows) for name, rows in (tables or {}).items()}
+        self._next_ids: Dict[str, int] = {}
+        self._sequences: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def table(self, table_name: str) -> FakeQueryBuilder:
+        return FakeQueryBuilder(self, table_name)
+
+    def from_(self, table_name: str) -> FakeQueryBuilder:
+        return self.table(table_name)
+
+    def rpc(self, function: str, params: Optional[Dict[str, Any]] = None) -> FakeRpcCall:
+        return FakeRpcCall(self, function, params or {})
+
+    def call(self, function: str, params: Dict[str, Any]) -> FakeResponse:
+        """Run one of the database functions in sql_queries"""
+        with self._lock:
+            if function == "next_forecast_version":
+                # nextval() on forecast_version_seq
+                self._sequences["forecast_version_seq"] = self._sequences.get("forecast_version_seq", 0) + 1
+                return FakeResponse(self._sequences["forecast_version_seq"])
+        raise ValueError(f"Unsupported function {function}")
+
+    def simulate_latency(self):
+        delay = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def _next_id(self, table: str, rows: List[Dict[str, Any]]) -> int:
+        if table not in self._next_ids:
+            ids = [row["id"] for row in rows if isinstance(row.get("id"), int)]
+            self._next_ids[table] = max(ids, default=0) + 1
+        next_id = self._next_ids[table]
+        self._next_ids[table] += 1
+        return next_id
+
+    def _prepare_insert(self, table: str, rows: List[Dict[str, Any]], row: Dict[str, Any]) -> Dict[str, Any]:
+        row = copy.deepcopy(row)
+        if "id" not in row:
+            row["id"] = self._next_id(table, rows)
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        return row
+
+    def run(self, query: FakeQueryBuilder) -> FakeResponse:
+        with self._lock:
+            rows = self.tables.setdefault(query._table, [])
+            matched = [row for row in rows if all(f(row) for f in query._filters)]
+
+            if query._operation == "select":
+                result = matched
+                for column, desc in reversed(query._order):
+                    result = sorted(result, key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+                count = len(result) if query._count else None
+                if query._limit is not None:
+                    result = result[:query._limit]
+                return FakeResponse([_project(row, query._columns) for row in result], count)
+
+            if query._operation in ("insert", "upsert"):
+                payload = query._payload if isinstance(query._payload, list) else [query._payload]
+                written = []
+                for new_row in payload:
+                    existing = None
+                    if query._operation == "upsert":
+                        keys = [key.strip() for key in query._on_conflict.split(",")]
+                        existing = next(
+                            (row for row in rows if all(row.get(k) == new_row.get(k) for k in keys)), None
+                        )
+                    if existing is not None and query._ignore_duplicates:
+                        # ON CONFLICT DO NOTHING: postgrest only returns the rows it inserted
+                        continue
+                    if existing is not None:
+                        existing.update(copy.deepcopy(new_row))
+                        written.append(copy.deepcopy(existing))
+                    else:
+                        row = self._prepare_insert(query._table, rows, new_row)
+                        rows.append(row)
+                        written.append(copy.deepcopy(row))
+                return FakeResponse(written, len(written) if query._count else None)
+
+            if query._operation == "update":
+                for row in matched:
+                    row.update(copy.deepcopy(query._payload))
+                return FakeResponse([copy.deepcopy(row) for row in matched], len(matched) if query._count else None)
+
+            if query._operation == "delete":
+                matched_ids = {id(row) for row in matched}
+                self.tables[query._table] = [row for row in rows if id(row) not in matched_ids]
+                return FakeResponse([copy.deepcopy(row) for row in matched], len(matched) if query._count else None)
+
+        raise ValueError(f"Unsupported operation {query._operation}")
+
+
+def _project(row: Dict[str, Any], columns: str) -> Dict[str, Any]:
+    """Apply a select() column list; "*" and aggregate-only selects return the whole row"""
+    names = [name.strip() for name in columns.split(",") if name.strip()]
+    if not names or "*" in names or names == ["count"]:
+        return copy.deepcopy(row)
+    return {name: copy.deepcopy(row.get(name)) for name in names}
+
+
+def seed_fake_data(client: FakeSupabaseClient, spot_count: int = 50, reviews_per_spot: int = 20, seed: int = 0):
+    """Fill a fake client with synthetic spots, reviews and forecasts for load testing"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).isoformat()
+    spots = []
+    reviews = []
+    forecasts = []
+    days = []
+    today = datetime.now(timezone.utc).date()
+    for spot_id in range(1, spot_count + 1):
+        spot = {
+            "id": spot_id,
+            "name": f"Spot {spot_id}",
+            "latitude": 35.0 + rng.uniform(-1, 1),
+            "longitude": -120.7 + rng.uniform(-1, 1),
+            "description": "Synthetic spot for load testing",
+            "location": rng.choice(["Central Coast", "North County", "South Bay"]),
+            "difficulty": rng.choice(["beginner", "intermediate", "advanced"]),
+            "created_at": now,
+            "updated_at": None
+        }
+        spots.append(spot)
+        forecasts.append({
+            "id": spot_id,
+            "spot_id": spot_id,
+            "timestamp": now,
+            "wave_height": round(rng.uniform(1, 8), 2),
+            "tide": None,
+            "wind_speed": round(rng.uniform(0, 20), 1),
+            "wind_direction": round(rng.uniform(0, 360)),
+            "swell_components": {},
+            "version": 0
+        })
+        for offset in range(3):
+            date = today + timedelta(days=offset)
+            low = round(rng.uniform(1, 6), 1)
+            days.append({
+                "id": len(days) + 1,
+                "spot_id": spot_id,
+                "spot_name": spot["name"],
+                "date": date.isoformat(),
+                "day": date.strftime("%A"),
+                "timezone": "US/Pacific",
+                "hours": 8,
+                "wave_height_min": low,
+                "wave_height_max": round(low + rng.uniform(0, 3), 1),
+                "wave_height_mean": low,
+                "wind_speed_min": 0.0,
+                "wind_speed_max": round(rng.uniform(5, 25), 1),
+                "wind_speed_mean": round(rng.uniform(2, 15), 1),
+                "wind_direction_mean": round(rng.uniform(0, 360)),
+                "air_temperature_min": None,
+                "air_temperature_max": None,
+                "air_temperature_mean": None,
+                "updated_at": now,
+                "version": 0
+            })
+        for _ in range(reviews_per_spot):
+            reviews.append({
+                "id": len(reviews) + 1,
+                "spot_id": spot_id,
+                "user_id": f"user{rng.randint(1, 200)}",
+                "rating": rng.randint(1, 5),
+                "comment": "Synthetic review",
+                "wave_height": round(rng.uniform(1, 8), 1),
+                "wind_condition": rng.choice(["offshore", "onshore", "glassy"]),
+                "weather_condition": None,
+                "crowd_level": rng.randint(1, 5),
+                "created_at": now,
+                "updated_at": None
+            })
+
+    saved = []
+    for user in range(1, 201):
+        for spot_id in rng.sample(range(1, spot_count + 1), min(5, spot_count)):
+            saved.append({"id": len(saved) + 1, "user_id": f"user{user}", "spot_id": spot_id, "created_at": now})
+
+    client.tables["spots"] = spots
+    client.tables["surf_spots"] = copy.deepcopy(spots)
+    client.tables["reviews"] = reviews
+    client.tables["spot_forecasts"] = forecasts
+    client.tables["spot_forecast_days"] = days
+    client.tables["user_spots"] = saved
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API on a seeded fake Supabase backend.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    # Add the backend directory to the path so we can import from the app
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.database import set_supabase_client
+    from app.main import app
+
+    client = FakeSupabaseClient(
+        latency_ms=float(os.getenv("FAKE_SUPABASE_LATENCY_MS", "0")),
+        jitter_ms=float(os.getenv("FAKE_SUPABASE_JITTER_MS", "0"))
+    )
+    set_supabase_client(seed_fake_data(client, spot_count=int(os.getenv("FAKE_SUPABASE_SPOTS", "50"))))
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Load test for the API against the in-process fake Supabase backend.
+
+Drives /spots, /reviews, /spots/{id}/forecast and /users/{id}/dashboard with
+concurrent clients and reports requests per second plus p50/p99 latency and
+error counts per endpoint.
+No Supabase credentials or network access are needed: by default the app runs
+in-process over httpx's ASGI transport with a seeded FakeSupabaseClient
+installed through app.database.set_supabase_client.
+
+Usage:
+    python tests/load/load_test.py [--requests 2000] [--concurrency 20] [--db-latency-ms 5]
+
+Options:
+    --requests N        Total requests to send (default: 2000)
+    --concurrency N     Concurrent clients (default: 20)
+    --db-latency-ms MS  Latency injected into each fake Supabase query (default: 5)
+    --db-jitter-ms MS   Extra random latency per query (default: 0)
+    --spots N           Spots to seed into the fake backend (default: 50)
+    --url URL           Load test a running server instead (e.g. one started with tests/fake_supabase.py)
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+
+import httpx
+
+# Add the backend and tests directories to the path so we can import from the app and the fake backend
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "tests"))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def pick_request(rng, spot_count):
+    """Choose the next endpoint using a read-heavy mix similar to the frontend"""
+    spot_id = rng.randint(1, spot_count)
+    roll = rng.random()
+    if roll < 0.35:
+        return "/spots", "/spots"
+    if roll < 0.70:
+        return "/reviews", f"/reviews?spot_id={spot_id}"
+    if roll < 0.80:
+        return "/users/{user_id}/dashboard", f"/users/user{rng.randint(1, 200)}/dashboard"
+    return "/spots/{spot_id}/forecast", f"/spots/{spot_id}/forecast"
+
+
+async def run_load(client, total_requests, concurrency, spot_count, seed=0):
+    rng = random.Random(seed)
+    plan = [pick_request(rng, spot_count) for _ in range(total_requests)]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    async def worker():
+        while True:
+            try:
+                endpoint, path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 400:
+                    errors[endpoint] += 1
+            except Exception:
+                errors[endpoint] += 1
+            latencies[endpoint].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def print_report(elapsed, latencies, errors):
+    total = sum(len(values) for values in latencies.values())
+    print("\n" + "=" * 80)
+    print("API LOAD TEST")
+    print("=" * 80)
+    print(f"Total requests: {total} in {elapsed:.2f}s ({total / elapsed:.1f} RPS)")
+    print("-" * 80)
+    print(f"{'Endpoint':<28} {'Requests':<10} {'RPS':<10} {'p50 (ms)':<10} {'p99 (ms)':<10} {'Errors':<8}")
+    print("-" * 80)
+    for endpoint in sorted(latencies):
+        values = sorted(latencies[endpoint])
+        p50 = percentile(values, 50) * 1000
+        p99 = percentile(values, 99) * 1000
+        print(f"{endpoint:<28} {len(values):<10} {len(values) / elapsed:<10.1f} {p50:<10.1f} {p99:<10.1f} {errors[endpoint]:<8}")
+    print("=" * 80)
+
+
+async def main_async(args):
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+            return await run_load(client, args.requests, args.concurrency, args.spots)
+
+    from app.database import set_supabase_client
+    from fake_supabase import FakeSupabaseClient, seed_fake_data
+    from app.main import app
+
+    fake = FakeSupabaseClient(latency_ms=args.db_latency_ms, jitter_ms=args.db_jitter_ms)
+    set_supabase_client(seed_fake_data(fake, spot_count=args.spots))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=30) as client:
+        return await run_load(client, args.requests, args.concurrency, args.spots)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API against a fake Supabase backend.")
+    parser.add_argument("--requests", type=int, default=2000, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0, help="Latency per fake Supabase query")
+    parser.add_argument("--db-jitter-ms", type=float, default=0.0, help="Extra random latency per query")
+    parser.add_argument("--spots", type=int, default=50, help="Spots to seed into the fake backend")
+    parser.add_argument("--url", help="Base URL of a running server to load test instead")
+    args = parser.parse_args()
+
+    elapsed, latencies, errors = asyncio.run(main_async(args))
+    print_report(elapsed, latencies, errors)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Tests for best-time-to-surf scoring and the per-hour top-K index.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.best_time import BestTimeIndex, score_hours
+from app.services.forecast_snapshot import ForecastSnapshot, empty_records
+
+HOUR = 3600
+
+
+def hours(start, heights, wind_direction=45.0, wind_speed=10.0, period=12.0):
+    records = empty_records(len(heights))
+    records["time"] = start + HOUR * np.arange(len(heights))
+    records["minimum_breaking_height"] = heights
+    records["maximum_breaking_height"] = np.asarray(heights) + 1
+    records["wind_speed"] = wind_speed
+    records["wind_direction"] = wind_direction
+    records["swell_period"][:, 0] = period
+    return records
+
+
+def test_offshore_wind_beats_onshore():
+    # A west facing beach (270°): offshore wind comes from the east (90°)
+    offshore = hours(0, [4.0], wind_direction=90.0, wind_speed=12.0)
+    onshore = hours(0, [4.0], wind_direction=270.0, wind_speed=12.0)
+    flat = hours(0, [0.0], wind_direction=90.0)
+    angles = np.array([270.0])
+    assert score_hours(offshore, angles)[0] > score_hours(onshore, angles)[0] > 0
+    assert score_hours(flat, angles)[0] == 0
+
+
+def test_best_returns_each_spots_best_hour_and_merges_partial_refreshes(tmp_path):
+    now = int(time.time()) // HOUR * HOUR
+    spots = [{"id": i, "name": f"Spot {i}"} for i in range(1, 6)]
+    series = {i: hours(now, [i / 2, i / 2 + 0.5, i / 2 - 0.5]) for i in range(1, 6)}
+
+    index = BestTimeIndex(path=str(tmp_path / "index.npz"), top_k=3)
+    index.update(spots, ForecastSnapshot.from_series(series))
+
+    best = index.best(now, now + 3 * HOUR, limit=3)
+    assert [entry["spot_id"] for entry in best] == ["5", "4", "3"]
+    assert all(entry["time"] == now + HOUR for entry in best)
+
+    # Refreshing one spot replaces only its scores, and the index survives a reload
+    index.update(spots[:1], ForecastSnapshot.from_series({1: hours(now, [0, 0, 4])}))
+    reloaded = BestTimeIndex(path=str(tmp_path / "index.npz"), top_k=3)
+    best = reloaded.best(now, now + 3 * HOUR, limit=2)
+    assert [(entry["spot_id"], entry["time"]) for entry in best] == [("1", now + 2 * HOUR), ("5", now + HOUR)]
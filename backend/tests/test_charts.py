@@ -0,0 +1,51 @@
+"""
+Tests for server-side forecast chart rendering and caching.
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.charts import ChartRenderer, ChartUnavailable
+from app.services.forecast_archive import ForecastArchive
+from app.services.forecast_snapshot import ForecastSnapshot, empty_records
+
+
+def test_charts_are_rendered_once_per_run(tmp_path, monkeypatch):
+    records = empty_records(24)
+    records["time"] = int(time.time()) // 3600 * 3600 + 3600 * np.arange(24)
+    records["minimum_breaking_height"] = np.linspace(2, 4, 24)
+    records["maximum_breaking_height"] = np.linspace(3, 6, 24)
+    records["wind_speed"] = 8.0
+    records["wind_direction"] = 300.0
+    archive = ForecastArchive(str(tmp_path))
+    archive.append(ForecastSnapshot.from_series({"a": records}, {"run_id": "first"}))
+
+    renderer = ChartRenderer(archive=archive, workers=2)
+    monkeypatch.setattr(renderer, "_spot_details", lambda spot_id: ("Morro Bay", "US/Pacific"))
+    renders = []
+    render = renderer._render
+    monkeypatch.setattr(renderer, "_render", lambda *args: renders.append(args[1]) or render(*args))
+
+    async def fetch():
+        return await asyncio.gather(*(renderer.get("a", "wave") for _ in range(5)), renderer.get("a", "wind", "svg"))
+
+    results = asyncio.run(fetch())
+    assert all(content.startswith(b"\x89PNG") for content, _ in results[:5])
+    assert b"<svg" in results[5][0]
+    assert sorted(renders) == ["wave", "wind"]
+
+    asyncio.run(renderer.get("a", "wave"))
+    assert len(renders) == 2
+
+    with pytest.raises(ChartUnavailable):
+        asyncio.run(renderer.get("a", "tide"))
+    with pytest.raises(ChartUnavailable):
+        asyncio.run(renderer.get("missing", "wave"))
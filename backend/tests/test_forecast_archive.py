@@ -0,0 +1,74 @@
+"""
+Tests for the append-only, run-partitioned forecast archive.
+"""
+
+import os
+import sys
+import datetime
+
+import numpy as np
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.forecast_archive import ForecastArchive
+from app.services.forecast_snapshot import ForecastSnapshot, empty_records
+
+HOUR = 3600
+RUN_00Z = int(datetime.datetime(2025, 7, 1, tzinfo=datetime.timezone.utc).timestamp())
+
+
+def run(start, hours, height, run_id):
+    records = empty_records(hours)
+    records["time"] = start + HOUR * np.arange(hours)[::-1]  # out of order on purpose
+    records["minimum_breaking_height"] = height
+    return ForecastSnapshot.from_series({"a": records, "b": records.copy()}, {"unit": "english", "run_id": run_id})
+
+
+def test_runs_are_partitioned_and_queried_by_spot_and_time(tmp_path):
+    archive = ForecastArchive(str(tmp_path))
+    first = archive.append(run(RUN_00Z, 12, 2.0, "first"))
+    archive.append(run(RUN_00Z + 6 * HOUR, 12, 3.0, "second"))
+
+    assert os.path.basename(os.path.dirname(first)) == "2025-07-01"
+    assert os.path.basename(first) == "20250701T00Z-first"
+
+    rows = archive.query("a", RUN_00Z + 6 * HOUR, RUN_00Z + 9 * HOUR)
+    # Hours 6-8 were forecast by both runs
+    assert rows["time"].tolist() == [RUN_00Z + h * HOUR for h in (6, 6, 7, 7, 8, 8)]
+    assert rows["minimum_breaking_height"].tolist() == [2.0, 3.0] * 3
+
+    latest = archive.query("a", RUN_00Z, RUN_00Z + 24 * HOUR, latest_only=True)
+    assert len(latest) == 18
+    assert latest["minimum_breaking_height"][:6].tolist() == [2.0] * 6
+    assert set(latest["minimum_breaking_height"][6:].tolist()) == {3.0}
+    assert latest["model_run"][-1] == RUN_00Z + 6 * HOUR
+
+    assert len(archive.query("missing", RUN_00Z, RUN_00Z + 24 * HOUR)) == 0
+
+
+def test_latest_run_and_queries_come_from_the_in_memory_index(tmp_path, monkeypatch):
+    now = int(datetime.datetime.now(datetime.timezone.utc).timestamp()) // (6 * HOUR) * (6 * HOUR)
+    archive = ForecastArchive(str(tmp_path))
+    archive.append(run(now - 6 * HOUR, 12, 2.0, "older"))
+    archive.append(run(now, 12, 3.0, "newer"))
+
+    listed = []
+    listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda path: listed.append(path) or listdir(path))
+    name, snapshot = archive.latest("a")
+    assert name.endswith("-newer") and snapshot.get("a")["minimum_breaking_height"][0] == 3.0
+    assert len(archive.query("b", now - 6 * HOUR, now + 6 * HOUR)) == 18
+    assert archive.latest("missing") is None
+    assert listed == []
+
+    # A new process finds the same latest run from disk
+    assert ForecastArchive(str(tmp_path)).latest("a")[0] == name
+
+    # Another process catalogs a run written meanwhile when it archives the same run, without rewriting it
+    other = ForecastArchive(str(tmp_path))
+    other.latest("a")
+    directory = archive.append(run(now + 6 * HOUR, 12, 4.0, "newest"))
+    assert other.append(run(now + 6 * HOUR, 12, 9.0, "newest")) == directory
+    name, snapshot = other.latest("a")
+    assert name.endswith("-newest") and snapshot.get("a")["minimum_breaking_height"][0] == 4.0
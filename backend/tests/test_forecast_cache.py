@@ -0,0 +1,99 @@
+"""
+Tests for stale-while-revalidate forecast reads and versioned forecast publishing.
+"""
+
+import os
+import sys
+import threading
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import set_supabase_client
+from fake_supabase import FakeSupabaseClient
+from app.services.forecast_cache import SnapshotCache, forecast_cache, load_latest_forecasts
+from app.services.forecast_service import update_spot_forecast
+
+
+def test_expired_snapshots_are_served_while_a_newer_version_loads_in_the_background():
+    release = threading.Event()
+    loads = []
+
+    def load(spot_ids):
+        loads.append(list(spot_ids))
+        if len(loads) > 1:
+            release.wait(5)
+        return {spot_id: (len(loads), f"v{len(loads)}") for spot_id in spot_ids}
+
+    cache = SnapshotCache("test", load, ttl_seconds=0)
+    assert cache.get_many(["a"]) == {"a": "v1"}
+
+    # Past the TTL: served at once while the reload blocks, and only one reload runs
+    assert cache.get_many(["a"]) == {"a": "v1"}
+    assert cache.get_many(["a"]) == {"a": "v1"}
+    release.set()
+    for _ in range(500):
+        if cache.version("a") == 2:
+            break
+        threading.Event().wait(0.01)
+    assert cache.version("a") == 2 and len(loads) == 2
+
+    # An older version can't replace a newer one
+    assert not cache.publish("a", "v0", 0)
+    assert cache.publish("a", "v3", 3)
+
+
+def test_the_cache_is_bounded_and_spots_without_forecasts_are_only_remembered_briefly():
+    loads = []
+
+    def load(spot_ids):
+        loads.append(list(spot_ids))
+        return {spot_id: (1, f"forecast {spot_id}") for spot_id in spot_ids if spot_id.isdigit()}
+
+    cache = SnapshotCache("test", load, max_entries=2, miss_ttl_seconds=0)
+    assert cache.get_many(["1", "2"]) == {"1": "forecast 1", "2": "forecast 2"}
+    cache.get_many(["1"])
+    # Reading a third spot evicts the least recently read one
+    assert cache.get_many(["3"]) == {"3": "forecast 3"}
+    assert cache.version("2") is None and cache.version("1") == 1
+
+    # An unknown spot is reloaded once its short miss TTL has passed, not served from the cache
+    assert cache.get_many(["nope", "nope"]) == {"nope": None}
+    assert cache.get_many(["nope"]) == {"nope": None}
+    assert loads[-2:] == [["nope"], ["nope"]]
+
+
+def test_a_new_forecast_is_published_before_the_old_version_is_deleted():
+    client = FakeSupabaseClient(tables={"spot_forecasts": [
+        {"spot_id": 1, "timestamp": "2025-07-01T00:00:00+00:00", "wave_height": 2.0, "version": 0},
+    ]})
+    set_supabase_client(client)
+    seen = []
+    run = client.run
+
+    def run_and_read(query):
+        result = run(query)
+        if query._table == "spot_forecasts" and query._operation != "select":
+            seen.append(load_latest_forecasts(["1"]).get("1"))
+        return result
+
+    client.run = run_and_read
+    update_spot_forecast(1, {"spot_id": 1, "timestamp": "2025-07-01T03:00:00+00:00", "wave_height": 4.0})
+
+    # Readers see the new forecast from the insert on, never an empty spot
+    assert [forecast[1]["wave_height"] for forecast in seen] == [4.0, 4.0]
+    assert [row["wave_height"] for row in client.tables["spot_forecasts"]] == [4.0]
+    assert forecast_cache.get_many([1])["1"]["version"] == seen[0][0]
+
+
+def test_cached_snapshots_are_shared_read_only_values():
+    cache = SnapshotCache("test", lambda spot_ids: {})
+    cache.publish("a", [{"date": "2025-07-01", "wave_height_max": 4.0}], 1)
+
+    first, second = cache.get_many(["a"])["a"], cache.get_many(["a"])["a"]
+    assert first is second and first[0]["wave_height_max"] == 4.0
+    try:
+        first[0]["wave_height_max"] = 9.0
+        assert False, "cached snapshot was modified"
+    except TypeError:
+        pass
@@ -0,0 +1,55 @@
+"""
+Tests for rolling hourly forecasts up into local calendar days.
+"""
+
+import os
+import sys
+import datetime
+
+import numpy as np
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.forecast_days import daily_rows, to_forecast_day
+from app.services.forecast_snapshot import ForecastSnapshot, empty_records
+
+
+def hourly(start, hours, wave_heights, wind_directions):
+    records = empty_records(hours)
+    records["time"] = [int((start + datetime.timedelta(hours=h)).timestamp()) for h in range(hours)]
+    records["minimum_breaking_height"] = wave_heights
+    records["maximum_breaking_height"] = np.asarray(wave_heights) + 1
+    records["wind_speed"] = 10.0
+    records["wind_direction"] = wind_directions
+    return records
+
+
+def test_days_are_split_in_each_spots_local_timezone():
+    # 03:00 UTC on July 2nd is still July 1st in California but July 2nd in UTC
+    start = datetime.datetime(2025, 7, 1, 21, tzinfo=datetime.timezone.utc)
+    snapshot = ForecastSnapshot.from_series({
+        "pacific": hourly(start, 9, [1, 2, 3, 4, 5, 6, 7, 8, 9], [350, 10, 350, 10, 350, 10, 350, 10, 350]),
+        "utc": hourly(start, 9, [1] * 9, [90] * 9),
+    })
+    spots = [
+        {"id": "pacific", "name": "Pismo Beach"},
+        {"id": "utc", "name": "Somewhere", "timezone": "UTC"},
+    ]
+
+    rows = daily_rows(spots, snapshot)
+    by_key = {(row["spot_id"], row["date"]): row for row in rows}
+
+    pacific = by_key[("pacific", "2025-07-01")]
+    assert pacific["hours"] == 9 and pacific["day"] == "Tuesday"
+    assert pacific["wave_height_min"] == 1 and pacific["wave_height_max"] == 10
+    assert pacific["wave_height_mean"] == 5
+    # 350° and 10° average to just west of north, not 180°
+    assert abs(pacific["wind_direction_mean"] - 358.9) < 0.1
+
+    assert by_key[("utc", "2025-07-01")]["hours"] == 3
+    assert by_key[("utc", "2025-07-02")]["hours"] == 6
+
+    day = to_forecast_day(pacific)
+    assert day.waveHeight == "1-10 ft"
+    assert day.wind.startswith("10 mph N")
@@ -0,0 +1,61 @@
+"""
+Tests for run-to-run forecast delta encoding and changed-hours lookups.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.forecast_deltas import ForecastDeltaStore, decode_varints, encode_varints
+from app.services.forecast_snapshot import ForecastSnapshot, empty_records
+
+START = 1751328000  # 2025-07-01T00:00Z
+
+
+def run(start_hour, heights):
+    records = empty_records(len(heights))
+    records["time"] = START + 3600 * (start_hour + np.arange(len(heights)))
+    records["minimum_breaking_height"] = heights
+    records["maximum_breaking_height"] = np.asarray(heights) + 1
+    records["wind_speed"] = 8.27
+    records["tide"] = -0.4
+    return records
+
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 2 ** 40, 2 ** 63 + 5], dtype=np.uint64)
+    assert encode_varints(values[:4]) == bytes([0, 1, 127, 128, 1])
+    assert np.array_equal(decode_varints(encode_varints(values)), values)
+
+
+def test_only_changed_hours_are_returned_since_a_run(tmp_path):
+    store = ForecastDeltaStore(str(tmp_path), max_runs=4)
+    first = store.append(ForecastSnapshot.from_series({"1": run(0, [2.0] * 24)}, {"run_id": "a"}))
+    # Three hours later: three hours dropped, three added, and the last day's swell picks up
+    second = store.append(ForecastSnapshot.from_series({"1": run(3, [2.0] * 18 + [3.0] * 6)}, {"run_id": "b"}))
+    assert second < first * 0.6
+
+    # A fresh store decodes the log from disk
+    changes = ForecastDeltaStore(str(tmp_path)).changes("1", "a")
+    assert changes["run_id"] == "b" and not changes["full"]
+    assert list((changes["records"]["time"] - START) // 3600) == list(range(21, 27))
+    assert list(changes["records"]["minimum_breaking_height"]) == [3.0] * 6
+    assert list((changes["removed"] - START) // 3600) == [0, 1, 2]
+    assert np.allclose(changes["records"]["wind_speed"], 8.3) and np.allclose(changes["records"]["tide"], -0.4)
+
+    # A full log is compacted to its newest half; asking for a dropped run returns everything
+    for index in range(3):
+        store.append(ForecastSnapshot.from_series({"1": run(6 + 3 * index, [2.0] * 24)}, {"run_id": f"c{index}"}))
+    assert store.run_ids("1") == ["c1", "c2"]
+    changes = ForecastDeltaStore(str(tmp_path)).changes("1", "a")
+    assert changes["full"] and len(changes["records"]) == 24
+
+    # ...and the appends after a compaction are appends again, not rewrites
+    path = tmp_path / "1.delta"
+    size = path.stat().st_size
+    written = store.append(ForecastSnapshot.from_series({"1": run(15, [2.0] * 24)}, {"run_id": "c3"}))
+    assert path.stat().st_size == size + written
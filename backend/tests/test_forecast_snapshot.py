@@ -0,0 +1,60 @@
+"""
+Round-trip tests for the columnar forecast snapshot format, using the recorded
+surfpy forecasts in tests/<spot>/..._forecast.json.
+"""
+
+import os
+import sys
+import json
+
+import numpy as np
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.forecast_snapshot import ForecastSnapshot, to_records
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = {
+    1: os.path.join(TESTS_DIR, "morro", "morro_bay_forecast.json"),
+    2: os.path.join(TESTS_DIR, "shell", "shell_beach_forecast.json"),
+    3: os.path.join(TESTS_DIR, "pismo", "pismo_beach_forecast.json"),
+    4: os.path.join(TESTS_DIR, "rhode_island", "forecast.json"),
+}
+
+
+def load_fixtures():
+    series = {}
+    raw = {}
+    for spot_id, path in FIXTURES.items():
+        with open(path, "r") as infile:
+            raw[spot_id] = json.load(infile)
+        series[spot_id] = to_records(raw[spot_id])
+    return raw, series
+
+
+def test_snapshot_round_trip(tmp_path):
+    raw, series = load_fixtures()
+    ForecastSnapshot.from_series(series, {"unit": "english"}).save(str(tmp_path))
+
+    snapshot = ForecastSnapshot.load(str(tmp_path))
+    assert isinstance(snapshot.records, np.memmap)
+    assert snapshot.spot_ids == [str(spot_id) for spot_id in FIXTURES]
+
+    for spot_id, hours in raw.items():
+        records = snapshot.get(spot_id)
+        assert len(records) == len(hours)
+        for row, hour in zip(records, hours):
+            assert row["time"] == int(hour["date"])
+            assert np.isclose(row["minimum_breaking_height"], hour["minimum_breaking_height"])
+            assert np.isclose(row["wind_speed"], hour["wind_speed"])
+            for j, swell in enumerate(hour["swell_components"][:3]):
+                assert np.isclose(row["swell_height"][j], swell["wave_height"])
+                assert np.isclose(row["swell_period"][j], swell["period"])
+            assert np.isnan(row["swell_height"][len(hour["swell_components"]):]).all()
+
+
+def test_missing_spot_returns_none(tmp_path):
+    _, series = load_fixtures()
+    ForecastSnapshot.from_series(series).save(str(tmp_path))
+    assert ForecastSnapshot.load(str(tmp_path)).get(999) is None
@@ -0,0 +1,103 @@
+"""
+Tests for verifying archived forecasts against review-reported wave heights,
+using the in-process fake Supabase backend.
+"""
+
+import os
+import sys
+import datetime
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import set_supabase_client
+from fake_supabase import FakeSupabaseClient
+from app.services.forecast_archive import ForecastArchive
+from app.services.forecast_service import load_correction_factors as refresh_correction_factors
+from app.services.forecast_snapshot import ForecastSnapshot, empty_records
+from app.services.forecast_verification import run_verification, load_correction_factors
+
+HOUR = 3600
+START = datetime.datetime(2025, 7, 1, tzinfo=datetime.timezone.utc)
+MORRO, CAYUCOS, PISMO = "5a0d1c6e-morro", "9c2b7f41-cayucos", "e17a3b02-pismo"
+
+# Reviews reference the spots table; forecasts are archived under surf_spots ids
+SPOTS = [
+    {"id": 1, "name": "Morro Bay", "latitude": 35.37, "longitude": -120.86},
+    {"id": 2, "name": "Cayucos Pier", "latitude": 35.449, "longitude": -120.907},   # resolved by distance
+    {"id": 3, "name": "Pismo Beach", "latitude": 35.14, "longitude": -120.64},
+    {"id": 4, "name": "Somewhere Else", "latitude": 21.3, "longitude": -157.8},     # no surf spot
+]
+SURF_SPOTS = [
+    {"id": MORRO, "name": "Morro Bay", "latitude": 35.371, "longitude": -120.861},
+    {"id": CAYUCOS, "name": "Cayucos", "latitude": 35.45, "longitude": -120.91},
+    {"id": PISMO, "name": "Pismo Beach", "latitude": 35.14, "longitude": -120.64},
+]
+
+
+def review(review_id, spot_id, hours_after_start, wave_height):
+    created_at = START + datetime.timedelta(hours=hours_after_start)
+    return {"id": review_id, "spot_id": spot_id, "wave_height": wave_height, "created_at": created_at.isoformat()}
+
+
+@pytest.fixture
+def fake():
+    client = FakeSupabaseClient(tables={"spots": list(SPOTS), "surf_spots": list(SURF_SPOTS)})
+    set_supabase_client(client)
+    yield client
+    set_supabase_client(None)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    records = empty_records(24)
+    records["time"] = int(START.timestamp()) + HOUR * np.arange(24)
+    records["minimum_breaking_height"] = 3.0
+    records["maximum_breaking_height"] = 5.0
+    archive = ForecastArchive(str(tmp_path))
+    archive.append(ForecastSnapshot.from_series({MORRO: records, CAYUCOS: records.copy()}, {"run_id": "test"}))
+    return archive
+
+
+def test_reviews_are_matched_to_the_nearest_forecast_hour_incrementally(fake, archive):
+    fake.tables["reviews"] = [
+        review(1, 1, 2.2, 2.0),
+        review(2, 1, 10, 3.0),
+        review(3, 2, 5, 6.0),
+        review(4, 2, 200, 6.0),   # no forecast within the window
+        review(5, 3, 5, 6.0),     # spot without archived forecasts, at an hour spot 2 has
+        review(6, 2, 6, None),    # no reported height
+        review(7, 4, 5, 6.0),     # spot without a surf spot
+    ]
+
+    assert run_verification(archive) == {"processed": 6, "matched": 3, "spots": 2}
+    stats = {row["spot_id"]: row for row in fake.tables["spot_forecast_verification"]}
+    assert sorted(stats) == sorted([MORRO, CAYUCOS])
+    assert stats[MORRO]["bias"] == 1.5 and stats[MORRO]["rmse"] == pytest.approx(1.581, abs=1e-3)
+    assert stats[CAYUCOS]["bias"] == -2.0
+
+    # Morro Bay is over-forecast, so its heights are scaled down (shrunk toward 1 with few reviews)
+    factors = load_correction_factors()
+    assert 0.5 < factors[MORRO] < 1.0 < factors[CAYUCOS]
+
+    # Only reviews added since the last run are read
+    assert run_verification(archive)["processed"] == 0
+    fake.tables["reviews"].append(review(8, 1, 12, 4.0))
+    assert run_verification(archive) == {"processed": 1, "matched": 1, "spots": 1}
+    stats = {row["spot_id"]: row for row in fake.tables["spot_forecast_verification"]}
+    assert stats[MORRO]["reviews"] == 3 and stats[MORRO]["bias"] == 1.0
+
+
+def test_refreshes_run_without_corrections_when_verification_cant_be_read():
+    class MissingTable(object):
+        def table(self, name):
+            raise RuntimeError(f'relation "{name}" does not exist')
+
+    set_supabase_client(MissingTable())
+    try:
+        assert refresh_correction_factors() == {}
+    finally:
+        set_supabase_client(None)
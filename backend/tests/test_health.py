@@ -0,0 +1,106 @@
+"""
+Tests for the /livez and /readyz probes, with the database ping and scheduler stubbed.
+"""
+
+import os
+import sys
+import time
+import types
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import app
+from app.services import health
+from app.services.health import health_monitor
+
+
+class PingClient(object):
+    """Answers the readiness ping's query for the newest forecast, or fails it"""
+
+    def __init__(self, error=None, forecast_age_seconds=600):
+        self.error = error
+        self.queries = 0
+        self.fetched_at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=forecast_age_seconds)
+
+    def table(self, name):
+        self.queries += 1
+        if self.error:
+            raise ConnectionError(self.error)
+        return self
+
+    def select(self, *columns):
+        return self
+
+    def order(self, column, desc=False):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def execute(self):
+        return types.SimpleNamespace(data=[{"timestamp": self.fetched_at.isoformat()}])
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = types.SimpleNamespace(client=PingClient())
+    monkeypatch.setattr(health, "get_supabase_client", lambda: database.client)
+    # Recompute readiness on every probe
+    monkeypatch.setattr(health, "READINESS_CACHE_TTL_SECONDS", 0)
+    monkeypatch.setattr(health_monitor, "scheduler", types.SimpleNamespace(running=True))
+    monkeypatch.setattr(health_monitor, "last_db_ping_ok", None)
+    monkeypatch.setattr(health_monitor, "last_db_error", None)
+    monkeypatch.setattr(health_monitor, "last_forecast_at", None)
+    monkeypatch.setattr(health_monitor, "_snapshot", None)
+    return database
+
+
+def test_liveness_does_no_io(database):
+    response = TestClient(app).get("/livez")
+    assert response.status_code == 200 and response.json() == {"status": "alive"}
+    assert database.client.queries == 0
+
+
+def test_ready_only_when_the_database_ping_is_recent_and_the_scheduler_runs(database, monkeypatch):
+    client = TestClient(app)
+    health_monitor.ping_database()
+    response = client.get("/readyz")
+    assert response.status_code == 200 and response.json()["ready"]
+    assert response.json()["checks"]["database"]["error"] is None
+
+    # A stale ping is as bad as a failed one
+    monkeypatch.setattr(health_monitor, "last_db_ping_ok", time.time() - health.DB_PING_MAX_AGE_SECONDS - 1)
+    database.client = PingClient("connection refused")
+    health_monitor.ping_database()
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    checks = response.json()["checks"]
+    assert not checks["database"]["ok"] and checks["database"]["error"] == "connection refused"
+    assert checks["scheduler"]["ok"]
+
+    database.client = PingClient()
+    health_monitor.ping_database()
+    monkeypatch.setattr(health_monitor, "scheduler", types.SimpleNamespace(running=False))
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["checks"]["database"]["ok"] and not response.json()["checks"]["scheduler"]["ok"]
+
+
+def test_forecast_freshness_comes_from_the_newest_published_forecast(database):
+    client = TestClient(app)
+    # Whichever worker published it, a forecast from 13 hours ago means refreshes have stopped
+    database.client = PingClient(forecast_age_seconds=13 * 3600)
+    health_monitor.ping_database()
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert not response.json()["checks"]["forecast_refresh"]["ok"]
+    assert response.json()["checks"]["forecast_refresh"]["last_refresh_age_seconds"] >= 13 * 3600
+
+    database.client = PingClient(forecast_age_seconds=3600)
+    health_monitor.ping_database()
+    assert client.get("/readyz").status_code == 200
@@ -0,0 +1,62 @@
+"""
+Import-time budget for the API entrypoint.
+
+Cold start on autoscaled instances is dominated by importing app.main, so this
+measures it with `python -X importtime` in a fresh interpreter and checks that:
+1. The surfpy stack (surfpy, pygrib, numpy, pyproj) and the Supabase client
+   are not imported until they are actually used
+2. The cumulative import time of app.main stays under budget
+
+Usage:
+    python -m pytest tests/test_import_time.py
+
+The budget can be overridden with IMPORT_TIME_BUDGET_MS.
+"""
+
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+# Heavy modules that must only be imported lazily
+DEFERRED_MODULES = ["surfpy", "pygrib", "numpy", "pyproj", "supabase", "postgrest"]
+
+
+def measure_import(module):
+    """Import a module in a fresh interpreter and return {module: cumulative_us}."""
+    env = dict(os.environ)
+    env.pop("SUPABASE_URL", None)
+    env.pop("SUPABASE_KEY", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def test_heavy_modules_are_deferred():
+    timings = measure_import("app.main")
+    loaded = [name for name in timings if name.split(".")[0] in DEFERRED_MODULES]
+    assert not loaded, f"app.main eagerly imports {sorted(loaded)}"
+
+
+def test_app_import_time_budget():
+    timings = measure_import("app.main")
+    elapsed_ms = timings["app.main"] / 1000
+    assert elapsed_ms < IMPORT_TIME_BUDGET_MS, (
+        f"Importing app.main took {elapsed_ms:.0f}ms (budget {IMPORT_TIME_BUDGET_MS:.0f}ms)"
+    )
@@ -0,0 +1,56 @@
+"""
+Tests for the Prometheus text output of /metrics and the per-route request latency middleware.
+"""
+
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import app
+from app.services.metrics import Counter, Histogram, REGISTRY, http_request_duration_seconds, render_latest
+
+
+def test_counters_and_histograms_render_in_the_prometheus_text_format():
+    requests = Counter("test_requests_total", "Requests by result", ["result"])
+    latency = Histogram("test_latency_seconds", "Latency by route", ["route"], buckets=(0.1, 1.0))
+    try:
+        requests.inc(result="hit")
+        requests.inc(2, result='mi"ss')
+        latency.observe(0.05, route="/spots/{spot_id}")
+        latency.observe(0.5, route="/spots/{spot_id}")
+        text = render_latest()
+    finally:
+        REGISTRY.remove(requests)
+        REGISTRY.remove(latency)
+
+    assert text.endswith("\n")
+    assert "# HELP test_requests_total Requests by result\n# TYPE test_requests_total counter\n" in text
+    assert 'test_requests_total{result="hit"} 1\n' in text
+    assert 'test_requests_total{result="mi\\"ss"} 2\n' in text
+    assert "# TYPE test_latency_seconds histogram\n" + "\n".join([
+        'test_latency_seconds_bucket{route="/spots/{spot_id}",le="0.1"} 1',
+        'test_latency_seconds_bucket{route="/spots/{spot_id}",le="1"} 2',
+        'test_latency_seconds_bucket{route="/spots/{spot_id}",le="+Inf"} 2',
+        'test_latency_seconds_sum{route="/spots/{spot_id}"} 0.55',
+        'test_latency_seconds_count{route="/spots/{spot_id}"} 2',
+    ]) in text
+
+
+def test_requests_are_timed_by_route_template_and_served_on_metrics():
+    http_request_duration_seconds.clear()
+    client = TestClient(app)
+    assert client.get("/").status_code == 200
+    assert client.get("/no-such-route").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    # Timed under the route template, and unknown paths under one "unmatched" series
+    assert 'http_request_duration_seconds_count{method="GET",route="/",status="200"} 1\n' in response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1\n' in response.text
+    assert "# TYPE cache_requests_total counter" in response.text
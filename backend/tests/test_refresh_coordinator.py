@@ -0,0 +1,116 @@
+"""
+Tests for coalescing and rate limiting of forecast refresh triggers. The refresh
+itself is replaced with one that blocks until released, so no network is used.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import refresh_coordinator as coordinator_module
+from app.services.refresh_coordinator import RefreshCoordinator, RefreshThrottled
+from app.services.refresh_shards import cycle_run_id
+
+SPOTS = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+
+
+@pytest.fixture
+def blocking_refresh(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def refresh(spots, run_id=None):
+        calls.append(sorted(spot["id"] for spot in spots))
+        release.wait(5)
+        return len(spots)
+
+    monkeypatch.setattr(coordinator_module, "get_all_surf_spots", lambda: SPOTS)
+    monkeypatch.setattr(coordinator_module, "refresh_spot_forecasts", refresh)
+    return release, calls
+
+
+def wait_idle(coordinator):
+    for _ in range(500):
+        with coordinator._lock:
+            if coordinator._running is None:
+                return
+        threading.Event().wait(0.01)
+    raise AssertionError("refresh did not finish")
+
+
+def test_concurrent_triggers_join_the_running_refresh(blocking_refresh):
+    release, calls = blocking_refresh
+    coordinator = RefreshCoordinator(min_interval_seconds=60)
+
+    first, created = coordinator.trigger()
+    second, joined = coordinator.trigger()
+    scoped, _ = coordinator.trigger(["b"])
+    assert created and not joined
+    assert second.run_id == first.run_id == scoped.run_id
+
+    release.set()
+    wait_idle(coordinator)
+    assert calls == [["a", "b", "c"]]
+    assert coordinator.get_run(first.run_id).to_dict()["updated"] == 3
+
+
+def test_scoped_triggers_merge_into_one_queued_run(blocking_refresh):
+    release, calls = blocking_refresh
+    coordinator = RefreshCoordinator(min_interval_seconds=60)
+
+    coordinator.trigger(["a"])
+    queued, created = coordinator.trigger(["b"])
+    merged, joined = coordinator.trigger(["c"])
+    assert created and not joined and merged.run_id == queued.run_id
+
+    release.set()
+    wait_idle(coordinator)
+    wait_idle(coordinator)
+    assert calls == [["a"], ["b", "c"]]
+
+
+def test_recently_refreshed_spots_are_throttled(blocking_refresh):
+    release, calls = blocking_refresh
+    release.set()
+    coordinator = RefreshCoordinator(min_interval_seconds=60)
+
+    coordinator.trigger(["a"])
+    wait_idle(coordinator)
+    with pytest.raises(RefreshThrottled):
+        coordinator.trigger(["a"])
+
+    run, created = coordinator.trigger(["a", "b"])
+    assert created and run.spot_ids == {"b"}
+    wait_idle(coordinator)
+
+    coordinator.trigger(["a"], force=True)
+    wait_idle(coordinator)
+    assert calls == [["a"], ["b"], ["a"]]
+
+
+def test_a_manual_sharded_refresh_is_its_own_run_and_a_joined_cycle_is_reported(monkeypatch):
+    run_ids = []
+
+    def refresh(spots, run_id=None):
+        run_ids.append(run_id)
+        # The cycle run was started by another worker; a manual run is new
+        return len(spots) if run_id != cycle_run_id() else None
+
+    monkeypatch.setattr(coordinator_module, "get_all_surf_spots", lambda: SPOTS)
+    monkeypatch.setattr(coordinator_module, "REFRESH_SHARDING", True)
+    monkeypatch.setattr(coordinator_module.sharded_refresh, "refresh", refresh)
+    coordinator = RefreshCoordinator(min_interval_seconds=0)
+
+    scheduled, _ = coordinator.trigger(source="scheduler", force=True)
+    wait_idle(coordinator)
+    manual, _ = coordinator.trigger(force=True)
+    wait_idle(coordinator)
+
+    assert run_ids == [cycle_run_id(), f"{cycle_run_id()}-{manual.run_id}"]
+    assert coordinator.get_run(scheduled.run_id).to_dict()["status"] == "joined"
+    assert coordinator.get_run(manual.run_id).to_dict()["updated"] == 3
@@ -0,0 +1,73 @@
+"""
+Tests for fanning refresh events out to streaming subscribers and their SSE framing.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import datetime
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import refresh_events as refresh_events_module
+from app.services.refresh_events import RefreshEventBus, format_sse
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_spot_subscribers_only_get_their_spot_and_run_events():
+    bus = RefreshEventBus()
+
+    async def stream():
+        everything, morro = bus.subscribe(), bus.subscribe(spot_id=1)
+        bus.publish("refresh_started", {"run_id": "a", "total": 2})
+        bus.publish("spot_progress", {"run_id": "a", "spot_id": 1, "status": "updated"})
+        bus.publish("spot_progress", {"run_id": "a", "spot_id": 2, "status": "failed"})
+        await asyncio.sleep(0)
+        return drain(everything), drain(morro)
+
+    everything, morro = asyncio.run(stream())
+    assert [data.get("spot_id") for _, data in everything] == [None, 1, 2]
+    assert [(event, data.get("spot_id")) for event, data in morro] == [("refresh_started", None), ("spot_progress", 1)]
+
+
+def test_slow_subscribers_drop_their_oldest_events(monkeypatch):
+    monkeypatch.setattr(refresh_events_module, "SUBSCRIBER_QUEUE_SIZE", 3)
+    bus = RefreshEventBus()
+
+    async def stream():
+        subscription = bus.subscribe()
+        for completed in range(5):
+            bus.publish("spot_progress", {"completed": completed})
+        await asyncio.sleep(0)
+        return drain(subscription)
+
+    assert [data["completed"] for _, data in asyncio.run(stream())] == [2, 3, 4]
+
+
+def test_subscribers_whose_loop_closed_are_removed():
+    bus = RefreshEventBus()
+    loop = asyncio.new_event_loop()
+
+    async def subscribe():
+        return bus.subscribe()
+
+    loop.run_until_complete(subscribe())
+    loop.close()
+    assert bus.subscriber_count == 1
+    bus.publish("refresh_completed", {"run_id": "a"})
+    assert bus.subscriber_count == 0
+
+
+def test_events_are_framed_as_server_sent_events():
+    message = format_sse("forecast", {"spot_id": 1, "timestamp": datetime.datetime(2025, 7, 1, 3)})
+    event, data, end = message.split("\n", 2)
+    assert event == "event: forecast" and end == "\n"
+    assert json.loads(data[len("data: "):]) == {"spot_id": 1, "timestamp": "2025-07-01 03:00:00"}
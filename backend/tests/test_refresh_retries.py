@@ -0,0 +1,39 @@
+"""
+Tests for the failed-spot retry queue: backoff, dead-lettering and recovery.
+"""
+
+import os
+import sys
+import datetime
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import set_supabase_client
+from fake_supabase import FakeSupabaseClient
+from app.services.refresh_retries import RetryQueue, failure_reason
+
+
+def test_failures_back_off_then_dead_letter_and_successes_clear_the_queue():
+    client = FakeSupabaseClient()
+    set_supabase_client(client)
+    queue = RetryQueue(base_seconds=60, max_seconds=600, max_attempts={"fetch": 3, "parse": 1})
+    later = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+
+    queue.record({1: {"reason": failure_reason("grib_fetch"), "error": "timeout"},
+                  2: {"reason": failure_reason("grib_parse"), "error": "bad message"}}, [3])
+    entries = {entry["spot_id"]: entry for entry in queue.entries()}
+    assert entries["1"]["status"] == "pending" and entries["1"]["reason"] == "fetch"
+    assert entries["2"]["status"] == "dead" and entries["2"]["next_attempt_at"] is None
+    assert queue.due() == []
+    assert queue.due(now=later) == ["1"]
+
+    queue.record({1: {"reason": "fetch", "error": "timeout"}}, [])
+    queue.record({1: {"reason": "fetch", "error": "timeout"}}, [])
+    assert [entry["spot_id"] for entry in queue.entries("dead")] == ["1", "2"]
+    assert queue.due(now=later) == []
+
+    queue.requeue(2)
+    assert queue.due() == ["2"]
+    queue.record({}, [2, 4])
+    assert [entry["spot_id"] for entry in queue.entries()] == ["1"]
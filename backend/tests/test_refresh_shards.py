@@ -0,0 +1,156 @@
+"""
+Tests for splitting a forecast refresh into claimable wave model/tile shards.
+The per-shard refresh is replaced with one that returns fixed rows and series, so no surfpy is needed.
+"""
+
+import os
+import sys
+import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import set_supabase_client
+from fake_supabase import FakeSupabaseClient
+from app.services import refresh_shards
+from app.services.forecast_cache import load_latest_forecasts, load_forecast_days
+from app.services.forecast_service import update_daily_forecasts
+from app.services.forecast_snapshot import ForecastSnapshot, empty_records
+from app.services.refresh_shards import ShardedRefresh, TileWaveModel, cycle_run_id, plan_shards
+
+SPOTS = [
+    {"id": 1, "name": "Morro Bay", "latitude": 35.37, "longitude": -120.86},
+    {"id": 2, "name": "Cayucos", "latitude": 35.45, "longitude": -120.91},
+    {"id": 3, "name": "Rhode Island", "latitude": 41.43, "longitude": -71.46, "wave_model": "atlantic"},
+]
+
+
+class FixedShardRefresh(ShardedRefresh):
+    def __init__(self):
+        super().__init__(tile_degrees=1.0, wave_model_factory=lambda key: None)
+        self.refreshed = []
+
+    def refresh_shard(self, shard, spots, **kwargs):
+        self.refreshed.append(shard["shard_key"])
+        forecasts = [{"spot_id": spot["id"], "timestamp": "2025-07-01T03:00:00+00:00", "wave_height": 5.0} for spot in spots]
+        series = {}
+        for spot in spots:
+            records = empty_records(24)
+            records["time"] = 1751328000 + 3600 * np.arange(24)
+            records["maximum_breaking_height"] = 5.0
+            series[spot["id"]] = records
+        return {"forecasts": forecasts, "snapshot": ForecastSnapshot.from_series(series).to_payload(), "updated": len(spots)}
+
+
+def test_workers_split_a_run_and_readers_switch_only_when_every_shard_is_done(monkeypatch):
+    set_supabase_client(FakeSupabaseClient(tables={"surf_spots": list(SPOTS), "spot_forecasts": [
+        {"spot_id": spot["id"], "timestamp": "2025-07-01T00:00:00+00:00", "wave_height": 2.0, "version": 0} for spot in SPOTS
+    ]}))
+    staged = []
+    monkeypatch.setattr(refresh_shards, "POST_REFRESH_STAGES", [
+        lambda spots, snapshot: staged.append(sorted(snapshot.spot_ids)), update_daily_forecasts
+    ])
+    assert sorted(plan_shards(SPOTS)) == ["atlantic:41:-72", "us_west_coast:35:-121"]
+
+    refresh = FixedShardRefresh()
+    refresh.create_run(SPOTS, "run-1")
+    first = refresh.claim("run-1", "worker-a")
+    refresh.complete(first, refresh.refresh_shard(first, [spot for spot in SPOTS if str(spot["id"]) in first["spot_ids"]]))
+    assert refresh.get_run("run-1")["status"] == "running"
+    assert {row[1]["wave_height"] for row in load_latest_forecasts(["1", "2", "3"]).values()} == {2.0}
+    assert staged == [] and load_forecast_days(["1", "2", "3"]) == {}
+
+    assert refresh.work("run-1", "worker-b", spots=SPOTS) == 3 - len(first["spot_ids"])
+    assert sorted(refresh.refreshed) == ["atlantic:41:-72", "us_west_coast:35:-121"]
+    run = refresh.get_run("run-1")
+    assert run["status"] == "complete" and run["shard_status"] == {"done": 2}
+    assert {row[1]["wave_height"] for row in load_latest_forecasts(["1", "2", "3"]).values()} == {5.0}
+    # The post-refresh stages ran once, over the whole run, and its days published with its forecasts
+    assert staged == [["1", "2", "3"]]
+    days = load_forecast_days(["1", "2", "3"])
+    assert sorted(days) == ["1", "2", "3"] and {version for version, _ in days.values()} == {run["version"]}
+
+
+def test_workers_refreshing_in_the_same_cycle_share_one_run():
+    client = FakeSupabaseClient()
+    set_supabase_client(client)
+    now = datetime.datetime(2025, 7, 1, 5, 40, tzinfo=datetime.timezone.utc)
+    assert cycle_run_id(now) == "cycle-2025070103"
+
+    leader, follower = FixedShardRefresh(), FixedShardRefresh()
+    assert leader.create_run(SPOTS, cycle_run_id(now))["status"] == "running"
+    # The second worker neither plans shards nor refreshes anything itself
+    assert follower.refresh(SPOTS, cycle_run_id(now)) is None
+    assert follower.refreshed == []
+    assert len(client.tables["forecast_refresh_runs"]) == 1
+    assert len(client.tables["forecast_refresh_shards"]) == 2
+
+
+def test_spots_in_a_tile_share_one_grib_download():
+    class CountingModel(object):
+        fetches = 0
+
+        def fetch_grib_datas(self, start, end, location=None):
+            self.fetches += 1
+            return b"grib"
+
+    def location(latitude, longitude):
+        return SimpleNamespace(latitude=latitude, longitude=longitude)
+
+    model = CountingModel()
+    tile_model = TileWaveModel(model, reuse_degrees=0.5)
+    locations = [location(spot["latitude"], spot["longitude"]) for spot in SPOTS[:2]]
+    assert [tile_model.fetch_grib_datas(0, 24, spot_location) for spot_location in locations] == [b"grib", b"grib"]
+    assert model.fetches == 1
+    # A spot in the same tile but outside the first download's subregion gets its own download
+    tile_model.fetch_grib_datas(0, 24, location(35.95, -120.1))
+    assert model.fetches == 2
+
+
+def test_abandoned_claims_and_stuck_publishing_are_taken_over():
+    client = FakeSupabaseClient(tables={"surf_spots": list(SPOTS)})
+    set_supabase_client(client)
+    refresh = FixedShardRefresh()
+    refresh.create_run(SPOTS, "run-1")
+    for shard in client.tables["forecast_refresh_shards"]:
+        # A claim that is still fresh, though written in a format that sorts differently as a string
+        shard.update(status="claimed", worker_id="dead", attempts=1,
+                     claimed_at=datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S+00"))
+    assert refresh.claim("run-1", "worker-a") is None
+
+    for shard in client.tables["forecast_refresh_shards"]:
+        shard["claimed_at"] = "2025-07-01T00:00:00Z"
+    assert refresh.work("run-1", "worker-a", spots=SPOTS) == 3
+    assert refresh.get_run("run-1")["status"] == "complete"
+
+    # A worker died while publishing: the run is published again once its publish has timed out
+    run = client.tables["forecast_refresh_runs"][0]
+    run.update(status="publishing", publishing_at=datetime.datetime.now(datetime.timezone.utc).isoformat())
+    refresh.work_open_runs()
+    assert refresh.get_run("run-1")["status"] == "publishing"
+    run["publishing_at"] = "2025-07-01T00:00:00+00:00"
+    refresh.work_open_runs()
+    assert refresh.get_run("run-1")["status"] == "complete"
+
+
+def test_other_workers_replay_the_stages_of_a_published_run(monkeypatch):
+    client = FakeSupabaseClient(tables={"surf_spots": list(SPOTS)})
+    set_supabase_client(client)
+    staged = []
+    monkeypatch.setattr(refresh_shards, "POST_REFRESH_STAGES", [
+        lambda spots, snapshot: staged.append(snapshot.meta["run_id"]), update_daily_forecasts
+    ])
+    publisher, other = FixedShardRefresh(), FixedShardRefresh()
+    assert other.apply_published_runs() == 0
+
+    publisher.create_run(SPOTS, "run-1")
+    publisher.work("run-1", "worker-a", spots=SPOTS)
+    assert staged == ["run-1"]
+    # The publisher already ran them; every other worker runs them once, without rebuilding daily rows
+    days = list(client.tables["spot_forecast_days"])
+    assert publisher.apply_published_runs() == 0
+    assert other.apply_published_runs() == 1 and other.apply_published_runs() == 0
+    assert staged == ["run-1", "run-1"] and days and client.tables["spot_forecast_days"] == days
@@ -0,0 +1,53 @@
+"""
+Tests for per-phase refresh timing spans and run summaries.
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.metrics import time_phase
+from app.services.refresh_trace import RefreshTracer
+
+
+def test_spot_spans_and_run_summary_are_written_as_json_lines(tmp_path):
+    path = str(tmp_path / "traces.jsonl")
+    trace = RefreshTracer(path=path, profile="cprofile", sample_rate=1.0, profile_dir=str(tmp_path)).start_run("run-1")
+
+    with trace.spot({"id": 1, "name": "Morro Bay"}) as spot:
+        with time_phase("grib_fetch"):
+            pass
+        with time_phase("grib_parse"):
+            pass
+        with time_phase("grib_parse"):
+            pass
+        spot["status"] = "updated"
+
+    with trace.spot({"id": 2, "name": "Pismo Beach"}) as spot:
+        with pytest.raises(ValueError):
+            with time_phase("weather_fetch"):
+                raise ValueError("gridpoint not found")
+        spot["status"] = "failed"
+
+    with trace.stages():
+        with time_phase("archive_write"):
+            pass
+    summary = trace.finish(updated=1, total=2)
+
+    with open(path) as infile:
+        lines = [json.loads(line) for line in infile]
+    assert [line["type"] for line in lines] == ["spot", "spot", "run"]
+    assert [span["phase"] for span in lines[0]["spans"]] == ["grib_fetch", "grib_parse", "grib_parse"]
+    assert set(lines[0]["phases"]) == {"grib_fetch", "grib_parse"}
+    assert lines[1]["error"] == "ValueError: gridpoint not found"
+    assert os.path.exists(lines[0]["profile"])
+
+    assert summary["failures_by_phase"] == {"weather_fetch": 1}
+    assert summary["phases"]["grib_fetch"]["spots"] == 1
+    assert set(summary["stages"]) == {"archive_write"}
+    assert os.path.exists(summary["profile"])
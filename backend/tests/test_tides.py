@@ -0,0 +1,57 @@
+"""
+Tests for reconstructing tide curves from high/low events.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.forecast_snapshot import empty_records
+from app.services.tides import TideEventCache, fill_tides, prefetch_tide_events, tide_levels
+
+
+def test_cosine_curve_passes_through_extremes_and_stays_between_them():
+    events = np.array([0, 6 * 3600, 12 * 3600])
+    levels = np.array([5.0, 1.0, 4.0])
+    times = np.arange(-3600, 13 * 3600 + 1, 600)
+    curve = tide_levels(events, levels, times)
+
+    assert np.isnan(curve[times < 0]).all() and np.isnan(curve[times > 12 * 3600]).all()
+    assert curve[times == 0][0] == 5.0 and curve[times == 6 * 3600][0] == 1.0 and curve[times == 12 * 3600][0] == 4.0
+    assert np.isclose(curve[times == 3 * 3600][0], 3.0)
+    inside = ~np.isnan(curve)
+    assert curve[inside].min() >= 1.0 and curve[inside].max() <= 5.0
+
+    # Two series evaluated together never interpolate across each other
+    both = tide_levels(np.concatenate([events, events]), np.concatenate([levels, levels + 10]), [3 * 3600, 3 * 3600],
+                       np.array([0, 0, 0, 1, 1, 1]), np.array([0, 1]))
+    assert np.allclose(both, [3.0, 13.0])
+
+
+def test_fill_tides_fetches_each_station_once():
+    fetches = []
+
+    def fetch(station_id, location, start, stop, unit):
+        fetches.append(station_id)
+        times = np.arange(start, stop, 6 * 3600)
+        return times, np.where(np.arange(len(times)) % 2 == 0, 5.0, 1.0) + (station_id == "b")
+
+    records = {}
+    for spot_id in (1, 2, 3):
+        records[spot_id] = empty_records(24)
+        records[spot_id]["time"] = 1751328000 + 3600 * np.arange(24)
+    spots = [{"id": 1, "tide_station_id": "a"}, {"id": 2, "tide_station_id": "a"}, {"id": 3, "tide_station_id": "b"}]
+    cache = TideEventCache(fetch=fetch)
+    # Prefetched for the whole horizon, so spots filled one at a time as they are fetched reuse the events
+    assert prefetch_tide_events(spots, 1751328000, 1751328000 + 120 * 3600, "english", cache=cache) == 2
+    for spot in spots:
+        fill_tides([spot], records, "english", cache=cache)
+
+    assert sorted(fetches) == ["a", "b"]
+    assert np.array_equal(records[1]["tide"], records[2]["tide"])
+    assert np.allclose(records[3]["tide"], records[1]["tide"] + 1)
+    assert not np.isnan(records[1]["tide"]).any()
@@ -0,0 +1,51 @@
+"""
+Tests for vectorized unit conversion and timezone localization.
+"""
+
+import os
+import sys
+import datetime
+
+import numpy as np
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.forecast_records import SpotForecastSeries
+from app.services.forecast_snapshot import empty_records
+from app.services.units import convert_speed, convert_temperature, to_local, utc_offsets
+
+
+def test_utc_offsets_follow_dst():
+    summer = int(datetime.datetime(2025, 7, 1, tzinfo=datetime.timezone.utc).timestamp())
+    winter = int(datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc).timestamp())
+    offsets = utc_offsets("US/Pacific", np.array([summer, winter]))
+    assert offsets.tolist() == [-7 * 3600, -8 * 3600]
+    assert utc_offsets("UTC", np.array([summer])).tolist() == [0]
+    assert str(to_local(np.array([summer]), "US/Pacific")[0]) == "2025-06-30T17:00:00"
+    # DST starts at exactly 2am local (10:00 UTC)
+    spring_forward = int(datetime.datetime(2025, 3, 9, 10, tzinfo=datetime.timezone.utc).timestamp())
+    assert utc_offsets("US/Pacific", np.array([spring_forward - 1, spring_forward])).tolist() == [-8 * 3600, -7 * 3600]
+
+
+def test_series_converts_whole_columns_between_unit_systems():
+    records = empty_records(2)
+    records["minimum_breaking_height"] = [1.0, 2.0]
+    records["wind_speed"] = [10.0, np.nan]
+    records["wind_direction"] = [270.0, 90.0]
+    records["air_temperature"] = [20.0, 0.0]
+    records["swell_height"][:, 0] = [1.0, 2.0]
+    records["swell_period"][:, 0] = [12.0, 14.0]
+
+    english = SpotForecastSeries("a", records, "metric").to_units("english")
+    assert np.allclose(english.records["minimum_breaking_height"], [3.2808, 6.5617], atol=1e-3)
+    assert np.isclose(english.records["wind_speed"][0], 22.369, atol=1e-3)
+    assert np.isnan(english.records["wind_speed"][1])
+    assert english.records["air_temperature"].tolist() == [68.0, 32.0]
+    assert np.allclose(english.records["swell_height"][:, 0], [3.2808, 6.5617], atol=1e-3)
+    # Periods and directions don't depend on the unit system
+    assert english.records["swell_period"][:, 0].tolist() == [12.0, 14.0]
+    assert english.records["wind_direction"].tolist() == [270.0, 90.0]
+
+    assert np.isclose(convert_speed([10.0], "mph", "knots")[0], 8.68976, atol=1e-4)
+    assert convert_temperature([273.15], "K", "C").tolist() == [0.0]
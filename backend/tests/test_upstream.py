@@ -0,0 +1,20 @@
+"""
+Tests for redirecting forecast provider requests to the replay server.
+"""
+
+import os
+import sys
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.upstream import replay_url
+
+
+def test_only_provider_urls_are_rewritten():
+    base = "http://localhost:8765/"
+    assert replay_url("https://api.weather.gov/gridpoints/LOX/1,2/forecast/hourly", base) == \
+        "http://localhost:8765/api.weather.gov/gridpoints/LOX/1,2/forecast/hourly"
+    assert replay_url("https://nomads.ncep.noaa.gov/cgi-bin/filter_wave.pl?file=a.grib2&dir=%2Fgfs", base) == \
+        "http://localhost:8765/nomads.ncep.noaa.gov/cgi-bin/filter_wave.pl?file=a.grib2&dir=%2Fgfs"
+    assert replay_url("https://example.supabase.co/rest/v1/spots", base) == "https://example.supabase.co/rest/v1/spots"
@@ -0,0 +1,75 @@
+"""
+Tests for the saved spots dashboard, using the in-process fake Supabase backend.
+"""
+
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import set_supabase_client
+from fake_supabase import FakeSupabaseClient
+from app.main import app
+from app.services.forecast_cache import forecast_cache
+
+
+def spot(spot_id, name):
+    return {"id": spot_id, "name": name, "latitude": 35.3, "longitude": -120.8, "created_at": "2025-01-01T00:00:00+00:00"}
+
+
+def review(spot_id, rating, wave_height=None, created_at="2025-07-01T08:00:00+00:00"):
+    return {"spot_id": spot_id, "user_id": "someone", "rating": rating, "wave_height": wave_height,
+            "crowd_level": None, "created_at": created_at}
+
+
+@pytest.fixture
+def client():
+    forecast_cache.invalidate()
+    set_supabase_client(FakeSupabaseClient(tables={
+        "spots": [spot(1, "Morro Bay"), spot(2, "Cayucos"), spot(3, "Pismo Beach")],
+        "user_spots": [
+            {"user_id": "kai", "spot_id": 3, "created_at": "2025-06-01T00:00:00+00:00"},
+            {"user_id": "kai", "spot_id": 1, "created_at": "2025-06-02T00:00:00+00:00"},
+            {"user_id": "kai", "spot_id": 9, "created_at": "2025-06-03T00:00:00+00:00"},   # since deleted
+            {"user_id": "other", "spot_id": 2, "created_at": "2025-06-01T00:00:00+00:00"},
+        ],
+        "reviews": [
+            review(1, 4, 3.0, "2025-07-01T08:00:00+00:00"),
+            review(1, 5, None, "2025-07-02T08:00:00+00:00"),
+            review(1, 2, 6.0, "2025-06-30T08:00:00+00:00"),
+            review(2, 1),
+        ],
+        "spot_forecasts": [
+            {"spot_id": 1, "timestamp": "2025-07-01T03:00:00+00:00", "wave_height": 4.0, "version": 1},
+        ],
+    }))
+    yield TestClient(app)
+    set_supabase_client(None)
+    forecast_cache.invalidate()
+
+
+def test_dashboard_lists_saved_spots_in_order_with_forecasts_and_review_averages(client):
+    response = client.get("/users/kai/dashboard")
+    assert response.status_code == 200
+    dashboard = response.json()
+    assert dashboard["user_id"] == "kai"
+    assert [saved["name"] for saved in dashboard["spots"]] == ["Pismo Beach", "Morro Bay"]
+
+    pismo, morro = dashboard["spots"]
+    assert pismo["current_forecast"] is None
+    assert pismo["review_stats"] == {"count": 0, "average_rating": None, "average_wave_height": None,
+                                     "average_crowd_level": None, "latest_review_at": None}
+    assert morro["current_forecast"]["wave_height"] == 4.0
+    assert morro["review_stats"]["count"] == 3
+    assert morro["review_stats"]["average_rating"] == 3.67
+    # Reviews without a height don't count toward its average
+    assert morro["review_stats"]["average_wave_height"] == 4.5
+    assert morro["review_stats"]["latest_review_at"].startswith("2025-07-02T08:00:00")
+
+
+def test_dashboard_of_a_user_without_saved_spots_is_empty(client):
+    assert client.get("/users/nobody/dashboard").json() == {"user_id": "nobody", "spots": []}
@@ -0,0 +1,94 @@
+"""
+Tests for sharing hourly weather forecasts between spots in the same NWS grid cell.
+surfpy's weather fetch and the weather.gov points request are replaced with counting stubs.
+"""
+
+import os
+import sys
+import types
+
+import requests
+
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import weather_cache as weather_cache_module
+from app.services.weather_cache import WeatherForecastCache
+
+SHELL_BEACH = types.SimpleNamespace(latitude=35.1549, longitude=-120.6725, name="Shell Beach")
+PISMO_BEACH = types.SimpleNamespace(latitude=35.1428, longitude=-120.6413, name="Pismo Beach")
+MORRO_BAY = types.SimpleNamespace(latitude=35.3658, longitude=-120.8499, name="Morro Bay")
+GRID_CELLS = {"Shell Beach": (34, 125), "Pismo Beach": (34, 125)}
+
+
+class PointsResponse(object):
+    def __init__(self, location):
+        self.location = location
+
+    def raise_for_status(self):
+        if self.location.name not in GRID_CELLS:
+            raise requests.HTTPError("404 Not Found")
+
+    def json(self):
+        grid_x, grid_y = GRID_CELLS[self.location.name]
+        return {"properties": {"gridId": "LOX", "gridX": grid_x, "gridY": grid_y}}
+
+
+class Upstream(object):
+    """Stands in for surfpy.WeatherApi and requests.get, counting calls to each"""
+
+    def __init__(self, monkeypatch):
+        self.points = []
+        self.fetches = []
+        self.now = 1000.0
+        locations = {location.name: location for location in (SHELL_BEACH, PISMO_BEACH, MORRO_BAY)}
+
+        def get(url, **kwargs):
+            location = next(location for location in locations.values() if f"{location.latitude:.4f}" in url)
+            self.points.append(location.name)
+            return PointsResponse(location)
+
+        def fetch_hourly_forecast(location):
+            self.fetches.append(location.name)
+            return [types.SimpleNamespace(air_temperature=60 + hour, spot=location.name) for hour in range(3)]
+
+        monkeypatch.setattr(requests, "get", get)
+        monkeypatch.setitem(sys.modules, "surfpy", types.SimpleNamespace(
+            WeatherApi=types.SimpleNamespace(fetch_hourly_forecast=fetch_hourly_forecast)
+        ))
+        monkeypatch.setattr(weather_cache_module, "time", types.SimpleNamespace(monotonic=lambda: self.now))
+
+
+def test_spots_in_a_grid_cell_share_one_fetch_until_it_expires(tmp_path, monkeypatch):
+    upstream = Upstream(monkeypatch)
+    cache = WeatherForecastCache(gridpoint_path=str(tmp_path / "gridpoints.json"), ttl_seconds=600)
+
+    shell = cache.get_hourly_forecast(SHELL_BEACH)
+    pismo = cache.get_hourly_forecast(PISMO_BEACH)
+    assert upstream.fetches == ["Shell Beach"]
+    assert [hour.air_temperature for hour in pismo] == [60, 61, 62]
+    # Each spot gets its own copies of the shared hours
+    pismo[0].air_temperature = 90
+    assert shell[0].air_temperature == 60 and cache.get_hourly_forecast(SHELL_BEACH)[0].air_temperature == 60
+
+    upstream.now += 600
+    cache.get_hourly_forecast(PISMO_BEACH)
+    assert upstream.fetches == ["Shell Beach", "Pismo Beach"]
+
+
+def test_gridpoints_are_persisted_and_unknown_cells_fall_back_to_uncached_fetches(tmp_path, monkeypatch):
+    upstream = Upstream(monkeypatch)
+    path = str(tmp_path / "cache" / "gridpoints.json")
+    WeatherForecastCache(gridpoint_path=path).get_hourly_forecast(SHELL_BEACH)
+    assert upstream.points == ["Shell Beach"]
+
+    # A new process reads the mapping from disk instead of asking weather.gov again
+    cache = WeatherForecastCache(gridpoint_path=path)
+    assert cache.resolve_gridpoint(SHELL_BEACH) == {"grid_id": "LOX", "grid_x": 34, "grid_y": 125}
+    assert upstream.points == ["Shell Beach"]
+
+    # Morro Bay's cell can't be resolved, so every call fetches directly and nothing is cached
+    assert cache.get_hourly_forecast(MORRO_BAY)[0].spot == "Morro Bay"
+    cache.get_hourly_forecast(MORRO_BAY)
+    assert upstream.fetches == ["Shell Beach", "Morro Bay", "Morro Bay"]
+    assert upstream.points == ["Shell Beach", "Morro Bay", "Morro Bay"]
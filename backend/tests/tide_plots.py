@@ -2,10 +2,17 @@ import datetime
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+import os
+import sys
 from datetime import timezone
 
 import surfpy
 
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.tides import tide_levels
+
 
 class TidePlots(object):
 
@@ -34,17 +41,18 @@ class TidePlots(object):
         raw_dates = [x.date for x in tidal_events]
         raw_levels = [x.water_level for x in tidal_events]
 
-        x = mdates.date2num(raw_dates)
-        z4 = np.polyfit(x, raw_levels, len(raw_levels)-1)
-        p4 = np.poly1d(z4)
-        xx = np.linspace(x.min(), x.max(), 100)
-        dd = mdates.num2date(xx)
+        # Cosine interpolation between consecutive highs and lows, sampled every 6 minutes
+        event_times = np.array([int(date.timestamp()) for date in raw_dates], dtype=np.int64)
+        order = np.argsort(event_times)
+        xx = np.arange(event_times.min(), event_times.max() + 1, 360)
+        levels = tide_levels(event_times[order], np.asarray(raw_levels, dtype=np.float64)[order], xx)
+        dd = xx.astype('datetime64[s]')
 
         plt.figure(1)
         plt.title('Station ' + station_id + ': Water Level (ft)')
         plt.xlabel('Date')
         plt.ylabel('Water Level (ft)')
-        plt.plot(dd, p4(xx))
+        plt.plot(dd, levels)
         plt.scatter(raw_dates, raw_levels, c='r')
         
         plt.grid()
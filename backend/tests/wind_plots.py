@@ -5,10 +5,21 @@ import matplotlib.dates as mdates
 from matplotlib.ticker import FormatStrFormatter
 import pytz
 import math
+import os
+import sys
 
 import surfpy
 from surfpy.weatherapi import WeatherApi
 
+# Add the parent directory to the path so we can import from the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.units import convert_speed, system_units, to_local
+
+
+def _number(value):
+    return np.nan if value is None else float(value)
+
 
 class WindPlots(object):
 
@@ -82,32 +93,19 @@ class WindPlots(object):
         location = self.locations[location_name]
         wind_data = location['data']
         
-        # Extract dates and wind data
+        # Pull the hourly values into arrays once; missing values become NaN
+        times = np.array([int(hour.date.timestamp()) for hour in wind_data], dtype=np.int64)
+        wind_speeds = np.array([_number(hour.wind_speed) for hour in wind_data])
+        wind_gusts = np.array([_number(getattr(hour, 'wind_gust', None)) for hour in wind_data])
+
         # Convert UTC times from the API to local Pacific time for display
-        pacific = pytz.timezone('US/Pacific')
-        dates = [hour.date.astimezone(pacific) for hour in wind_data]
-        
-        # Convert wind speeds from mph to knots if they're in English units
+        dates = to_local(times, 'US/Pacific')
+
+        # Convert wind speeds to knots for the whole series at once
         # and scale down by half as requested
-        wind_speeds = []
-        wind_gusts = []
-        
-        for hour in wind_data:
-            # Check if we need to convert from mph to knots
-            if hour.unit == surfpy.units.Units.english:
-                # Convert mph to knots (1 mph ≈ 0.868976 knots) and scale down by half
-                wind_speeds.append(hour.wind_speed * 0.868976 * 0.5 if hour.wind_speed is not None else None)
-                if hasattr(hour, 'wind_gust') and hour.wind_gust is not None:
-                    wind_gusts.append(hour.wind_gust * 0.868976 * 0.5)
-                else:
-                    wind_gusts.append(None)
-            else:
-                # Scale down by half
-                wind_speeds.append(hour.wind_speed * 0.5 if hour.wind_speed is not None else None)
-                if hasattr(hour, 'wind_gust') and hour.wind_gust is not None:
-                    wind_gusts.append(hour.wind_gust * 0.5)
-                else:
-                    wind_gusts.append(None)
+        from_unit = system_units(wind_data[0].unit)['speed']
+        wind_speeds = convert_speed(wind_speeds, from_unit, 'knots') * 0.5
+        wind_gusts = convert_speed(wind_gusts, from_unit, 'knots') * 0.5
         
         # Create the plot
         fig, ax = plt.subplots(figsize=(12, 6))
@@ -116,7 +114,7 @@ class WindPlots(object):
         ax.plot(dates, wind_speeds, 'b-', linewidth=2, label='Wind Speed')
         
         # Plot wind gusts if available
-        if any(gust is not None for gust in wind_gusts):
+        if not np.isnan(wind_gusts).all():
             ax.plot(dates, wind_gusts, 'r--', linewidth=1.5, label='Wind Gusts')
         
         # Add a simple legend for wind speed and gusts only
@@ -28,14 +28,14 @@ export const useSavedSpots = ({ userId, autoLoad = false }: UseSavedSpotsOptions
     setError(null);
     
     try {
-      // Get user's saved spots with their details and forecasts
-      const response = await api.spots.getSavedSpots(userId);
+      // Get user's saved spots with their details, forecasts and review stats in one request
+      const response = await api.users.getDashboard(userId);
       
       if (response.error) {
         throw new Error(response.error);
       }
       
-      setSpots(response.data || []);
+      setSpots(response.data?.spots || []);
     } catch (err) {
       console.error('Error fetching saved spots:', err);
       setError(err instanceof Error ? err.message : 'Failed to load saved spots');
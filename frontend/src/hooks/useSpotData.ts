@@ -72,5 +72,17 @@ export const useSpotData = (spotId: number | undefined) => {
     fetchSpotData();
   }, [fetchSpotData]);
 
+  // Keep the wave height current from the forecast stream instead of re-requesting the forecast
+  useEffect(() => {
+    if (!spotId) return;
+
+    return api.spots.subscribeForecast(spotId, (forecast) => {
+      setSpot((current) => current && {
+        ...current,
+        waveHeight: forecast.wave_height ? forecast.wave_height.toString() + 'ft' : current.waveHeight,
+      });
+    });
+  }, [spotId]);
+
   return { spot, loading, error };
 };
@@ -118,7 +118,7 @@ const SavedSpots: React.FC = () => {
                   </SpotHeader>
                   <SpotLocation>Central California Coast</SpotLocation>
                   <SpotStats>
-                    <span>⭐ 0</span>
+                    <span>⭐ {spot.review_stats?.average_rating ? spot.review_stats.average_rating.toFixed(1) : 0}</span>
                     <span>🌊 {spot.current_forecast?.wave_height ? `${spot.current_forecast.wave_height.toFixed(1)} ft` : '0 ft'}</span>
                   </SpotStats>
                   
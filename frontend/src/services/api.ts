@@ -73,6 +73,20 @@ export default {
       return fetchApi<SpotForecast>(`/spots/${spotId}/forecast`);
     },
     
+    /**
+     * Subscribe to forecast updates for a spot over Server-Sent Events.
+     * The latest stored forecast is sent first, then each new one as it is written.
+     * Returns a function that closes the connection.
+     */
+    subscribeForecast: (spotId: number, onForecast: (forecast: SpotForecast) => void) => {
+      const source = new EventSource(`${API_BASE_URL}/spots/forecast-events?spot_id=${spotId}`);
+      source.addEventListener('forecast', (event) => {
+        const { forecast } = JSON.parse((event as MessageEvent).data);
+        onForecast(forecast);
+      });
+      return () => source.close();
+    },
+    
     /**
      * Save a spot for the current user
      */
@@ -155,6 +169,16 @@ export default {
       });
     },
   },
+  
+  // User endpoints
+  users: {
+    /**
+     * Get a user's saved spots with their latest forecast and review stats in one request
+     */
+    getDashboard: async (userId: string) => {
+      return fetchApi<UserDashboard>(`/users/${userId}/dashboard`);
+    },
+  },
 };
 
 // Types that match the backend models
@@ -168,6 +192,20 @@ export interface Spot {
   created_at: string;
   updated_at: string;
   current_forecast?: SpotForecast;
+  review_stats?: ReviewStats;
+}
+
+export interface ReviewStats {
+  count: number;
+  average_rating?: number;
+  average_wave_height?: number;
+  average_crowd_level?: number;
+  latest_review_at?: string;
+}
+
+export interface UserDashboard {
+  user_id: string;
+  spots: Spot[];
 }
 
 export interface SpotForecast {